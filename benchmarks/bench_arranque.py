@@ -0,0 +1,156 @@
+"""Benchmark de arranque en frío de la aplicación
+
+Uso:
+    python -m benchmarks.bench_arranque [-n REPETICIONES] [-p SEGUNDOS] [-o resultados.json]
+
+Cada repetición lanza un intérprete nuevo que importa Streamlit, ejecuta
+reporte_enzian.py con AppTest y comprueba que la pestaña Datos del Paciente
+se haya renderizado. Se mide:
+- el tiempo desde el lanzamiento del proceso hasta el primer render,
+- cuánto de ese tiempo es importar Streamlit y cuánto la primera ejecución,
+- el tiempo de importar el motor (enzian) por sí solo,
+- qué módulos pesados (python-docx, lxml, numpy) quedaron cargados.
+
+Con --presupuesto el comando termina con código 1 si la mediana del
+tiempo hasta el primer render lo supera.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from .escenarios import RUTA_APP
+
+RAIZ = os.path.dirname(os.path.abspath(RUTA_APP))
+
+MODULOS_PESADOS = ('docx', 'lxml.etree', 'numpy')
+
+_CODIGO_APP = """
+import json, sys, time
+inicio = time.perf_counter()
+import streamlit
+from streamlit.testing.v1 import AppTest
+importado = time.perf_counter()
+at = AppTest.from_file({ruta!r}, default_timeout=60)
+at.run()
+fin = time.perf_counter()
+if at.exception:
+    raise SystemExit(at.exception[0].message)
+at.text_input(key="nombre_paciente")
+print(json.dumps({{
+    'importar_streamlit_s': importado - inicio,
+    'primera_ejecucion_s': fin - importado,
+    'modulos': {{m: m in sys.modules for m in {modulos!r}}},
+}}))
+"""
+
+_CODIGO_MOTOR = """
+import json, sys, time
+inicio = time.perf_counter()
+import enzian
+fin = time.perf_counter()
+print(json.dumps({{
+    'importar_motor_s': fin - inicio,
+    'modulos': {{m: m in sys.modules for m in {modulos!r}}},
+}}))
+"""
+
+
+def _lanzar(codigo, entorno):
+    """Ejecuta código en un intérprete nuevo; devuelve su JSON y el tiempo total"""
+    inicio = time.perf_counter()
+    proceso = subprocess.run(
+        [sys.executable, '-c', codigo],
+        cwd=RAIZ,
+        env=entorno,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    duracion = time.perf_counter() - inicio
+    if proceso.returncode != 0:
+        raise RuntimeError(f"El proceso de medición falló:\n{proceso.stderr}")
+    return json.loads(proceso.stdout.strip().splitlines()[-1]), duracion
+
+
+def resumen(tiempos):
+    """Estadísticas básicas de una lista de tiempos en segundos"""
+    return {
+        'n': len(tiempos),
+        'mediana_s': statistics.median(tiempos),
+        'min_s': min(tiempos),
+        'max_s': max(tiempos),
+    }
+
+
+def ejecutar_benchmark(repeticiones=5):
+    """Mide el arranque en frío de la aplicación y del motor"""
+    with tempfile.TemporaryDirectory() as temporal:
+        entorno = dict(os.environ, ENZIAN_DB=os.path.join(temporal, 'arranque.db'), PYTHONPATH=RAIZ)
+        corridas_app = [
+            _lanzar(_CODIGO_APP.format(ruta=RUTA_APP, modulos=MODULOS_PESADOS), entorno)
+            for _ in range(repeticiones)
+        ]
+        corridas_motor = [
+            _lanzar(_CODIGO_MOTOR.format(modulos=MODULOS_PESADOS), entorno)[0]
+            for _ in range(repeticiones)
+        ]
+
+    return {
+        'hasta_primer_render': resumen([duracion for _, duracion in corridas_app]),
+        'importar_streamlit': resumen([datos['importar_streamlit_s'] for datos, _ in corridas_app]),
+        'primera_ejecucion': resumen([datos['primera_ejecucion_s'] for datos, _ in corridas_app]),
+        'importar_motor': resumen([datos['importar_motor_s'] for datos in corridas_motor]),
+        'modulos_tras_primer_render': corridas_app[-1][0]['modulos'],
+        'modulos_tras_importar_motor': corridas_motor[-1]['modulos'],
+    }
+
+
+def main(argv=None):
+    """Punto de entrada de la línea de comandos"""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_arranque', description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--repeticiones', type=int, default=5, help='Procesos nuevos a lanzar')
+    parser.add_argument('-p', '--presupuesto', type=float,
+                        help='Máximo de segundos hasta el primer render (mediana)')
+    parser.add_argument('-o', '--salida', help='Archivo JSON de salida (por defecto, stdout)')
+    args = parser.parse_args(argv)
+
+    import streamlit
+
+    resultados = ejecutar_benchmark(args.repeticiones)
+    mediana = resultados['hasta_primer_render']['mediana_s']
+    informe = {
+        'meta': {
+            'benchmark': 'arranque',
+            'fecha': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'streamlit': streamlit.__version__,
+            'repeticiones': args.repeticiones,
+            'presupuesto_s': args.presupuesto,
+        },
+        'resultados': resultados,
+        'dentro_del_presupuesto': None if args.presupuesto is None else mediana <= args.presupuesto,
+    }
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+    else:
+        print(texto)
+
+    if args.presupuesto is not None and mediana > args.presupuesto:
+        print(f"❌ Arranque en frío de {mediana:.2f} s, por encima del presupuesto de {args.presupuesto:.2f} s",
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
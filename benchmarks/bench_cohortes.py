@@ -0,0 +1,120 @@
+"""Benchmark de consultas de cohortes con el índice de bitmaps
+
+Uso:
+    python -m benchmarks.bench_cohortes [-n CASOS] [-s SEMILLA] [-o resultados.json]
+
+Genera casos sintéticos, construye el índice de enzian.indice_bitmap y
+compara cada consulta contra el recorrido de todos los desgloses con
+condiciones de Python. La generación de los casos no se mide.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+from enzian import ReporteEnzian, desglose_enzian
+from enzian.indice_bitmap import IndiceBitmap, contar
+
+from .sinteticos import generar_casos
+
+
+def _en_algun_lado(par, grados):
+    return bool(par) and (par[0] in grados or par[1] in grados)
+
+
+# (nombre, consulta con bitmaps, condición equivalente por registro)
+CONSULTAS = (
+    (
+        'B>=2 cualquier lado AND C3 AND FU',
+        lambda i: i.grado('B', 2) & i.bitmap('C3') & i.fu(),
+        lambda c: _en_algun_lado(c.b, '23') and c.c == 'C3' and bool(c.fu),
+    ),
+    (
+        'O3 cualquier lado OR A3',
+        lambda i: i.grado('O', 3) | i.bitmap('A3'),
+        lambda c: _en_algun_lado(c.o, '3') or c.a == 'A3',
+    ),
+    (
+        'FA AND NOT FB AND FI',
+        lambda i: i.bitmap('FA') & i.negar(i.bitmap('FB')) & i.fi(),
+        lambda c: c.fa and not c.fb and bool(c.fi),
+    ),
+)
+
+
+def _medir(funcion, repeticiones):
+    """Mejor tiempo de varias repeticiones y el último resultado"""
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor, resultado
+
+
+def ejecutar_benchmark(casos, semilla, repeticiones=5):
+    """Construye el índice y mide cada consulta contra el recorrido lineal"""
+    desgloses = [desglose_enzian(ReporteEnzian.desde_dict(datos)) for datos in generar_casos(casos, 'mixto', semilla)]
+
+    inicio = time.perf_counter()
+    indice = IndiceBitmap.construir(enumerate(desgloses))
+    construccion = time.perf_counter() - inicio
+
+    consultas = {}
+    for nombre, consulta, condicion in CONSULTAS:
+        tiempo_bitmap, bitmap = _medir(lambda: consulta(indice), repeticiones)
+        tiempo_ids, ids = _medir(lambda: indice.registros(bitmap), repeticiones)
+        tiempo_lineal, esperados = _medir(
+            lambda: [i for i, comp in enumerate(desgloses) if condicion(comp)], repeticiones
+        )
+        if ids != esperados:
+            raise RuntimeError(f"La consulta {nombre!r} no coincide con el recorrido lineal")
+        consultas[nombre] = {
+            'coincidencias': contar(bitmap),
+            'bitmap_s': tiempo_bitmap,
+            'bitmap_con_ids_s': tiempo_bitmap + tiempo_ids,
+            'recorrido_lineal_s': tiempo_lineal,
+        }
+
+    return {
+        'registros': len(indice),
+        'bitmaps': len(indice.claves()),
+        'construccion_s': construccion,
+        'consultas': consultas,
+    }
+
+
+def main(argv=None):
+    """Punto de entrada de la línea de comandos"""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_cohortes', description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--casos', type=int, default=100_000, help='Casos sintéticos a indexar')
+    parser.add_argument('-s', '--semilla', type=int, default=0, help='Semilla del generador')
+    parser.add_argument('-r', '--repeticiones', type=int, default=5, help='Repeticiones por consulta')
+    parser.add_argument('-o', '--salida', help='Archivo JSON de salida (por defecto, stdout)')
+    args = parser.parse_args(argv)
+
+    informe = {
+        'meta': {
+            'benchmark': 'cohortes',
+            'fecha': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'casos': args.casos,
+            'semilla': args.semilla,
+        },
+        'resultados': ejecutar_benchmark(args.casos, args.semilla, args.repeticiones),
+    }
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+    else:
+        print(texto)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""Benchmark de rendimiento de generación de reportes Word por clase de caso
+
+Uso:
+    python -m benchmarks.bench_docx [-n CASOS] [-s SEMILLA] [--motor xml] [-o resultados.json]
+
+Para cada clase de benchmarks.sinteticos mide reportes por segundo, pico de
+memoria por reporte y tamaño del DOCX generado. La memoria se mide con
+tracemalloc en una pasada aparte para no distorsionar los tiempos; solo
+incluye asignaciones de Python, no las internas de lxml.
+
+También mide la latencia de regenerar un caso después de editar solo su
+Compartimento C, el ciclo habitual de corregir un campo y volver a generar,
+en el que las demás secciones salen de la caché de fragmentos XML.
+
+Con --motor xml mide el escritor directo de documento_xml y cuenta los
+casos cuyo contenido difiere del de python-docx (debería ser 0).
+"""
+import argparse
+import copy
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from enzian import ReporteEnzian, generar_reporte_word
+from enzian.documento import MOTORES, invalidar_cache_secciones
+from enzian.documento_xml import verificar
+
+from .sinteticos import CLASES, generar_casos
+
+
+def medir_regeneracion(casos, seccion='compartimento_c', motor='docx'):
+    """Latencia de regenerar cada caso tras editar solo una de sus secciones"""
+    tiempos = []
+    for i, datos in enumerate(casos):
+        generar_reporte_word(ReporteEnzian.desde_dict(datos), motor)
+        editado = copy.deepcopy(datos)
+        editado[seccion] = dict(editado[seccion], descripcion=f"Corrección {i}")
+        inicio = time.perf_counter()
+        generar_reporte_word(ReporteEnzian.desde_dict(editado), motor)
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def medir_clase(casos, casos_memoria=20, casos_regeneracion=50, motor='docx'):
+    """Mide tiempos, memoria y tamaño de salida para una lista de casos"""
+    reportes = [ReporteEnzian.desde_dict(datos) for datos in casos]
+
+    # Calentamiento: plantilla base y cachés del motor; las secciones empiezan sin caché
+    generar_reporte_word(reportes[0], motor)
+    invalidar_cache_secciones()
+
+    tiempos = []
+    tamanos = []
+    inicio_total = time.perf_counter()
+    for reporte in reportes:
+        inicio = time.perf_counter()
+        buffer = generar_reporte_word(reporte, motor)
+        tiempos.append(time.perf_counter() - inicio)
+        tamanos.append(len(buffer.getvalue()))
+    total = time.perf_counter() - inicio_total
+
+    picos = []
+    tracemalloc.start()
+    try:
+        for reporte in reportes[:casos_memoria]:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            generar_reporte_word(reporte, motor)
+            picos.append(tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+
+    regeneracion = medir_regeneracion(casos[:casos_regeneracion], motor=motor)
+
+    resultado = {
+        'casos': len(reportes),
+        'reportes_por_segundo': len(reportes) / total if total else None,
+        'latencia_media_s': statistics.fmean(tiempos),
+        'latencia_mediana_s': statistics.median(tiempos),
+        'latencia_max_s': max(tiempos),
+        'memoria_pico_media_bytes': int(statistics.fmean(picos)),
+        'memoria_pico_max_bytes': max(picos),
+        'docx_bytes_medio': int(statistics.fmean(tamanos)),
+        'docx_bytes_max': max(tamanos),
+        'regenerar_tras_editar_mediana_s': statistics.median(regeneracion),
+    }
+    if motor == 'xml':
+        resultado['casos_distintos_de_docx'] = sum(1 for reporte in reportes if verificar(reporte))
+    return resultado
+
+
+def main(argv=None):
+    """Punto de entrada de la línea de comandos"""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_docx', description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--casos', type=int, default=200, help='Casos por clase')
+    parser.add_argument('-s', '--semilla', type=int, default=0, help='Semilla del generador')
+    parser.add_argument('-c', '--clase', action='append', choices=CLASES, help='Limitar a una o más clases')
+    parser.add_argument('--motor', choices=MOTORES, default='docx', help='Motor de generación a medir')
+    parser.add_argument('-o', '--salida', help='Archivo JSON de salida (por defecto, stdout)')
+    args = parser.parse_args(argv)
+
+    import docx
+
+    informe = {
+        'meta': {
+            'benchmark': 'docx',
+            'fecha': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'python_docx': getattr(docx, '__version__', 'desconocida'),
+            'casos_por_clase': args.casos,
+            'semilla': args.semilla,
+            'motor': args.motor,
+        },
+        'clases': {
+            clase: medir_clase(generar_casos(args.casos, clase, args.semilla), motor=args.motor)
+            for clase in (args.clase or CLASES)
+        },
+    }
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+    else:
+        print(texto)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""Benchmark de latencia por ejecución del script con Streamlit AppTest
+
+Uso:
+    python -m benchmarks.bench_reruns [-n REPETICIONES] [-o resultados.json]
+
+Para cada escenario de benchmarks.escenarios mide:
+- la primera ejecución del script (sesión nueva),
+- cada ejecución provocada por un cambio de widget, agrupada por pestaña,
+- el clic en "GENERAR REPORTE EN WORD" (que solo encola el trabajo) y la
+  generación directa del DOCX.
+
+El resultado se emite como JSON para comparar entre versiones.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from unittest import mock
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from enzian import ReporteEnzian, generar_reporte_word
+
+from .escenarios import ESCENARIOS, RUTA_APP, aplicar_paso
+
+
+def resumen(tiempos):
+    """Estadísticas básicas de una lista de tiempos en segundos"""
+    if not tiempos:
+        return None
+    return {
+        'n': len(tiempos),
+        'media_s': statistics.fmean(tiempos),
+        'mediana_s': statistics.median(tiempos),
+        'min_s': min(tiempos),
+        'max_s': max(tiempos),
+    }
+
+
+def _ejecutar(at):
+    """Ejecuta el script y devuelve el tiempo transcurrido"""
+    inicio = time.perf_counter()
+    at.run()
+    duracion = time.perf_counter() - inicio
+    if at.exception:
+        raise RuntimeError(f"La aplicación lanzó una excepción: {at.exception[0].message}")
+    return duracion
+
+
+def medir_escenario(pasos, timeout=60):
+    """Recorre un escenario en una sesión nueva y devuelve sus tiempos"""
+    at = AppTest.from_file(RUTA_APP, default_timeout=timeout)
+    primera = _ejecutar(at)
+
+    reruns = []
+    por_pestana = {}
+    for pestana, tipo, clave, valor in pasos:
+        aplicar_paso(at, tipo, clave, valor)
+        duracion = _ejecutar(at)
+        reruns.append(duracion)
+        por_pestana.setdefault(pestana, []).append(duracion)
+
+    at.button(key='btn_generar_reporte').click()
+    docx_boton = _ejecutar(at)
+
+    reporte = ReporteEnzian.desde_dict(at.session_state.data)
+    inicio = time.perf_counter()
+    buffer = generar_reporte_word(reporte)
+    docx_motor = time.perf_counter() - inicio
+
+    return {
+        'primera_ejecucion_s': primera,
+        'reruns_s': reruns,
+        'por_pestana_s': por_pestana,
+        'docx_boton_s': docx_boton,
+        'docx_motor_s': docx_motor,
+        'docx_bytes': len(buffer.getvalue()),
+    }
+
+
+def _ejecutar_escenarios(repeticiones, escenarios):
+    resultados = {}
+    for nombre, pasos in ESCENARIOS.items():
+        if escenarios and nombre not in escenarios:
+            continue
+        corridas = [medir_escenario(pasos) for _ in range(repeticiones)]
+
+        pestanas = {}
+        for corrida in corridas:
+            for pestana, tiempos in corrida['por_pestana_s'].items():
+                pestanas.setdefault(pestana, []).extend(tiempos)
+
+        resultados[nombre] = {
+            'pasos': len(pasos),
+            'primera_ejecucion': resumen([c['primera_ejecucion_s'] for c in corridas]),
+            'rerun': resumen([t for c in corridas for t in c['reruns_s']]),
+            'por_pestana': {pestana: resumen(tiempos) for pestana, tiempos in pestanas.items()},
+            'docx_boton': resumen([c['docx_boton_s'] for c in corridas]),
+            'docx_motor': resumen([c['docx_motor_s'] for c in corridas]),
+            'docx_bytes': corridas[-1]['docx_bytes'],
+        }
+    return resultados
+
+
+def ejecutar_benchmark(repeticiones=3, escenarios=None):
+    """Ejecuta los escenarios varias veces y agrega los resultados
+
+    La aplicación guarda en un almacén temporal (ENZIAN_DB) para no tocar
+    reportes_enzian.db del directorio actual.
+    """
+    with tempfile.TemporaryDirectory() as temporal, \
+            mock.patch.dict(os.environ, ENZIAN_DB=os.path.join(temporal, 'reruns.db')):
+        # Los recursos compartidos se crean una vez por proceso: se descartan
+        # para que el almacén se abra sobre la base temporal
+        st.cache_resource.clear()
+        try:
+            return _ejecutar_escenarios(repeticiones, escenarios)
+        finally:
+            st.cache_resource.clear()
+
+
+def metadatos(repeticiones):
+    """Información del entorno para poder comparar resultados"""
+    import streamlit
+    import docx
+
+    return {
+        'benchmark': 'reruns',
+        'fecha': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'streamlit': streamlit.__version__,
+        'python_docx': getattr(docx, '__version__', 'desconocida'),
+        'repeticiones': repeticiones,
+    }
+
+
+def main(argv=None):
+    """Punto de entrada de la línea de comandos"""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_reruns', description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--repeticiones', type=int, default=3, help='Corridas por escenario')
+    parser.add_argument('-e', '--escenario', action='append', choices=sorted(ESCENARIOS),
+                        help='Limitar a uno o más escenarios')
+    parser.add_argument('-o', '--salida', help='Archivo JSON de salida (por defecto, stdout)')
+    args = parser.parse_args(argv)
+
+    informe = {
+        'meta': metadatos(args.repeticiones),
+        'escenarios': ejecutar_benchmark(args.repeticiones, args.escenario),
+    }
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+    else:
+        print(texto)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
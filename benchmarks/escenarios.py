@@ -0,0 +1,67 @@
+"""Escenarios de captura para manejar la aplicación sin navegador (AppTest)
+
+Cada escenario es una lista de pasos (pestaña, tipo de widget, clave, valor).
+Cada paso se aplica y va seguido de una ejecución del script, como cuando
+el usuario cambia un widget en el navegador.
+"""
+import os
+
+RUTA_APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'reporte_enzian.py')
+
+DATOS_PACIENTE = [
+    ('Datos del Paciente', 'text_input', 'nombre_paciente', 'Paciente de Prueba'),
+    ('Datos del Paciente', 'text_input', 'cedula_paciente', '1-0000-0000'),
+    ('Datos del Paciente', 'number_input', 'edad_paciente', 34),
+]
+
+TODOS_ANORMALES = DATOS_PACIENTE + [
+    ('Peritoneo', 'radio', 'peritoneo_estado', 'Anormal'),
+    ('Peritoneo', 'select_slider', 'clasificacion_p', 'P2 (3-7 cm)'),
+    ('Ovarios', 'radio', 'ovario_der_estado', 'Anormal'),
+    ('Ovarios', 'number_input', 'diametro_ovario_der', 8.0),
+    ('Ovarios', 'select_slider', 'clasificacion_o_der', 'O3 (>7cm)'),
+    ('Ovarios', 'radio', 'ovario_izq_estado', 'Anormal'),
+    ('Ovarios', 'number_input', 'diametro_ovario_izq', 4.0),
+    ('Tubos', 'radio', 'tubo_der_estado', 'Anormal - Adherencias presentes'),
+    ('Tubos', 'radio', 'tubo_izq_estado', 'Anormal - Adherencias presentes'),
+    ('Compartimento A', 'radio', 'comp_a_estado', 'Anormal'),
+    ('Compartimento A', 'number_input', 'diametro_comp_a', 3.5),
+    ('Compartimento A', 'select_slider', 'clasificacion_a', 'A3 (>3 cm)'),
+    ('Compartimento B', 'radio', 'lsu_der_estado', 'Anormal'),
+    ('Compartimento B', 'number_input', 'diametro_lsu_der', 2.0),
+    ('Compartimento B', 'radio', 'lsu_izq_estado', 'Anormal'),
+    ('Compartimento B', 'number_input', 'diametro_lsu_izq', 0.5),
+    ('Compartimento C', 'radio', 'comp_c_estado', 'Anormal'),
+    ('Compartimento C', 'number_input', 'longitud_lesion_c', 4.0),
+    ('Compartimento C', 'checkbox', 'estenosis_c', True),
+    ('Localizaciones F', 'radio', 'adenomiosis_presente', 'Sí'),
+    ('Localizaciones F', 'radio', 'vejiga_presente', 'Sí'),
+    ('Localizaciones F', 'radio', 'ureter_presente', 'Sí'),
+    ('Localizaciones F', 'multiselect', 'lado_ureter', ['Derecho']),
+    ('Localizaciones F', 'radio', 'intestino_presente', 'Sí'),
+    ('Localizaciones F', 'multiselect', 'localizacion_intestino', ['Sigma (>16cm)']),
+    ('Localizaciones F', 'radio', 'otras_localizaciones_presente', 'Sí'),
+    ('Localizaciones F', 'multiselect', 'tipos_otras_localizaciones', ['Diafragma']),
+]
+
+URETER_BILATERAL_INTESTINO_MULTIPLE = DATOS_PACIENTE + [
+    ('Localizaciones F', 'radio', 'ureter_presente', 'Sí'),
+    ('Localizaciones F', 'multiselect', 'lado_ureter', ['Derecho', 'Izquierdo']),
+    ('Localizaciones F', 'number_input', 'diametro_ureter_derecho', 7.0),
+    ('Localizaciones F', 'selectbox', 'hidronefrosis_izquierdo', 'Moderada'),
+    ('Localizaciones F', 'radio', 'intestino_presente', 'Sí'),
+    ('Localizaciones F', 'multiselect', 'localizacion_intestino',
+     ['Sigma (>16cm)', 'Colon transverso', 'Ciego', 'Apéndice', 'Intestino delgado']),
+    ('Localizaciones F', 'text_area', 'descripcion_intestino', 'Nódulo en sigma con retracción. ' * 20),
+]
+
+ESCENARIOS = {
+    'reporte_vacio': DATOS_PACIENTE,
+    'todos_anormales': TODOS_ANORMALES,
+    'ureter_bilateral_intestino_multiple': URETER_BILATERAL_INTESTINO_MULTIPLE,
+}
+
+
+def aplicar_paso(at, tipo, clave, valor):
+    """Cambia el valor de un widget de la aplicación"""
+    getattr(at, tipo)(key=clave).set_value(valor)
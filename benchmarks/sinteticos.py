@@ -0,0 +1,302 @@
+"""Generador reproducible de casos sintéticos con la forma de st.session_state.data
+
+Uso:
+    python -m benchmarks.sinteticos DIRECTORIO [-n CASOS] [-c CLASE] [-s SEMILLA]
+
+Escribe borradores JSON equivalentes a los de "Guardar Borrador", útiles
+para probar la generación por lotes (python -m enzian.lote).
+
+Clases de caso:
+- minimo:  todos los compartimentos normales, sin descripciones
+- mixto:   cada hallazgo presente con probabilidad 1/2, descripciones cortas
+- maximo:  todos los hallazgos presentes, todas las opciones marcadas y
+           descripciones largas
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+CLASES = ('minimo', 'mixto', 'maximo')
+
+# Opciones de los widgets de la aplicación
+CLASIFICACIONES_P = ["P1 (<3 cm)", "P2 (3-7 cm)", "P3 (>7 cm)"]
+LOCALIZACIONES_P = ["Fondo de saco de Douglas", "Peritoneo pélvico lateral",
+                    "Ligamento ancho", "Peritoneo vesical", "Otras"]
+CLASIFICACIONES_O = ["O1 (<3cm)", "O2 (3-7cm)", "O3 (>7cm)"]
+ESTRUCTURAS = ["Unilocular", "Multilocular", "Unilocular-sólido", "Multilocular-sólido", "Sólido"]
+CONTENIDOS = ["Anecoico", "Homogéneo de baja intensidad (ground glass)",
+              "Heterogéneo", "Con nivel líquido-líquido"]
+VASCULARIZACIONES = ["Ausente", "Mínima periférica", "Moderada", "Abundante"]
+CLASIFICACIONES_T = ["T1 - Adherencias ovario-pared pélvica",
+                     "T2 - T1 + adherencias al útero",
+                     "T3 - T2 + adherencias a LSU/intestino"]
+SLIDING = ["Positivo (móvil)", "Limitado", "Negativo (fijo)"]
+PERMEABILIDADES = ["No evaluada", "Permeable (+)", "No permeable (-)"]
+CLASIFICACIONES_A = ["A1 (<1 cm)", "A2 (1-3 cm)", "A3 (>3 cm)"]
+LOCALIZACIONES_A = ["Fórnix vaginal posterior", "Espacio rectovaginal", "Área retrocervical"]
+ECOGENICIDADES = ["Hipoecogénica", "Isoecogénica", "Heterogénea"]
+CONTORNOS = ["Regulares", "Irregulares", "Espiculados"]
+CLASIFICACIONES_B = ["B1 (<1 cm)", "B2 (1-3 cm)", "B3 (>3 cm)"]
+CLASIFICACIONES_C = ["C1 (<1 cm)", "C2 (1-3 cm)", "C3 (>3 cm)"]
+PROFUNDIDADES_C = ["Serosa/subserosa", "Muscular propia", "Submucosa", "Mucosa"]
+CRITERIOS_MUSA = ["Asimetría de paredes miometriales", "Quistes miometriales",
+                  "Hiperplasia endometrial focal", "Líneas de sombra",
+                  "Áreas heterogéneas en miometrio", "Zona juncional irregular",
+                  "Vascularización translesional"]
+LOCALIZACIONES_VEJIGA = ["Pared posterior", "Cúpula", "Trígono", "Otras"]
+PROFUNDIDADES_VEJIGA = ["Serosa", "Muscular", "Submucosa", "Mucosa"]
+LADOS_URETER = ["Derecho", "Izquierdo"]
+HIDRONEFROSIS = ["Ausente", "Leve", "Moderada", "Severa"]
+TIPOS_COMPROMISO = ["Extrínseco", "Intrínseco", "Mixto"]
+LOCALIZACIONES_INTESTINO = ["Sigma (>16cm)", "Colon transverso", "Ciego", "Apéndice", "Intestino delgado"]
+TIPOS_OTRAS = ["Pared abdominal", "Diafragma", "Pulmón", "Nervio", "Cicatriz quirúrgica", "Ombligo", "Otras"]
+
+NOMBRES = ["María", "Ana", "Laura", "Sofía", "Valeria", "Daniela", "Carolina", "Gabriela"]
+APELLIDOS = ["Rodríguez", "Jiménez", "Mora", "Vargas", "Rojas", "Solano", "Chaves", "Araya"]
+MEDICOS = ["Dr. Quesada", "Dra. Castro", "Dr. Alvarado", "Dra. Núñez"]
+PALABRAS = ("nódulo hipoecogénico de bordes irregulares con retracción del tejido adyacente "
+            "sin flujo al doppler color en relación con torus uterino y fondo de saco "
+            "adherencias firmes al sigma con sliding sign negativo").split()
+
+# Longitud máxima de las descripciones en la clase "maximo"
+LONGITUD_MAXIMA = 2000
+
+
+class _Generador:
+    """Genera los valores de un caso según su clase"""
+
+    def __init__(self, rng, clase):
+        if clase not in CLASES:
+            raise ValueError(f"Clase de caso desconocida: {clase!r} (opciones: {', '.join(CLASES)})")
+        self.rng = rng
+        self.clase = clase
+
+    def hay_hallazgo(self):
+        if self.clase == 'minimo':
+            return False
+        if self.clase == 'maximo':
+            return True
+        return self.rng.random() < 0.5
+
+    def texto(self):
+        if self.clase == 'minimo':
+            return ''
+        longitud = LONGITUD_MAXIMA if self.clase == 'maximo' else self.rng.randint(0, 200)
+        palabras = []
+        total = 0
+        while total < longitud:
+            palabra = self.rng.choice(PALABRAS)
+            palabras.append(palabra)
+            total += len(palabra) + 1
+        return ' '.join(palabras)[:longitud]
+
+    def opciones(self, lista):
+        if self.clase == 'maximo':
+            return list(lista)
+        return self.rng.sample(lista, self.rng.randint(1, len(lista)))
+
+    def medida(self, maximo, paso=0.1):
+        return round(self.rng.randint(0, int(maximo / paso)) * paso, 1)
+
+
+def generar_caso(rng, clase='mixto'):
+    """Genera un caso sintético válido de la clase indicada"""
+    g = _Generador(rng, clase)
+    fecha = date(2020, 1, 1) + timedelta(days=rng.randint(0, 6 * 365))
+
+    datos = {
+        'paciente': {
+            'nombre': f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}",
+            'edad': rng.randint(16, 55),
+            'cedula': f"{rng.randint(1, 9)}-{rng.randint(0, 9999):04d}-{rng.randint(0, 9999):04d}",
+            'fecha': fecha.isoformat(),
+            'medico': rng.choice(MEDICOS),
+            'indicacion': g.texto(),
+        },
+        'ovarios': {},
+        'tubos': {},
+        'compartimento_b': {},
+        'localizaciones_f': {},
+    }
+
+    # Peritoneo (P)
+    if g.hay_hallazgo():
+        datos['peritoneo'] = {
+            'estado': 'anormal',
+            'clasificacion': rng.choice(CLASIFICACIONES_P),
+            'diametro': g.medida(20.0),
+            'localizaciones': g.opciones(LOCALIZACIONES_P),
+            'descripcion': g.texto(),
+        }
+    else:
+        datos['peritoneo'] = {'estado': 'normal'}
+
+    # Ovarios (O)
+    for lado in ('derecho', 'izquierdo'):
+        if g.hay_hallazgo():
+            datos['ovarios'][lado] = {
+                'estado': 'anormal',
+                'diametro': g.medida(15.0),
+                'num_endometriomas': rng.randint(1, 10),
+                'clasificacion': rng.choice(CLASIFICACIONES_O),
+                'estructura': rng.choice(ESTRUCTURAS),
+                'contenido': rng.choice(CONTENIDOS),
+                'vascularizacion': rng.choice(VASCULARIZACIONES),
+                'adherencias': g.clase == 'maximo' or rng.random() < 0.5,
+                'descripcion': g.texto(),
+            }
+        elif g.clase == 'mixto' and rng.random() < 0.3:
+            datos['ovarios'][lado] = {'estado': 'no_visualizado'}
+        else:
+            datos['ovarios'][lado] = {'estado': 'normal'}
+
+    # Tubos (T)
+    for lado in ('derecho', 'izquierdo'):
+        if g.hay_hallazgo():
+            datos['tubos'][lado] = {
+                'estado': 'anormal',
+                'clasificacion': rng.choice(CLASIFICACIONES_T),
+                'sliding_sign': rng.choice(SLIDING),
+                'permeabilidad': rng.choice(PERMEABILIDADES),
+                'descripcion': g.texto(),
+            }
+        elif g.clase == 'mixto' and rng.random() < 0.3:
+            datos['tubos'][lado] = {'estado': 'no_evaluable'}
+        else:
+            datos['tubos'][lado] = {'estado': 'normal'}
+
+    # Compartimento A
+    if g.hay_hallazgo():
+        datos['compartimento_a'] = {
+            'estado': 'anormal',
+            'diametro': g.medida(10.0),
+            'clasificacion': rng.choice(CLASIFICACIONES_A),
+            'localizacion': g.opciones(LOCALIZACIONES_A),
+            'ecogenicidad': rng.choice(ECOGENICIDADES),
+            'contornos': rng.choice(CONTORNOS),
+            'descripcion': g.texto(),
+        }
+    else:
+        datos['compartimento_a'] = {'estado': 'normal'}
+
+    # Compartimento B
+    for lado in ('derecho', 'izquierdo'):
+        if g.hay_hallazgo():
+            datos['compartimento_b'][lado] = {
+                'estado': 'anormal',
+                'diametro_max': g.medida(10.0),
+                'dim_ap': g.medida(10.0),
+                'dim_cc': g.medida(10.0),
+                'clasificacion': rng.choice(CLASIFICACIONES_B),
+                'sliding_sign': rng.choice(SLIDING),
+                'distancia_cervix': g.medida(10.0),
+                'descripcion': g.texto(),
+            }
+        else:
+            datos['compartimento_b'][lado] = {'estado': 'normal'}
+
+    # Compartimento C
+    if g.hay_hallazgo():
+        datos['compartimento_c'] = {
+            'estado': 'anormal',
+            'longitud': g.medida(20.0),
+            'clasificacion': rng.choice(CLASIFICACIONES_C),
+            'distancia_anal': g.medida(16.0, paso=0.5),
+            'profundidad': rng.choice(PROFUNDIDADES_C),
+            'circunferencia': rng.randrange(0, 101, 5),
+            'estenosis': g.clase == 'maximo' or rng.random() < 0.5,
+            'sliding_sign': rng.choice(SLIDING),
+            'descripcion': g.texto(),
+        }
+    else:
+        datos['compartimento_c'] = {'estado': 'normal'}
+
+    # Localizaciones F
+    loc_f = datos['localizaciones_f']
+    if g.hay_hallazgo():
+        loc_f['adenomiosis'] = {
+            'presente': True,
+            'criterios_musa': g.opciones(CRITERIOS_MUSA),
+            'descripcion': g.texto(),
+        }
+    else:
+        loc_f['adenomiosis'] = {'presente': False}
+
+    if g.hay_hallazgo():
+        loc_f['vejiga'] = {
+            'presente': True,
+            'localizacion': rng.choice(LOCALIZACIONES_VEJIGA),
+            'profundidad': rng.choice(PROFUNDIDADES_VEJIGA),
+            'dimension': g.medida(10.0),
+            'descripcion': g.texto(),
+        }
+    else:
+        loc_f['vejiga'] = {'presente': False}
+
+    if g.hay_hallazgo():
+        lados = g.opciones(LADOS_URETER)
+        loc_f['ureter'] = {
+            'presente': True,
+            'lados': lados,
+            'por_lado': {
+                lado.lower(): {'diametro': g.medida(20.0, 0.5), 'hidronefrosis': rng.choice(HIDRONEFROSIS)}
+                for lado in lados
+            },
+            'tipo_compromiso': rng.choice(TIPOS_COMPROMISO),
+            'descripcion': g.texto(),
+        }
+    else:
+        loc_f['ureter'] = {'presente': False}
+
+    if g.hay_hallazgo():
+        loc_f['intestino'] = {
+            'presente': True,
+            'localizaciones': g.opciones(LOCALIZACIONES_INTESTINO),
+            'dimension': g.medida(15.0),
+            'descripcion': g.texto(),
+        }
+    else:
+        loc_f['intestino'] = {'presente': False}
+
+    if g.hay_hallazgo():
+        loc_f['otras'] = {
+            'presente': True,
+            'tipos': g.opciones(TIPOS_OTRAS),
+        }
+    else:
+        loc_f['otras'] = {'presente': False}
+
+    return datos
+
+
+def generar_casos(n, clase='mixto', semilla=0):
+    """Genera n casos reproducibles de una clase"""
+    rng = random.Random(f"{clase}-{semilla}")
+    return [generar_caso(rng, clase) for _ in range(n)]
+
+
+def main(argv=None):
+    """Punto de entrada de la línea de comandos"""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.sinteticos',
+                                      description='Escribe borradores JSON sintéticos.')
+    parser.add_argument('directorio', help='Directorio de salida')
+    parser.add_argument('-n', '--casos', type=int, default=100, help='Número de casos por clase')
+    parser.add_argument('-c', '--clase', action='append', choices=CLASES,
+                        help='Clase de caso (por defecto, todas)')
+    parser.add_argument('-s', '--semilla', type=int, default=0, help='Semilla del generador')
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.directorio, exist_ok=True)
+    for clase in args.clase or CLASES:
+        for i, datos in enumerate(generar_casos(args.casos, clase, args.semilla)):
+            ruta = os.path.join(args.directorio, f"Borrador_{clase}_{i:06d}.json")
+            with open(ruta, 'w', encoding='utf-8') as f:
+                json.dump(datos, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""Motor de clasificación #Enzian y generación de reportes, independiente de Streamlit
+
+generar_reporte_word se importa bajo demanda: python-docx (y lxml) solo se
+cargan la primera vez que se genera un reporte, no al iniciar la aplicación.
+"""
+import importlib
+
+from .alertas import alertas_clinicas
+from .analizador import CodigoEnzianInvalido, analizar_codigo
+from .clasificacion import (
+    calcular_clasificacion_compartimento,
+    calcular_clasificacion_ovario,
+    validar_consistencia,
+)
+from .codigo import (
+    ComponentesEnzian,
+    desglose_enzian,
+    generar_codigo_enzian,
+    huella_codigo,
+    invalidar_cache_codigo,
+)
+from .modelo import SECCIONES, ReporteEnzian
+
+__all__ = [
+    'CodigoEnzianInvalido',
+    'ComponentesEnzian',
+    'ReporteEnzian',
+    'SECCIONES',
+    'alertas_clinicas',
+    'analizar_codigo',
+    'calcular_clasificacion_compartimento',
+    'calcular_clasificacion_ovario',
+    'desglose_enzian',
+    'generar_codigo_enzian',
+    'generar_reporte_word',
+    'huella_codigo',
+    'invalidar_cache_codigo',
+    'validar_consistencia',
+]
+
+# Nombres que se importan al primer uso: nombre -> módulo
+_BAJO_DEMANDA = {
+    'generar_reporte_word': '.documento',
+}
+
+
+def __getattr__(nombre):
+    if nombre in _BAJO_DEMANDA:
+        valor = getattr(importlib.import_module(_BAJO_DEMANDA[nombre], __name__), nombre)
+        globals()[nombre] = valor
+        return valor
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
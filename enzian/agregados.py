@@ -0,0 +1,213 @@
+"""Agregados incrementales sobre un archivo de reportes
+
+Cada caso se suma una sola vez a contadores de tamaño fijo:
+- casos con cada componente del código y con cada valor de componente,
+- histograma de diámetros de endometriomas (por pasos de 0.1 cm) y su
+  distribución O1/O2/O3 con los mismos límites de calcular_clasificacion_ovario(),
+- tabla cruzada del mayor grado B (de ambos lados) contra el grado C,
+- casos con cada alerta clínica y con alguna.
+
+Un caso es una cédula con una fecha de estudio: los borradores y el reporte
+final de un mismo estudio cuentan una vez, con el registro más reciente (la
+fila de mayor id o el archivo modificado más tarde). Al llegar una versión
+nueva se resta la anterior. Los reportes sin cédula cuentan cada uno aparte.
+
+Los percentiles se calculan sobre el histograma, así que ninguna consulta
+vuelve a recorrer los reportes. actualizar_desde_almacen() solo lee las
+filas con id mayor que la última agregada y actualizar_desde_borradores()
+solo los archivos que no se han agregado antes.
+"""
+import json
+import math
+import os
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .alertas import REGLAS_ALERTAS, claves_alertas
+from .clasificacion import calcular_clasificacion_ovario
+from .codigo import desglose_enzian
+from .indice_bitmap import claves_componentes
+from .modelo import ReporteEnzian, leer_borradores
+
+# Componentes del código en el orden en que aparecen
+COMPONENTES = ('P', 'O', 'T', 'A', 'B', 'C', 'FA', 'FB', 'FU', 'FI', 'F')
+
+# Histograma de diámetros: pasos de 0.1 cm hasta 30 cm; el último cubo acumula el resto
+PASO_DIAMETRO = 0.1
+CUBOS_DIAMETRO = 300
+
+
+def _grado(texto):
+    return int(texto[1:]) if texto else 0
+
+
+def _mayor_grado(par):
+    return max((int(g) for g in par if g in '0123'), default=0) if par else 0
+
+
+def _contar(contador, claves, signo):
+    for clave in claves:
+        contador[clave] += signo
+        if not contador[clave]:
+            del contador[clave]
+
+
+def clave_caso(reporte: ReporteEnzian) -> Optional[Tuple[str, str]]:
+    """Cédula y fecha del estudio que identifican un caso; None si el reporte no tiene cédula"""
+    cedula = str(reporte.paciente.get('cedula') or '').strip()
+    if not cedula:
+        return None
+    return cedula, str(reporte.paciente.get('fecha') or '')[:10]
+
+
+def _preparar(reporte):
+    """Todo lo que aporta un reporte, calculado antes de tocar los contadores"""
+    comp = desglose_enzian(reporte)
+    diametros = []
+    for ovario in reporte.ovarios.values():
+        if ovario.get('estado') != 'anormal':
+            continue
+        try:
+            diametro = float(ovario.get('diametro'))
+        except (TypeError, ValueError):
+            continue
+        if not math.isnan(diametro):
+            diametros.append(diametro)
+    return clave_caso(reporte), (comp, claves_componentes(comp), claves_alertas(reporte), diametros)
+
+
+class Agregados:
+    """Contadores que se actualizan reporte a reporte"""
+
+    def __init__(self):
+        self.total = 0
+        self.ultimo_id: Optional[int] = None
+        self.componentes: Counter = Counter()
+        self.valores: Counter = Counter()
+        self.alertas: Counter = Counter()
+        self.con_alertas = 0
+        self.diametros = [0] * (CUBOS_DIAMETRO + 1)
+        self.clases_ovario: Counter = Counter()
+        self.b_por_c = [[0] * 4 for _ in range(4)]
+        self._rutas = set()
+        # Caso -> (orden, aporte) de la versión que está sumada
+        self._casos: Dict[Tuple[str, str], Tuple[float, Any]] = {}
+        # Borradores que no se pudieron agregar: ruta -> error
+        self.omitidos: Dict[str, str] = {}
+        self._candado = threading.RLock()
+
+    def __repr__(self):
+        return f"Agregados({self.total} casos)"
+
+    def agregar(self, reporte: ReporteEnzian, orden: float = 0):
+        """Suma un reporte; si su caso ya estaba sumado, se queda la versión de mayor orden"""
+        self._incorporar(*_preparar(reporte), orden)
+
+    def _incorporar(self, caso, aporte, orden):
+        with self._candado:
+            if caso is not None:
+                anterior = self._casos.get(caso)
+                if anterior is not None:
+                    if anterior[0] > orden:
+                        return
+                    self._sumar(anterior[1], -1)
+                self._casos[caso] = (orden, aporte)
+            self._sumar(aporte)
+
+    def _sumar(self, aporte, signo=1):
+        comp, claves, alertas, diametros = aporte
+        _contar(self.valores, claves, signo)
+        _contar(self.componentes, (
+            componente for componente, valor in (
+                ('P', comp.p), ('O', comp.o), ('T', comp.t), ('A', comp.a), ('B', comp.b), ('C', comp.c),
+                ('FA', comp.fa), ('FB', comp.fb), ('FU', comp.fu), ('FI', comp.fi), ('F', comp.f),
+            ) if valor
+        ), signo)
+        _contar(self.alertas, alertas, signo)
+        self.con_alertas += signo * bool(alertas)
+
+        for diametro in diametros:
+            self.diametros[min(max(int(round(diametro / PASO_DIAMETRO)), 0), CUBOS_DIAMETRO)] += signo
+            _contar(self.clases_ovario, (calcular_clasificacion_ovario(diametro),), signo)
+
+        self.b_por_c[_mayor_grado(comp.b)][_grado(comp.c)] += signo
+        self.total += signo
+
+    def agregar_lote(self, registros: Iterable[Tuple[Any, ReporteEnzian]]) -> int:
+        """Suma pares (id, reporte) y devuelve cuántos se leyeron
+
+        Los ids enteros son filas del almacén, y el mayor id es la versión más reciente
+        de un caso; los de texto, rutas de borradores.
+        """
+        agregados = 0
+        with self._candado:
+            for id_registro, reporte in registros:
+                self.agregar(reporte, id_registro if isinstance(id_registro, int) else 0)
+                if isinstance(id_registro, int):
+                    self.ultimo_id = id_registro if self.ultimo_id is None else max(self.ultimo_id, id_registro)
+                else:
+                    self._rutas.add(id_registro)
+                agregados += 1
+        return agregados
+
+    def actualizar_desde_borradores(self, rutas) -> int:
+        """Agrega los borradores JSON que todavía no se han agregado
+
+        Un archivo solo queda como agregado si se lee y se suma sin errores; los que
+        fallan se anotan en omitidos y se vuelven a intentar en la siguiente actualización.
+        Entre borradores del mismo caso se queda el modificado más tarde.
+        """
+        agregados = 0
+        with self._candado:
+            pendientes = [ruta for ruta in rutas if str(ruta) not in self._rutas]
+            for ruta, (caso, aporte) in leer_borradores(pendientes, self.omitidos, _preparar):
+                self._incorporar(caso, aporte, os.stat(ruta).st_mtime)
+                self._rutas.add(ruta)
+                agregados += 1
+        return agregados
+
+    def actualizar_desde_almacen(self, almacen, tipo=None, bloque=1000) -> int:
+        """Agrega las filas del almacén posteriores a la última ya agregada"""
+        with self._candado, almacen.conexion() as con:
+            condiciones = ["id > ?"]
+            parametros: List[Any] = [self.ultimo_id or 0]
+            if tipo:
+                condiciones.append("tipo = ?")
+                parametros.append(tipo)
+            nuevos = 0
+            cursor = con.execute(
+                f"SELECT id, datos FROM reportes WHERE {' AND '.join(condiciones)} ORDER BY id", parametros
+            )
+            while True:
+                filas = cursor.fetchmany(bloque)
+                if not filas:
+                    break
+                nuevos += self.agregar_lote(
+                    (fila['id'], ReporteEnzian.desde_dict(json.loads(fila['datos']))) for fila in filas
+                )
+        return nuevos
+
+    def percentil(self, p: float) -> Optional[float]:
+        """Percentil p (0-100) del diámetro de endometriomas, en cm"""
+        total = sum(self.diametros)
+        if not total:
+            return None
+        objetivo = max(1, math.ceil(p / 100 * total))
+        acumulado = 0
+        for cubo, cantidad in enumerate(self.diametros):
+            acumulado += cantidad
+            if acumulado >= objetivo:
+                return round(cubo * PASO_DIAMETRO, 1)
+        return round(CUBOS_DIAMETRO * PASO_DIAMETRO, 1)
+
+    def tasas_alertas(self) -> Dict[str, Tuple[str, int, float]]:
+        """Por alerta: mensaje, casos y proporción sobre el total"""
+        return {
+            clave: (mensaje, self.alertas[clave], self.alertas[clave] / self.total if self.total else 0.0)
+            for clave, mensaje, _ in REGLAS_ALERTAS
+        }
+
+    def frecuencia_componentes(self) -> Dict[str, int]:
+        """Casos con cada componente del código"""
+        return {componente: self.componentes[componente] for componente in COMPONENTES}
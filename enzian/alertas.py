@@ -0,0 +1,53 @@
+"""Reglas de las alertas clínicas del reporte"""
+from typing import Callable, List, Tuple
+
+from .modelo import ReporteEnzian
+
+
+def _endometrioma_grande(ovario):
+    return ovario.get('estado') == 'anormal' and ovario.get('diametro', 0) > 7
+
+
+def _intestinal_multiple(reporte):
+    intestino = reporte.localizaciones_f.get('intestino', {})
+    return bool(intestino.get('presente')) and len(intestino.get('localizaciones', [])) > 1
+
+
+# (clave, mensaje, regla), en el orden en que se muestran
+REGLAS_ALERTAS: Tuple[Tuple[str, str, Callable[[ReporteEnzian], bool]], ...] = (
+    ('ureter', "⚠️ Compromiso ureteral - Valorar función renal",
+     lambda r: bool(r.localizaciones_f.get('ureter', {}).get('presente'))),
+    ('estenosis_rectal', "⚠️ Estenosis rectal presente",
+     lambda r: bool(r.compartimento_c.get('estenosis'))),
+    ('endometrioma_izquierdo', "⚠️ Endometrioma izquierdo >7cm",
+     lambda r: _endometrioma_grande(r.ovarios['izquierdo'])),
+    ('endometrioma_derecho', "⚠️ Endometrioma derecho >7cm",
+     lambda r: _endometrioma_grande(r.ovarios['derecho'])),
+    ('a3', "⚠️ Endometriosis profunda extensa (A3)",
+     lambda r: r.compartimento_a.get('clasificacion') in ['A3 (>3 cm)', 'A3']),
+    ('intestinal_multiple', "⚠️ Compromiso intestinal múltiple", _intestinal_multiple),
+)
+
+
+# Campos del reporte (rutas con puntos) que leen las reglas de alertas
+RUTAS_ALERTAS = (
+    'localizaciones_f.ureter.presente',
+    'compartimento_c.estenosis',
+    'ovarios.izquierdo.estado',
+    'ovarios.izquierdo.diametro',
+    'ovarios.derecho.estado',
+    'ovarios.derecho.diametro',
+    'compartimento_a.clasificacion',
+    'localizaciones_f.intestino.presente',
+    'localizaciones_f.intestino.localizaciones',
+)
+
+
+def claves_alertas(reporte: ReporteEnzian) -> List[str]:
+    """Claves de las alertas que dispara un reporte"""
+    return [clave for clave, _, regla in REGLAS_ALERTAS if regla(reporte)]
+
+
+def alertas_clinicas(reporte: ReporteEnzian) -> List[str]:
+    """Mensajes de las alertas clínicas de un reporte"""
+    return [mensaje for _, mensaje, regla in REGLAS_ALERTAS if regla(reporte)]
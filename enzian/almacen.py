@@ -0,0 +1,329 @@
+"""Almacén local SQLite de borradores y reportes finalizados
+
+Cada guardado se registra como una fila con los datos del paciente, el
+código #Enzian desglosado por componente (con índices para búsquedas), el
+JSON completo del caso y, para reportes finales, el DOCX generado.
+
+Las descripciones libres de cada compartimento y la indicación del estudio
+se indexan además en una tabla FTS5 (reportes_texto) con tokenización
+insensible a tildes, para búsquedas por texto ordenadas por relevancia.
+
+Las conexiones se reparten desde un pool acotado y pueden usarse desde
+cualquier hilo (Streamlit atiende cada sesión en un hilo distinto).
+"""
+import contextlib
+import json
+import queue
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .codigo import desglose_enzian, generar_codigo_enzian
+from .modelo import ReporteEnzian
+
+TIPOS = ('borrador', 'final')
+
+# Columnas por componente del código #Enzian
+COLUMNAS_COMPONENTES = (
+    'p', 'o_izq', 'o_der', 't_izq', 't_der', 'a', 'b_izq', 'b_der', 'c', 'fa', 'fb', 'fu', 'fi', 'f'
+)
+
+# Columnas del índice de texto libre, en el orden del reporte
+COLUMNAS_TEXTO = (
+    'indicacion', 'peritoneo', 'ovarios', 'tubos', 'compartimento_a', 'compartimento_b',
+    'compartimento_c', 'adenomiosis', 'vejiga', 'ureter', 'intestino', 'otras'
+)
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS reportes (
+    id INTEGER PRIMARY KEY,
+    tipo TEXT NOT NULL CHECK (tipo IN ('borrador', 'final')),
+    creado TEXT NOT NULL,
+    nombre TEXT,
+    cedula TEXT,
+    fecha_estudio TEXT,
+    medico TEXT,
+    codigo TEXT NOT NULL,
+    p INTEGER,
+    o_izq TEXT,
+    o_der TEXT,
+    t_izq INTEGER,
+    t_der INTEGER,
+    a INTEGER,
+    b_izq INTEGER,
+    b_der INTEGER,
+    c INTEGER,
+    fa INTEGER NOT NULL DEFAULT 0,
+    fb INTEGER NOT NULL DEFAULT 0,
+    fu TEXT,
+    fi TEXT,
+    f TEXT,
+    datos TEXT NOT NULL,
+    docx BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_reportes_cedula ON reportes (cedula, fecha_estudio);
+CREATE INDEX IF NOT EXISTS idx_reportes_fecha_estudio ON reportes (fecha_estudio);
+CREATE INDEX IF NOT EXISTS idx_reportes_medico ON reportes (medico, fecha_estudio);
+CREATE VIRTUAL TABLE IF NOT EXISTS reportes_texto USING fts5 (
+    """ + ", ".join(COLUMNAS_TEXTO) + """,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+""" + "".join(
+    f"CREATE INDEX IF NOT EXISTS idx_reportes_{columna} ON reportes ({columna});\n"
+    for columna in COLUMNAS_COMPONENTES
+)
+
+# Columnas devueltas en los listados (sin el JSON ni el DOCX)
+_COLUMNAS_LISTADO = (
+    "r.id, r.tipo, r.creado, r.nombre, r.cedula, r.fecha_estudio, r.medico, r.codigo, "
+    "r.docx IS NOT NULL AS tiene_docx"
+)
+
+def _grado(texto):
+    """Convierte "P2", "B3", etc. en el entero del grado"""
+    return int(texto[1:]) if texto else None
+
+
+def columnas_componentes(reporte: ReporteEnzian) -> Dict[str, Any]:
+    """Valores de las columnas por componente para un reporte"""
+    comp = desglose_enzian(reporte)
+    o_izq, o_der = comp.o if comp.o else (None, None)
+    t_izq, t_der = comp.t if comp.t else (None, None)
+    b_izq, b_der = comp.b if comp.b else (None, None)
+    return {
+        'p': _grado(comp.p),
+        'o_izq': o_izq,
+        'o_der': o_der,
+        't_izq': int(t_izq) if t_izq else None,
+        't_der': int(t_der) if t_der else None,
+        'a': _grado(comp.a),
+        'b_izq': int(b_izq) if b_izq else None,
+        'b_der': int(b_der) if b_der else None,
+        'c': _grado(comp.c),
+        'fa': int(comp.fa),
+        'fb': int(comp.fb),
+        'fu': ','.join(comp.fu) or None,
+        'fi': '|'.join(comp.fi) or None,
+        'f': '|'.join(comp.f) or None,
+    }
+
+
+def _unir(*textos):
+    """Une los textos no vacíos, uno por línea"""
+    return '\n'.join(t.strip() for t in textos if t and t.strip())
+
+
+def textos_libres(reporte: ReporteEnzian) -> Dict[str, str]:
+    """Textos libres del reporte por columna del índice FTS"""
+    loc_f = reporte.localizaciones_f
+    otras = loc_f.get('otras', {})
+    return {
+        'indicacion': _unir(reporte.paciente.get('indicacion')),
+        'peritoneo': _unir(reporte.peritoneo.get('descripcion')),
+        'ovarios': _unir(*(reporte.ovarios[lado].get('descripcion') for lado in ('derecho', 'izquierdo'))),
+        'tubos': _unir(*(reporte.tubos[lado].get('descripcion') for lado in ('derecho', 'izquierdo'))),
+        'compartimento_a': _unir(reporte.compartimento_a.get('descripcion')),
+        'compartimento_b': _unir(*(reporte.compartimento_b[lado].get('descripcion') for lado in ('derecho', 'izquierdo'))),
+        'compartimento_c': _unir(reporte.compartimento_c.get('descripcion')),
+        'adenomiosis': _unir(loc_f.get('adenomiosis', {}).get('descripcion')),
+        'vejiga': _unir(loc_f.get('vejiga', {}).get('descripcion')),
+        'ureter': _unir(loc_f.get('ureter', {}).get('descripcion')),
+        'intestino': _unir(loc_f.get('intestino', {}).get('descripcion')),
+        'otras': _unir(*otras.get('descripciones', {}).values()),
+    }
+
+
+def consulta_fts(texto: str) -> str:
+    """Convierte lo que escribe el usuario en una consulta FTS5 segura
+
+    Cada palabra se busca tal cual (todas deben aparecer), las frases entre
+    comillas se buscan juntas y un * final busca por prefijo: nódulo "en torus" ovar*
+    """
+    terminos = []
+    for frase, palabra in re.findall(r'"([^"]*)"|(\S+)', texto):
+        termino = frase if frase else palabra.replace('"', '')
+        prefijo = not frase and termino.endswith('*')
+        termino = termino.rstrip('*').strip()
+        if termino:
+            terminos.append(f'"{termino}"' + ('*' if prefijo else ''))
+    return ' '.join(terminos)
+
+
+class Almacen:
+    """Almacén SQLite con un pool de conexiones seguro entre hilos"""
+
+    def __init__(self, ruta, tamano_pool=4, timeout=30.0):
+        self.ruta = str(ruta)
+        # Una base en memoria solo existe dentro de su conexión: se usa una sola
+        self.tamano_pool = 1 if self.ruta == ':memory:' else tamano_pool
+        self.timeout = timeout
+        self._libres = queue.LifoQueue()
+        self._todas = []
+        self._candado = threading.Lock()
+        with self.conexion() as con:
+            con.executescript(_ESQUEMA)
+            self._indexar_pendientes(con)
+
+    def _conectar(self):
+        con = sqlite3.connect(
+            self.ruta,
+            timeout=self.timeout,
+            check_same_thread=False,
+        )
+        con.row_factory = sqlite3.Row
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        return con
+
+    def _obtener(self):
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            pass
+        with self._candado:
+            if len(self._todas) < self.tamano_pool:
+                con = self._conectar()
+                self._todas.append(con)
+                return con
+        try:
+            return self._libres.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError("No hay conexiones libres en el pool del almacén") from None
+
+    def _indexar_texto(self, con, id_reporte, reporte):
+        textos = textos_libres(reporte)
+        columnas = ', '.join(textos)
+        marcadores = ', '.join(f':{columna}' for columna in textos)
+        con.execute(
+            f"INSERT INTO reportes_texto (rowid, {columnas}) VALUES (:rowid, {marcadores})",
+            {'rowid': id_reporte, **textos},
+        )
+
+    def _indexar_pendientes(self, con):
+        """Indexa los registros guardados antes de existir el índice de texto"""
+        filas = con.execute(
+            "SELECT id, datos FROM reportes WHERE id NOT IN (SELECT rowid FROM reportes_texto)"
+        ).fetchall()
+        for fila in filas:
+            self._indexar_texto(con, fila['id'], ReporteEnzian.desde_dict(json.loads(fila['datos'])))
+
+    @contextlib.contextmanager
+    def conexion(self):
+        """Presta una conexión del pool; confirma al salir o revierte si hay error"""
+        con = self._obtener()
+        try:
+            yield con
+            con.commit()
+        except BaseException:
+            con.rollback()
+            raise
+        finally:
+            self._libres.put(con)
+
+    def cerrar(self):
+        """Cierra todas las conexiones del pool"""
+        with self._candado:
+            for con in self._todas:
+                con.close()
+            self._todas.clear()
+            self._libres = queue.LifoQueue()
+
+    def guardar(self, datos: Dict[str, Any], tipo='borrador', docx: Optional[bytes] = None) -> int:
+        """Guarda un borrador o un reporte final y devuelve su id"""
+        if tipo not in TIPOS:
+            raise ValueError(f"Tipo de registro desconocido: {tipo!r} (opciones: {', '.join(TIPOS)})")
+        reporte = ReporteEnzian.desde_dict(datos)
+        paciente = reporte.paciente
+        fila = {
+            'tipo': tipo,
+            'creado': datetime.now().isoformat(timespec='seconds'),
+            'nombre': paciente.get('nombre') or None,
+            'cedula': paciente.get('cedula') or None,
+            'fecha_estudio': str(paciente['fecha'])[:10] if paciente.get('fecha') else None,
+            'medico': paciente.get('medico') or None,
+            'codigo': generar_codigo_enzian(reporte),
+            **columnas_componentes(reporte),
+            'datos': json.dumps(reporte.a_dict(), ensure_ascii=False, default=str),
+            'docx': docx,
+        }
+        columnas = ', '.join(fila)
+        marcadores = ', '.join(f':{columna}' for columna in fila)
+        with self.conexion() as con:
+            cursor = con.execute(f"INSERT INTO reportes ({columnas}) VALUES ({marcadores})", fila)
+            self._indexar_texto(con, cursor.lastrowid, reporte)
+            return cursor.lastrowid
+
+    def obtener(self, id_reporte: int) -> Optional[Dict[str, Any]]:
+        """Devuelve un registro completo, con los datos del caso ya decodificados"""
+        with self.conexion() as con:
+            fila = con.execute("SELECT * FROM reportes WHERE id = ?", (id_reporte,)).fetchone()
+        if fila is None:
+            return None
+        registro = dict(fila)
+        registro['datos'] = json.loads(registro['datos'])
+        return registro
+
+    def docx(self, id_reporte: int) -> Optional[bytes]:
+        """Devuelve el DOCX de un reporte final, si lo tiene"""
+        with self.conexion() as con:
+            fila = con.execute("SELECT docx FROM reportes WHERE id = ?", (id_reporte,)).fetchone()
+        return fila['docx'] if fila else None
+
+    def buscar(self, cedula=None, medico=None, desde=None, hasta=None, tipo=None, limite=100) -> List[Dict[str, Any]]:
+        """Lista registros filtrando por cédula, médico, rango de fechas y tipo"""
+        condiciones = []
+        parametros = []
+        if cedula:
+            condiciones.append("cedula = ?")
+            parametros.append(cedula)
+        if medico:
+            condiciones.append("medico = ?")
+            parametros.append(medico)
+        if desde:
+            condiciones.append("fecha_estudio >= ?")
+            parametros.append(str(desde))
+        if hasta:
+            condiciones.append("fecha_estudio <= ?")
+            parametros.append(str(hasta))
+        if tipo:
+            condiciones.append("tipo = ?")
+            parametros.append(tipo)
+        donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        with self.conexion() as con:
+            filas = con.execute(
+                f"SELECT {_COLUMNAS_LISTADO} FROM reportes r {donde} "
+                f"ORDER BY fecha_estudio DESC, id DESC LIMIT ?",
+                (*parametros, limite),
+            ).fetchall()
+        return [dict(fila) for fila in filas]
+
+    def buscar_por_cedula(self, cedula, limite=100) -> List[Dict[str, Any]]:
+        """Estudios previos de una paciente, del más reciente al más antiguo"""
+        return self.buscar(cedula=cedula, limite=limite)
+
+    def buscar_texto(self, texto: str, limite=50) -> List[Dict[str, Any]]:
+        """Busca en las descripciones e indicaciones, de más a menos relevante
+
+        Cada resultado incluye su puntuación bm25 (relevancia, menor es mejor)
+        y un fragmento con los términos encontrados entre **.
+        """
+        consulta = consulta_fts(texto)
+        if not consulta:
+            return []
+        with self.conexion() as con:
+            filas = con.execute(
+                f"SELECT {_COLUMNAS_LISTADO}, "
+                "bm25(reportes_texto) AS relevancia, "
+                "snippet(reportes_texto, -1, '**', '**', '…', 12) AS fragmento "
+                "FROM reportes_texto JOIN reportes r ON r.id = reportes_texto.rowid "
+                "WHERE reportes_texto MATCH ? ORDER BY relevancia LIMIT ?",
+                (consulta, limite),
+            ).fetchall()
+        return [dict(fila) for fila in filas]
+
+    def contar(self) -> int:
+        """Número total de registros"""
+        with self.conexion() as con:
+            return con.execute("SELECT COUNT(*) FROM reportes").fetchone()[0]
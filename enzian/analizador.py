@@ -0,0 +1,174 @@
+"""Análisis de códigos #Enzian en texto hacia su desglose por componente
+
+Es la operación inversa de generar_codigo_enzian(): para todo código
+generado, analizar_codigo(codigo).codigo() == codigo.
+
+Gramática aceptada (estricta, en una sola pasada):
+
+    codigo      := "#Enzian(" modalidad ") " (componentes | "Sin hallazgos de endometriosis")
+    modalidad   := "u" | "s" | "m"
+    componentes := componente (", " componente)*
+    componente  := "P" g | "O" lado "/" lado | "T" l "/" l | "A" g | "B" l "/" l | "C" g
+                 | "FA" | "FB" | "FU(" ("r" | "l") ")" | "FI(" nombre ")" | "F(" nombre ")"
+
+donde g es 1-3, l es 0-3, lado es 0-3 o "x", y los componentes aparecen en
+el orden P, O, T, A, B, C, FA, FB, FU, FI, F (solo FU, FI y F se repiten).
+"""
+from .codigo import SIN_HALLAZGOS, ComponentesEnzian
+
+MODALIDADES = ('u', 's', 'm')
+
+# Orden de los componentes en el código
+_ORDEN = {'P': 0, 'O': 1, 'T': 2, 'A': 3, 'B': 4, 'C': 5, 'FA': 6, 'FB': 7, 'FU': 8, 'FI': 9, 'F': 10}
+_REPETIBLES = ('FU', 'FI', 'F')
+
+_GRADOS = '123'
+_GRADOS_LADO = '0123'
+_GRADOS_OVARIO = '0123x'
+
+
+class CodigoEnzianInvalido(ValueError):
+    """El texto no es un código #Enzian válido"""
+
+    def __init__(self, mensaje, texto, posicion):
+        self.mensaje = mensaje
+        self.texto = texto
+        self.posicion = posicion
+        super().__init__(f"{mensaje} (posición {posicion}): {texto!r}")
+
+
+class _Analizador:
+    """Recorre el texto una sola vez, carácter por carácter"""
+
+    __slots__ = ('texto', 'pos')
+
+    def __init__(self, texto):
+        self.texto = texto
+        self.pos = 0
+
+    def error(self, mensaje, posicion=None):
+        raise CodigoEnzianInvalido(mensaje, self.texto, self.pos if posicion is None else posicion)
+
+    def esperar(self, literal):
+        if not self.texto.startswith(literal, self.pos):
+            self.error(f"Se esperaba {literal!r}")
+        self.pos += len(literal)
+
+    def caracter(self, permitidos, descripcion):
+        if self.pos >= len(self.texto) or self.texto[self.pos] not in permitidos:
+            self.error(f"Se esperaba {descripcion}")
+        c = self.texto[self.pos]
+        self.pos += 1
+        return c
+
+    def nombre(self):
+        """Lee un nombre libre hasta el paréntesis de cierre"""
+        fin = self.texto.find(')', self.pos)
+        if fin == -1:
+            self.error("Falta ')'")
+        nombre = self.texto[self.pos:fin]
+        if not nombre or nombre != nombre.strip():
+            self.error("Nombre de localización vacío o con espacios en los extremos")
+        for c in ',(':
+            if c in nombre:
+                self.error(f"Carácter {c!r} no permitido en el nombre", self.pos + nombre.index(c))
+        self.pos = fin + 1
+        return nombre
+
+    def par(self, permitidos, descripcion):
+        """Lee "izq/der" y exige al menos un lado con grado 1-3"""
+        inicio = self.pos
+        izq = self.caracter(permitidos, descripcion)
+        self.esperar('/')
+        der = self.caracter(permitidos, descripcion)
+        if izq not in _GRADOS and der not in _GRADOS:
+            self.error("Al menos un lado debe tener grado 1-3", inicio)
+        return izq, der
+
+    def componente(self, resultado):
+        """Lee un componente, lo agrega al resultado y devuelve su tipo"""
+        inicio = self.pos
+        if self.pos >= len(self.texto):
+            self.error("Se esperaba un componente")
+        letra = self.texto[self.pos]
+        self.pos += 1
+
+        if letra == 'P':
+            resultado.p = 'P' + self.caracter(_GRADOS, "grado P (1-3)")
+            return 'P'
+        if letra == 'O':
+            resultado.o = self.par(_GRADOS_OVARIO, "grado O (0-3 o x)")
+            return 'O'
+        if letra == 'T':
+            resultado.t = self.par(_GRADOS_LADO, "grado T (0-3)")
+            return 'T'
+        if letra == 'A':
+            resultado.a = 'A' + self.caracter(_GRADOS, "grado A (1-3)")
+            return 'A'
+        if letra == 'B':
+            resultado.b = self.par(_GRADOS_LADO, "grado B (0-3)")
+            return 'B'
+        if letra == 'C':
+            resultado.c = 'C' + self.caracter(_GRADOS, "grado C (1-3)")
+            return 'C'
+        if letra == 'F':
+            siguiente = self.texto[self.pos:self.pos + 2]
+            if siguiente[:1] == 'A':
+                self.pos += 1
+                resultado.fa = True
+                return 'FA'
+            if siguiente[:1] == 'B':
+                self.pos += 1
+                resultado.fb = True
+                return 'FB'
+            if siguiente == 'U(':
+                self.pos += 2
+                lado = self.caracter('rl', "lado de uréter ('r' o 'l')")
+                self.esperar(')')
+                if lado in resultado.fu:
+                    self.error(f"FU({lado}) repetido", inicio)
+                resultado.fu += (lado,)
+                return 'FU'
+            if siguiente == 'I(':
+                self.pos += 2
+                resultado.fi += (self.nombre(),)
+                return 'FI'
+            if siguiente[:1] == '(':
+                self.pos += 1
+                resultado.f += (self.nombre(),)
+                return 'F'
+        self.error("Componente desconocido", inicio)
+
+    def codigo(self):
+        self.esperar('#Enzian(')
+        modalidad = self.caracter(MODALIDADES, f"modalidad ({', '.join(MODALIDADES)})")
+        self.esperar(') ')
+        resultado = ComponentesEnzian(modalidad=modalidad)
+
+        if self.texto.startswith(SIN_HALLAZGOS, self.pos):
+            self.pos += len(SIN_HALLAZGOS)
+        else:
+            anterior = -1
+            while True:
+                inicio = self.pos
+                tipo = self.componente(resultado)
+                orden = _ORDEN[tipo]
+                if orden < anterior or (orden == anterior and tipo not in _REPETIBLES):
+                    self.error(f"Componente {tipo} fuera de orden o repetido", inicio)
+                anterior = orden
+                if self.pos == len(self.texto):
+                    break
+                self.esperar(', ')
+
+        if self.pos != len(self.texto):
+            self.error("Texto sobrante al final del código")
+        return resultado
+
+
+def analizar_codigo(texto: str) -> ComponentesEnzian:
+    """Convierte un código #Enzian en su desglose por componente
+
+    Ignora espacios al inicio y al final; cualquier otra desviación de la
+    gramática lanza CodigoEnzianInvalido con la posición del error.
+    """
+    return _Analizador(texto.strip()).codigo()
@@ -0,0 +1,30 @@
+"""Reglas de clasificación #Enzian según las mediciones"""
+
+
+def calcular_clasificacion_ovario(diametro):
+    """Calcula la clasificación O según el diámetro"""
+    if diametro < 3:
+        return "O1"
+    elif 3 <= diametro <= 7:
+        return "O2"
+    else:
+        return "O3"
+
+
+def calcular_clasificacion_compartimento(medida):
+    """Calcula clasificación para compartimentos A, B, C"""
+    if medida < 1:
+        return "1"
+    elif 1 <= medida <= 3:
+        return "2"
+    else:
+        return "3"
+
+
+def validar_consistencia(compartimento, medida, clasificacion_manual):
+    """Valida que la clasificación manual coincida con la medida"""
+    if compartimento in ['A', 'B', 'C']:
+        clasificacion_calculada = calcular_clasificacion_compartimento(medida)
+        if clasificacion_calculada != clasificacion_manual:
+            return False, f"⚠️ Inconsistencia: La medida {medida}cm sugiere clasificación {clasificacion_calculada}, pero seleccionaste {clasificacion_manual}"
+    return True, ""
@@ -0,0 +1,222 @@
+"""Generación del código #Enzian a partir de un reporte"""
+import functools
+import hashlib
+from typing import Optional, Tuple
+
+from .modelo import ReporteEnzian
+
+SIN_HALLAZGOS = "Sin hallazgos de endometriosis"
+
+
+class ComponentesEnzian:
+    """Desglose del código #Enzian por componente
+
+    Las clases se guardan tal como aparecen en el código: `p`, `a` y `c` como
+    "P2", "A1", "C3"; `o`, `t` y `b` como pares (izquierdo, derecho) de
+    "0"-"3" o "x". Las instancias se comparten entre llamadas memoizadas y no
+    deben modificarse.
+    """
+
+    __slots__ = ('modalidad', 'p', 'o', 't', 'a', 'b', 'c', 'fa', 'fb', 'fu', 'fi', 'f')
+
+    modalidad: str
+    p: Optional[str]
+    o: Optional[Tuple[str, str]]
+    t: Optional[Tuple[str, str]]
+    a: Optional[str]
+    b: Optional[Tuple[str, str]]
+    c: Optional[str]
+    fa: bool
+    fb: bool
+    fu: Tuple[str, ...]
+    fi: Tuple[str, ...]
+    f: Tuple[str, ...]
+
+    def __init__(self, modalidad='u', p=None, o=None, t=None, a=None, b=None, c=None,
+                 fa=False, fb=False, fu=(), fi=(), f=()):
+        self.modalidad = modalidad
+        self.p = p
+        self.o = o
+        self.t = t
+        self.a = a
+        self.b = b
+        self.c = c
+        self.fa = fa
+        self.fb = fb
+        self.fu = tuple(fu)
+        self.fi = tuple(fi)
+        self.f = tuple(f)
+
+    def lista(self):
+        """Devuelve los componentes como texto, en el orden del código"""
+        componentes = []
+        if self.p:
+            componentes.append(self.p)
+        if self.o:
+            componentes.append(f"O{self.o[0]}/{self.o[1]}")
+        if self.t:
+            componentes.append(f"T{self.t[0]}/{self.t[1]}")
+        if self.a:
+            componentes.append(self.a)
+        if self.b:
+            componentes.append(f"B{self.b[0]}/{self.b[1]}")
+        if self.c:
+            componentes.append(self.c)
+        if self.fa:
+            componentes.append("FA")
+        if self.fb:
+            componentes.append("FB")
+        componentes.extend(f"FU({lado})" for lado in self.fu)
+        componentes.extend(f"FI({loc})" for loc in self.fi)
+        componentes.extend(f"F({tipo})" for tipo in self.f)
+        return componentes
+
+    def codigo(self):
+        """Devuelve el código #Enzian completo"""
+        componentes = self.lista()
+        return f"#Enzian({self.modalidad}) " + (", ".join(componentes) if componentes else SIN_HALLAZGOS)
+
+    def _clave(self):
+        return tuple(getattr(self, nombre) for nombre in self.__slots__)
+
+    def __eq__(self, otro):
+        if not isinstance(otro, ComponentesEnzian):
+            return NotImplemented
+        return self._clave() == otro._clave()
+
+    def __hash__(self):
+        return hash(self._clave())
+
+    def __repr__(self):
+        return f"ComponentesEnzian({self.codigo()!r})"
+
+
+def _campos_codigo(reporte: ReporteEnzian):
+    """Extrae, como tupla inmutable, solo los campos de los que depende el código"""
+    def estado(seccion):
+        return (seccion.get('estado'), seccion.get('clasificacion'))
+
+    loc_f = reporte.localizaciones_f
+
+    def presente(clave, lista=None):
+        datos = loc_f.get(clave, {})
+        if not datos.get('presente'):
+            return (False, ())
+        return (True, tuple(datos.get(lista, [])) if lista else ())
+
+    return (
+        estado(reporte.peritoneo),
+        estado(reporte.ovarios['izquierdo']),
+        estado(reporte.ovarios['derecho']),
+        estado(reporte.tubos['izquierdo']),
+        estado(reporte.tubos['derecho']),
+        estado(reporte.compartimento_a),
+        estado(reporte.compartimento_b['izquierdo']),
+        estado(reporte.compartimento_b['derecho']),
+        estado(reporte.compartimento_c),
+        presente('adenomiosis'),
+        presente('vejiga'),
+        presente('ureter', 'lados'),
+        presente('intestino', 'localizaciones'),
+        presente('otras', 'tipos'),
+    )
+
+
+def huella_codigo(reporte: ReporteEnzian) -> str:
+    """Huella estable (SHA-1) de los campos de los que depende el código"""
+    return hashlib.sha1(repr(_campos_codigo(reporte)).encode('utf-8')).hexdigest()
+
+
+def _clase(estado_clasificacion, por_defecto):
+    """Devuelve la clasificación registrada, o la de por defecto si falta"""
+    clasificacion = estado_clasificacion[1]
+    return clasificacion if clasificacion is not None else por_defecto
+
+
+@functools.lru_cache(maxsize=512)
+def _componentes_desde_campos(campos) -> ComponentesEnzian:
+    """Calcula el desglose a partir de la tupla de campos (memoizado)"""
+    (peritoneo, ovario_izq, ovario_der, tubo_izq, tubo_der, comp_a,
+     lsu_izq, lsu_der, comp_c, adenomiosis, vejiga, ureter, intestino, otras) = campos
+    componentes = ComponentesEnzian()
+
+    # Peritoneo (P)
+    if peritoneo[0] == 'anormal':
+        componentes.p = _clase(peritoneo, 'P1').split()[0]
+
+    # Ovarios (O)
+    if ovario_izq[0] == 'anormal' or ovario_der[0] == 'anormal':
+        clase_izq = "0"
+        clase_der = "0"
+
+        if ovario_izq[0] == 'anormal':
+            clase_izq = _clase(ovario_izq, 'O1')[1]
+        elif ovario_izq[0] == 'no_visualizado':
+            clase_izq = "x"
+
+        if ovario_der[0] == 'anormal':
+            clase_der = _clase(ovario_der, 'O1')[1]
+        elif ovario_der[0] == 'no_visualizado':
+            clase_der = "x"
+
+        componentes.o = (clase_izq, clase_der)
+
+    # Tubos (T)
+    if tubo_izq[0] == 'anormal' or tubo_der[0] == 'anormal':
+        clase_izq = _clase(tubo_izq, 'T1')[1] if tubo_izq[0] == 'anormal' else "0"
+        clase_der = _clase(tubo_der, 'T1')[1] if tubo_der[0] == 'anormal' else "0"
+        componentes.t = (clase_izq, clase_der)
+
+    # Compartimento A
+    if comp_a[0] == 'anormal':
+        componentes.a = _clase(comp_a, 'A1').split()[0]
+
+    # Compartimento B
+    if lsu_izq[0] == 'anormal' or lsu_der[0] == 'anormal':
+        clase_izq = _clase(lsu_izq, 'B1')[1] if lsu_izq[0] == 'anormal' else "0"
+        clase_der = _clase(lsu_der, 'B1')[1] if lsu_der[0] == 'anormal' else "0"
+        componentes.b = (clase_izq, clase_der)
+
+    # Compartimento C
+    if comp_c[0] == 'anormal':
+        componentes.c = _clase(comp_c, 'C1').split()[0]
+
+    # Localizaciones F
+    componentes.fa = adenomiosis[0]
+    componentes.fb = vejiga[0]
+    componentes.fu = tuple('r' if lado == 'Derecho' else 'l' for lado in ureter[1])
+
+    fi = []
+    for loc in intestino[1]:
+        if 'Sigma' in loc:
+            fi.append("Sigma")
+        elif 'Apéndice' in loc:
+            fi.append("Apéndice")
+        else:
+            fi.append(loc)
+    componentes.fi = tuple(fi)
+    componentes.f = otras[1]
+
+    return componentes
+
+
+def desglose_enzian(reporte: ReporteEnzian) -> ComponentesEnzian:
+    """Devuelve el desglose por componente del código #Enzian (memoizado)"""
+    return _componentes_desde_campos(_campos_codigo(reporte))
+
+
+def generar_codigo_enzian(reporte: ReporteEnzian) -> str:
+    """Genera el código #Enzian(u) del reporte (memoizado)"""
+    return _codigo_desde_campos(_campos_codigo(reporte))
+
+
+@functools.lru_cache(maxsize=512)
+def _codigo_desde_campos(campos) -> str:
+    """Texto del código a partir de la tupla de campos (memoizado)"""
+    return _componentes_desde_campos(campos).codigo()
+
+
+def invalidar_cache_codigo():
+    """Vacía las cachés de código y desglose"""
+    _componentes_desde_campos.cache_clear()
+    _codigo_desde_campos.cache_clear()
@@ -0,0 +1,578 @@
+"""Filtros de cohortes con un lenguaje de consulta compilado
+
+Una consulta combina condiciones sobre el código #Enzian y sobre los campos
+del reporte:
+
+    C >= 2 and ovario.der.diametro > 7 and ureter.hidronefrosis
+    (B.izq = 3 or B.der = 3) and not FB and c.profundidad = 'Mucosa'
+
+Gramática (descenso recursivo):
+
+    expresion   := disyuncion
+    disyuncion  := conjuncion ("or" conjuncion)*
+    conjuncion  := negacion ("and" negacion)*
+    negacion    := "not" negacion | atomo
+    atomo       := "(" expresion ")" | campo [operador valor]
+    operador    := "=" | "==" | "!=" | "<" | "<=" | ">" | ">="
+    valor       := número | 'texto' | "texto" | true | false
+
+Un campo sin operador es verdadero si el valor es verdadero o mayor que 0.
+
+compilar() valida la consulta contra el catálogo de campos y devuelve un
+plan: los componentes del código (P, O, T, A, B, C, FA, FB, FU, FI, F) se
+resuelven con el índice de bitmaps y el resto de campos con comparaciones
+NumPy sobre columnas que se extraen una sola vez por cohorte. En cada
+"and" se evalúan primero las ramas del índice y se corta en cuanto el
+resultado queda vacío.
+"""
+import functools
+import json
+import math
+import operator
+import re
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .alertas import REGLAS_ALERTAS
+from .codigo import desglose_enzian
+from .indice_bitmap import IndiceBitmap, contar, posiciones
+from .modelo import ReporteEnzian, leer_borradores
+from .vectorial import clasificar_cohorte, etiquetas
+
+
+class ConsultaInvalida(ValueError):
+    """El texto no es una consulta de cohortes válida"""
+
+    def __init__(self, mensaje, texto, posicion):
+        self.mensaje = mensaje
+        self.texto = texto
+        self.posicion = posicion
+        super().__init__(f"{mensaje} (posición {posicion}): {texto!r}")
+
+
+# Catálogo de campos
+
+def _numero(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _maximo(*valores):
+    valores = [v for v in valores if not math.isnan(v)]
+    return max(valores) if valores else math.nan
+
+
+_HIDRONEFROSIS = {'Ausente': 0, 'Leve': 1, 'Moderada': 2, 'Severa': 3}
+
+_LADOS = {'izq': 'izquierdo', 'der': 'derecho'}
+
+
+def _ureter_lado(reporte, lado, clave):
+    datos = reporte.localizaciones_f.get('ureter', {}).get('por_lado', {}).get(lado, {})
+    if clave == 'hidronefrosis':
+        return _numero(_HIDRONEFROSIS.get(datos.get('hidronefrosis')))
+    return _numero(datos.get(clave))
+
+
+def _f(reporte, clave):
+    return reporte.localizaciones_f.get(clave, {})
+
+
+# nombre -> (tipo, extractor); tipo es 'numero', 'booleano' o 'texto'
+CAMPOS: Dict[str, Tuple[str, Callable[[ReporteEnzian], Any]]] = {
+    'edad': ('numero', lambda r: _numero(r.paciente.get('edad'))),
+    'medico': ('texto', lambda r: r.paciente.get('medico')),
+    'peritoneo.diametro': ('numero', lambda r: _numero(r.peritoneo.get('diametro'))),
+    'a.diametro': ('numero', lambda r: _numero(r.compartimento_a.get('diametro'))),
+    'c.longitud': ('numero', lambda r: _numero(r.compartimento_c.get('longitud'))),
+    'c.distancia_anal': ('numero', lambda r: _numero(r.compartimento_c.get('distancia_anal'))),
+    'c.circunferencia': ('numero', lambda r: _numero(r.compartimento_c.get('circunferencia'))),
+    'c.estenosis': ('booleano', lambda r: bool(r.compartimento_c.get('estenosis'))),
+    'c.profundidad': ('texto', lambda r: r.compartimento_c.get('profundidad')),
+    'adenomiosis.criterios': ('numero', lambda r: float(len(_f(r, 'adenomiosis').get('criterios_musa', [])))),
+    'vejiga.dimension': ('numero', lambda r: _numero(_f(r, 'vejiga').get('dimension'))),
+    'vejiga.profundidad': ('texto', lambda r: _f(r, 'vejiga').get('profundidad')),
+    'ureter.presente': ('booleano', lambda r: bool(_f(r, 'ureter').get('presente'))),
+    'ureter.diametro': ('numero', lambda r: _maximo(
+        _ureter_lado(r, 'izquierdo', 'diametro'), _ureter_lado(r, 'derecho', 'diametro'))),
+    'ureter.hidronefrosis': ('numero', lambda r: _maximo(
+        _ureter_lado(r, 'izquierdo', 'hidronefrosis'), _ureter_lado(r, 'derecho', 'hidronefrosis'))),
+    'intestino.dimension': ('numero', lambda r: _numero(_f(r, 'intestino').get('dimension'))),
+    'intestino.localizaciones': ('numero', lambda r: float(len(_f(r, 'intestino').get('localizaciones', [])))),
+}
+for _corto, _lado in _LADOS.items():
+    CAMPOS.update({
+        f'ovario.{_corto}.diametro': ('numero', lambda r, l=_lado: _numero(r.ovarios[l].get('diametro'))),
+        f'ovario.{_corto}.num_endometriomas': (
+            'numero', lambda r, l=_lado: _numero(r.ovarios[l].get('num_endometriomas'))),
+        f'b.{_corto}.diametro': ('numero', lambda r, l=_lado: _numero(r.compartimento_b[l].get('diametro_max'))),
+        f'b.{_corto}.distancia_cervix': (
+            'numero', lambda r, l=_lado: _numero(r.compartimento_b[l].get('distancia_cervix'))),
+        f'ureter.{_corto}.diametro': ('numero', lambda r, l=_lado: _ureter_lado(r, l, 'diametro')),
+        f'ureter.{_corto}.hidronefrosis': ('numero', lambda r, l=_lado: _ureter_lado(r, l, 'hidronefrosis')),
+    })
+# Las mismas alertas de la pestaña Generar Reporte: alerta.ureter, alerta.a3, ...
+CAMPOS.update({f'alerta.{clave}': ('booleano', regla) for clave, _, regla in REGLAS_ALERTAS})
+
+# Medidas con las que la aplicación sugiere una clase: columna de clasificar_cohorte() -> (campo, prefijo)
+MEDIDAS_CLASES = {
+    'ovario_izq': ('ovario.izq.diametro', 'O'),
+    'ovario_der': ('ovario.der.diametro', 'O'),
+    'a': ('a.diametro', 'A'),
+    'b_izq': ('b.izq.diametro', 'B'),
+    'b_der': ('b.der.diametro', 'B'),
+    'c': ('c.longitud', 'C'),
+}
+
+# Componentes del código resueltos con el índice: nombre -> (componente, lado)
+COMPONENTES_GRADO = {
+    'p': ('P', None), 'a': ('A', None), 'c': ('C', None),
+    'o': ('O', None), 'o.izq': ('O', 'izq'), 'o.der': ('O', 'der'),
+    't': ('T', None), 't.izq': ('T', 'izq'), 't.der': ('T', 'der'),
+    'b': ('B', None), 'b.izq': ('B', 'izq'), 'b.der': ('B', 'der'),
+}
+COMPONENTES_PRESENCIA = {
+    'fa': lambda i: i.bitmap('FA'),
+    'fb': lambda i: i.bitmap('FB'),
+    'fu': lambda i: i.fu(),
+    'fu.izq': lambda i: i.fu('l'),
+    'fu.der': lambda i: i.fu('r'),
+    'fi': lambda i: i.fi(),
+    'f': lambda i: i.f(),
+}
+# Componentes que además se comparan con un nombre: FI = 'Sigma (>16cm)'
+_COMPONENTES_NOMBRE = {'fi': 'FI:', 'f': 'F:'}
+
+
+def nombres_campos() -> List[str]:
+    """Campos disponibles en las consultas"""
+    return sorted(COMPONENTES_GRADO) + sorted(COMPONENTES_PRESENCIA) + sorted(CAMPOS)
+
+
+# Análisis léxico y sintáctico
+
+_TOKENS = re.compile(r"""
+    (?P<espacio>\s+)
+  | (?P<numero>\d+(?:\.\d+)?)
+  | (?P<texto>'[^']*'|"[^"]*")
+  | (?P<operador>==|!=|<=|>=|=|<|>)
+  | (?P<parentesis>[()])
+  | (?P<nombre>[^\W\d]\w*(?:\.\w+)*)
+""", re.VERBOSE)
+
+_PALABRAS = ('and', 'or', 'not', 'true', 'false')
+
+
+def _tokenizar(texto):
+    tokens = []
+    posicion = 0
+    while posicion < len(texto):
+        coincidencia = _TOKENS.match(texto, posicion)
+        if not coincidencia:
+            raise ConsultaInvalida("Carácter inesperado", texto, posicion)
+        tipo = coincidencia.lastgroup
+        valor = coincidencia.group()
+        if tipo == 'nombre' and valor.lower() in _PALABRAS:
+            tipo, valor = valor.lower(), valor.lower()
+        if tipo != 'espacio':
+            tokens.append((tipo, valor, posicion))
+        posicion = coincidencia.end()
+    tokens.append(('fin', '', len(texto)))
+    return tokens
+
+
+class _Analizador:
+    """Convierte la lista de tokens en un árbol de tuplas"""
+
+    def __init__(self, texto):
+        self.texto = texto
+        self.tokens = _tokenizar(texto)
+        self.i = 0
+
+    def actual(self):
+        return self.tokens[self.i]
+
+    def error(self, mensaje, posicion=None):
+        raise ConsultaInvalida(mensaje, self.texto, self.actual()[2] if posicion is None else posicion)
+
+    def aceptar(self, tipo):
+        if self.actual()[0] == tipo:
+            self.i += 1
+            return True
+        return False
+
+    def expresion(self):
+        arbol = self.disyuncion()
+        if self.actual()[0] != 'fin':
+            self.error("Texto sobrante al final de la consulta")
+        return arbol
+
+    def disyuncion(self):
+        ramas = [self.conjuncion()]
+        while self.aceptar('or'):
+            ramas.append(self.conjuncion())
+        return ramas[0] if len(ramas) == 1 else ('o', ramas)
+
+    def conjuncion(self):
+        ramas = [self.negacion()]
+        while self.aceptar('and'):
+            ramas.append(self.negacion())
+        return ramas[0] if len(ramas) == 1 else ('y', ramas)
+
+    def negacion(self):
+        if self.aceptar('not'):
+            return ('no', self.negacion())
+        return self.atomo()
+
+    def atomo(self):
+        tipo, valor, posicion = self.actual()
+        if valor == '(':
+            self.i += 1
+            arbol = self.disyuncion()
+            if self.actual()[1] != ')':
+                self.error("Falta ')'")
+            self.i += 1
+            return arbol
+        if tipo != 'nombre':
+            self.error("Se esperaba un campo o '('")
+        self.i += 1
+        if self.actual()[0] != 'operador':
+            return ('campo', valor.lower(), None, None, posicion)
+        operador = self.actual()[1]
+        self.i += 1
+        tipo_valor, valor_literal, _ = self.actual()
+        if tipo_valor == 'numero':
+            literal = float(valor_literal)
+        elif tipo_valor == 'texto':
+            literal = valor_literal[1:-1]
+        elif tipo_valor in ('true', 'false'):
+            literal = tipo_valor == 'true'
+        else:
+            self.error("Se esperaba un número, un texto entre comillas, true o false")
+        self.i += 1
+        return ('campo', valor.lower(), '==' if operador == '=' else operador, literal, posicion)
+
+
+# Plan de ejecución
+
+_OPERADORES = {
+    '==': operator.eq, '!=': operator.ne,
+    '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+}
+
+
+class _Indice:
+    """Hoja resuelta con el índice de bitmaps"""
+
+    costo = 0
+
+    def __init__(self, descripcion, funcion):
+        self.descripcion = descripcion
+        self.funcion = funcion
+
+    def ejecutar(self, cohorte):
+        return self.funcion(cohorte.indice)
+
+    def explicar(self, nivel=0):
+        return f"{'  ' * nivel}índice: {self.descripcion}"
+
+
+class _Escaneo:
+    """Hoja resuelta con una comparación NumPy sobre una columna"""
+
+    costo = 1
+
+    def __init__(self, descripcion, campo, operador, valor):
+        self.descripcion = descripcion
+        self.campo = campo
+        self.operador = operador
+        self.valor = valor
+
+    def ejecutar(self, cohorte):
+        columna = cohorte.columna(self.campo)
+        if self.operador is None:
+            mascara = columna if columna.dtype == bool else columna > 0
+        else:
+            mascara = _OPERADORES[self.operador](columna, self.valor)
+        return cohorte.bitmap_desde_mascara(mascara)
+
+    def explicar(self, nivel=0):
+        return f"{'  ' * nivel}escaneo: {self.descripcion}"
+
+
+class _Y:
+    def __init__(self, ramas):
+        # Primero las ramas del índice, que son baratas y suelen vaciar el resultado
+        self.ramas = sorted(ramas, key=lambda rama: rama.costo)
+        self.costo = max(rama.costo for rama in self.ramas)
+
+    def ejecutar(self, cohorte):
+        resultado = cohorte.indice.todos()
+        for rama in self.ramas:
+            resultado &= rama.ejecutar(cohorte)
+            if not resultado:
+                break
+        return resultado
+
+    def explicar(self, nivel=0):
+        return '\n'.join([f"{'  ' * nivel}y"] + [rama.explicar(nivel + 1) for rama in self.ramas])
+
+
+class _O:
+    def __init__(self, ramas):
+        self.ramas = ramas
+        self.costo = max(rama.costo for rama in ramas)
+
+    def ejecutar(self, cohorte):
+        resultado = 0
+        for rama in self.ramas:
+            resultado |= rama.ejecutar(cohorte)
+        return resultado
+
+    def explicar(self, nivel=0):
+        return '\n'.join([f"{'  ' * nivel}o"] + [rama.explicar(nivel + 1) for rama in self.ramas])
+
+
+class _No:
+    def __init__(self, rama):
+        self.rama = rama
+        self.costo = rama.costo
+
+    def ejecutar(self, cohorte):
+        return cohorte.indice.negar(self.rama.ejecutar(cohorte))
+
+    def explicar(self, nivel=0):
+        return '\n'.join([f"{'  ' * nivel}no", self.rama.explicar(nivel + 1)])
+
+
+def _al_menos(indice, componente, lado, grado):
+    """Registros con grado >= grado (el mayor de ambos lados si no hay lado)"""
+    if grado <= 0:
+        return indice.todos()
+    if grado > 3:
+        return 0
+    return indice.grado(componente, grado, 3, lado)
+
+
+def _hoja_grado(nombre, operador, valor):
+    componente, lado = COMPONENTES_GRADO[nombre]
+    comparar = _OPERADORES[operador] if operador else operator.gt
+    limite = valor if operador else 0
+    grados = [g for g in range(4) if comparar(g, limite)]
+
+    def funcion(indice):
+        resultado = 0
+        for g in grados:
+            resultado |= _al_menos(indice, componente, lado, g) & ~_al_menos(indice, componente, lado, g + 1)
+        return resultado
+
+    return _Indice(nombre.upper() + (f" {operador} {valor:g}" if operador else ""), funcion)
+
+
+def _hoja(nombre, operador, valor, consulta, posicion):
+    """Valida una condición y decide cómo resolverla"""
+    def error(mensaje):
+        raise ConsultaInvalida(mensaje, consulta, posicion)
+
+    if nombre in COMPONENTES_GRADO:
+        if operador and (isinstance(valor, (bool, str))):
+            error(f"{nombre.upper()} se compara con un grado numérico (0-3)")
+        return _hoja_grado(nombre, operador, valor)
+
+    if nombre in COMPONENTES_PRESENCIA:
+        presencia = COMPONENTES_PRESENCIA[nombre]
+        descripcion = nombre.upper()
+        if isinstance(valor, str) and nombre in _COMPONENTES_NOMBRE and operador in ('==', '!='):
+            clave = _COMPONENTES_NOMBRE[nombre] + valor
+            hoja = _Indice(f"{descripcion} = {valor!r}", lambda i: i.bitmap(clave))
+            return _No(hoja) if operador == '!=' else hoja
+        if operador is None:
+            return _Indice(descripcion, presencia)
+        if isinstance(valor, bool) and operador in ('==', '!='):
+            hoja = _Indice(descripcion, presencia)
+            return hoja if (operador == '==') == valor else _No(hoja)
+        error(f"{descripcion} solo admite '= true', '= false'" +
+              (" o '= \"nombre\"'" if nombre in _COMPONENTES_NOMBRE else ""))
+
+    if nombre not in CAMPOS:
+        error(f"Campo desconocido: {nombre}")
+    tipo, _ = CAMPOS[nombre]
+    descripcion = nombre if operador is None else f"{nombre} {operador} {valor!r}"
+    if tipo == 'numero' and (isinstance(valor, (bool, str))):
+        error(f"{nombre} es numérico")
+    if tipo == 'booleano':
+        if operador is not None and not (isinstance(valor, bool) and operador in ('==', '!=')):
+            error(f"{nombre} solo admite '= true' o '= false'")
+    if tipo == 'texto':
+        if operador is None or not isinstance(valor, str) or operador not in ('==', '!='):
+            error(f"{nombre} solo admite '= \"texto\"' o '!= \"texto\"'")
+        valor = valor.casefold()
+    return _Escaneo(descripcion, nombre, operador, valor)
+
+
+def _planificar(arbol, consulta):
+    tipo = arbol[0]
+    if tipo == 'y':
+        return _Y([_planificar(rama, consulta) for rama in arbol[1]])
+    if tipo == 'o':
+        return _O([_planificar(rama, consulta) for rama in arbol[1]])
+    if tipo == 'no':
+        return _No(_planificar(arbol[1], consulta))
+    _, nombre, operador, valor, posicion = arbol
+    return _hoja(nombre, operador, valor, consulta, posicion)
+
+
+class Consulta:
+    """Consulta compilada, reutilizable sobre cualquier cohorte"""
+
+    def __init__(self, texto, plan):
+        self.texto = texto
+        self.plan = plan
+
+    def ejecutar(self, cohorte: 'Cohorte') -> int:
+        """Devuelve el bitmap de los registros que cumplen la consulta"""
+        return self.plan.ejecutar(cohorte)
+
+    def explicar(self) -> str:
+        """Plan de ejecución en texto, una línea por nodo"""
+        return self.plan.explicar()
+
+    def __repr__(self):
+        return f"Consulta({self.texto!r})"
+
+
+@functools.lru_cache(maxsize=128)
+def compilar(texto: str) -> Consulta:
+    """Analiza, valida y planifica una consulta; lanza ConsultaInvalida si no es válida"""
+    texto = texto.strip()
+    if not texto:
+        raise ConsultaInvalida("Consulta vacía", texto, 0)
+    return Consulta(texto, _planificar(_Analizador(texto).expresion(), texto))
+
+
+# Cohortes
+
+def _con_desglose(reporte):
+    return reporte, desglose_enzian(reporte)
+
+
+class Cohorte:
+    """Registros con su índice de bitmaps y columnas extraídas bajo demanda"""
+
+    def __init__(self, registros: Iterable[Tuple[Any, Dict[str, Any]]] = ()):
+        self.reportes: List[ReporteEnzian] = []
+        self.indice = IndiceBitmap()
+        self._columnas: Dict[str, np.ndarray] = {}
+        # Borradores que no se pudieron leer: ruta -> error
+        self.omitidos: Dict[str, str] = {}
+        self.ultimo_id: Optional[int] = None
+        self._candado = threading.RLock()
+        self.agregar(registros)
+
+    def __len__(self):
+        return len(self.reportes)
+
+    def agregar(self, registros: Iterable[Tuple[Any, Dict[str, Any]]]) -> int:
+        """Agrega registros (id, datos) al final de la cohorte y devuelve cuántos se agregaron"""
+        return self._agregar_reportes(
+            (id_registro, _con_desglose(ReporteEnzian.desde_dict(datos))) for id_registro, datos in registros
+        )
+
+    def _agregar_reportes(self, registros) -> int:
+        # Se leen todos antes de tocar la cohorte para que reportes e índice no se desalineen
+        registros = list(registros)
+        with self._candado:
+            self.reportes.extend(reporte for _, (reporte, _) in registros)
+            self.indice.agregar((id_registro, comp) for id_registro, (_, comp) in registros)
+            self._columnas.clear()
+        return len(registros)
+
+    @classmethod
+    def desde_borradores(cls, rutas) -> 'Cohorte':
+        """Cohorte a partir de borradores JSON; el id de cada registro es su ruta
+
+        Los archivos que no son reportes válidos quedan fuera y se anotan en omitidos.
+        """
+        cohorte = cls()
+        cohorte._agregar_reportes(leer_borradores(rutas, cohorte.omitidos, _con_desglose))
+        return cohorte
+
+    @classmethod
+    def desde_almacen(cls, almacen, tipo=None) -> 'Cohorte':
+        """Cohorte a partir del almacén local; el id es el de la fila"""
+        cohorte = cls()
+        cohorte.actualizar_desde_almacen(almacen, tipo)
+        return cohorte
+
+    def actualizar_desde_almacen(self, almacen, tipo=None) -> int:
+        """Agrega las filas del almacén posteriores a la última ya agregada"""
+        with self._candado, almacen.conexion() as con:
+            condiciones = ["id > ?"]
+            parametros: List[Any] = [self.ultimo_id or 0]
+            if tipo:
+                condiciones.append("tipo = ?")
+                parametros.append(tipo)
+            filas = con.execute(
+                f"SELECT id, datos FROM reportes WHERE {' AND '.join(condiciones)} ORDER BY id", parametros
+            ).fetchall()
+            nuevos = self.agregar((fila['id'], json.loads(fila['datos'])) for fila in filas)
+            if filas:
+                self.ultimo_id = filas[-1]['id']
+        return nuevos
+
+    def columna(self, campo: str) -> np.ndarray:
+        """Valores de un campo para todos los registros, extraídos una sola vez"""
+        if campo not in self._columnas:
+            tipo, extractor = CAMPOS[campo]
+            valores = [extractor(reporte) for reporte in self.reportes]
+            if tipo == 'numero':
+                columna = np.array(valores, dtype=np.float64)
+            elif tipo == 'booleano':
+                columna = np.array(valores, dtype=bool)
+            else:
+                columna = np.array([(v or '').casefold() for v in valores], dtype=object)
+            self._columnas[campo] = columna
+        return self._columnas[campo]
+
+    def bitmap_desde_mascara(self, mascara: np.ndarray) -> int:
+        """Convierte una máscara booleana por registro en un bitmap"""
+        return int.from_bytes(np.packbits(mascara, bitorder='little').tobytes(), 'little')
+
+    def mascara_desde_bitmap(self, bitmap: int) -> np.ndarray:
+        """Convierte un bitmap en una máscara booleana por registro"""
+        total = len(self.reportes)
+        bits = np.frombuffer(bitmap.to_bytes((total + 7) // 8, 'little'), dtype=np.uint8)
+        return np.unpackbits(bits, bitorder='little')[:total].astype(bool)
+
+    def clases_por_medida(self, bitmap: int) -> Dict[str, Dict[str, int]]:
+        """Por medida, registros del bitmap en cada clase que sugiere (O1-O3, A1-A3...); los no medidos no cuentan"""
+        mascara = self.mascara_desde_bitmap(bitmap)
+        columnas = {}
+        for nombre, (campo, _) in MEDIDAS_CLASES.items():
+            valores = self.columna(campo)[mascara]
+            columnas[nombre] = valores[~np.isnan(valores)]
+        resultado = {}
+        for nombre, grados in clasificar_cohorte(columnas).items():
+            conteo = np.bincount(grados, minlength=4)[1:]
+            resultado[nombre] = dict(zip(map(str, etiquetas([1, 2, 3], MEDIDAS_CLASES[nombre][1])), map(int, conteo)))
+        return resultado
+
+    def registros(self, bitmap: int) -> List[Tuple[Any, ReporteEnzian]]:
+        """Pares (id, reporte) de los registros de un bitmap"""
+        return [(self.indice.ids[i], self.reportes[i]) for i in posiciones(bitmap)]
+
+    def filtrar(self, consulta) -> List[Any]:
+        """Ids de los registros que cumplen una consulta (texto o compilada)"""
+        if isinstance(consulta, str):
+            consulta = compilar(consulta)
+        return self.indice.registros(consulta.ejecutar(self))
+
+    def contar(self, consulta) -> int:
+        """Número de registros que cumplen una consulta (texto o compilada)"""
+        if isinstance(consulta, str):
+            consulta = compilar(consulta)
+        return contar(consulta.ejecutar(self))
@@ -0,0 +1,190 @@
+"""Cola de generación de reportes en segundo plano
+
+La aplicación envía un trabajo, recibe su id al instante y consulta su
+estado en ejecuciones posteriores; el hilo del script nunca espera al DOCX.
+
+La concurrencia está acotada por el número de trabajadores del pool, y la
+cola por un máximo de trabajos sin terminar: al llegar al límite enviar()
+lanza ColaLlena (o espera un cupo si se le da un tiempo de espera), de modo
+que en horas pico el servidor rechaza trabajo en lugar de acumularlo.
+
+Con procesos=True los trabajos se ejecutan en un pool de procesos y se
+reparten entre CPUs; la función y sus argumentos deben poder serializarse
+(generar_docx() cumple esa condición).
+"""
+import concurrent.futures
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from .modelo import ReporteEnzian
+
+ESTADOS = ('pendiente', 'en_proceso', 'listo', 'error')
+
+# Se incrementa con cada cambio del contenido o formato del DOCX, para que
+# ninguna caché entregue documentos armados con la plantilla anterior
+VERSION_PLANTILLA = 2
+
+
+class ColaLlena(RuntimeError):
+    """No se aceptan más trabajos hasta que terminen los pendientes"""
+
+
+def generar_docx(datos: Dict[str, Any], motor: str = 'docx', determinista: bool = False) -> bytes:
+    """Genera el DOCX de un caso con el motor dado; apta para pools de hilos y de procesos"""
+    # Importación diferida: python-docx solo se carga al generar el primer reporte
+    from .documento import generar_reporte_word
+
+    return generar_reporte_word(ReporteEnzian.desde_dict(datos), motor, determinista).getvalue()
+
+
+def _huella(datos: Dict[str, Any]) -> str:
+    contenido = json.dumps(datos, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def clave_docx(datos: Dict[str, Any], motor: str = 'docx', determinista: bool = False) -> str:
+    """Clave de caché del DOCX de un caso: versión de plantilla, motor, modo determinista y huella del contenido"""
+    return f"{VERSION_PLANTILLA}:{motor}:{int(determinista)}:{_huella(datos)}"
+
+
+def nombre_docx(datos: Dict[str, Any], determinista: bool = False) -> str:
+    """Nombre de archivo del DOCX; en modo determinista depende solo del contenido"""
+    nombre = str(datos['paciente'].get('nombre', '')).replace(' ', '_')
+    if determinista:
+        fecha = str(datos['paciente'].get('fecha', '')).replace('-', '')
+        return f"Reporte_Endometriosis_{nombre}_{fecha}_{_huella(datos)[:12]}.docx"
+    return f"Reporte_Endometriosis_{nombre}_{datetime.now().strftime('%Y%m%d_%H%M')}.docx"
+
+
+class Trabajo:
+    """Un trabajo enviado a la cola"""
+
+    __slots__ = ('id', 'futuro', 'creado', 'fin', 'error_al_terminar')
+
+    def __init__(self, id_trabajo, futuro):
+        self.id = id_trabajo
+        self.futuro = futuro
+        self.creado = time.time()
+        # Se asigna después de ejecutar al_terminar
+        self.fin: Optional[float] = None
+        # Excepción de al_terminar; el resultado del trabajo sigue siendo válido
+        self.error_al_terminar: Optional[str] = None
+
+    @property
+    def estado(self) -> str:
+        if not self.futuro.done():
+            return 'en_proceso' if self.futuro.running() else 'pendiente'
+        if self.futuro.cancelled() or self.futuro.exception() is not None:
+            return 'error'
+        return 'listo'
+
+    @property
+    def terminado(self) -> bool:
+        return self.fin is not None
+
+    @property
+    def resultado(self):
+        """Valor devuelto por el trabajo, o None si no terminó bien"""
+        return self.futuro.result() if self.estado == 'listo' else None
+
+    @property
+    def error(self) -> Optional[str]:
+        if self.estado != 'error':
+            return None
+        if self.futuro.cancelled():
+            return "Trabajo cancelado"
+        excepcion = self.futuro.exception()
+        return f"{type(excepcion).__name__}: {excepcion}"
+
+    def __repr__(self):
+        return f"Trabajo({self.id!r}, {self.estado!r})"
+
+
+class ColaReportes:
+    """Pool acotado de trabajadores con un máximo de trabajos sin terminar"""
+
+    def __init__(self, trabajadores=2, maximo_pendientes=8, conservar=200, procesos=False):
+        if procesos:
+            self._ejecutor = concurrent.futures.ProcessPoolExecutor(max_workers=trabajadores)
+        else:
+            self._ejecutor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=trabajadores, thread_name_prefix='enzian-reporte'
+            )
+        self.trabajadores = trabajadores
+        self.maximo_pendientes = maximo_pendientes
+        self.conservar = conservar
+        self._cupos = threading.BoundedSemaphore(maximo_pendientes)
+        self._trabajos: 'OrderedDict[str, Trabajo]' = OrderedDict()
+        self._candado = threading.Lock()
+
+    def enviar(self, funcion: Callable, *args, al_terminar: Optional[Callable[[Any], None]] = None,
+               espera: float = 0) -> str:
+        """Encola funcion(*args) y devuelve el id del trabajo
+
+        al_terminar(resultado) se llama en segundo plano si el trabajo termina
+        bien; si lanza una excepción, queda en error_al_terminar del trabajo. Sin
+        cupo, espera hasta `espera` segundos y luego lanza ColaLlena.
+        """
+        if not (self._cupos.acquire(timeout=espera) if espera else self._cupos.acquire(blocking=False)):
+            raise ColaLlena(f"Hay {self.maximo_pendientes} reportes en cola; intente de nuevo en unos segundos")
+        try:
+            futuro = self._ejecutor.submit(funcion, *args)
+        except BaseException:
+            self._cupos.release()
+            raise
+
+        trabajo = Trabajo(uuid.uuid4().hex, futuro)
+        with self._candado:
+            self._trabajos[trabajo.id] = trabajo
+            self._depurar()
+
+        def terminado(futuro):
+            try:
+                if al_terminar and not futuro.cancelled() and futuro.exception() is None:
+                    al_terminar(futuro.result())
+            except Exception as e:
+                trabajo.error_al_terminar = f"{type(e).__name__}: {e}"
+            finally:
+                trabajo.fin = time.time()
+                self._cupos.release()
+
+        futuro.add_done_callback(terminado)
+        return trabajo.id
+
+    def _depurar(self):
+        """Olvida los trabajos terminados más antiguos por encima de `conservar`"""
+        sobrantes = len(self._trabajos) - self.conservar
+        for id_trabajo in [i for i, t in self._trabajos.items() if t.terminado][:max(sobrantes, 0)]:
+            del self._trabajos[id_trabajo]
+
+    def trabajo(self, id_trabajo: str) -> Optional[Trabajo]:
+        """Trabajo por id; None si no existe o ya se olvidó"""
+        with self._candado:
+            return self._trabajos.get(id_trabajo)
+
+    def posicion(self, id_trabajo: str) -> int:
+        """Trabajos pendientes por delante de uno (0 si ya está en proceso o terminó)"""
+        with self._candado:
+            trabajo = self._trabajos.get(id_trabajo)
+            if trabajo is None or trabajo.estado != 'pendiente':
+                return 0
+            return sum(
+                1 for t in self._trabajos.values()
+                if t.creado < trabajo.creado and t.estado == 'pendiente'
+            )
+
+    def resumen(self) -> Dict[str, int]:
+        """Número de trabajos conservados en cada estado"""
+        with self._candado:
+            estados = [t.estado for t in self._trabajos.values()]
+        return {estado: estados.count(estado) for estado in ESTADOS}
+
+    def cerrar(self, esperar=True):
+        """Detiene el pool; los trabajos que no empezaron se cancelan"""
+        self._ejecutor.shutdown(wait=esperar, cancel_futures=True)
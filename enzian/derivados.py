@@ -0,0 +1,280 @@
+"""Valores derivados del reporte con seguimiento de dependencias
+
+Cada derivado declara las rutas del reporte que lee ('paciente.nombre',
+'ovarios.izquierdo.estado', ...) y, si hace falta, otros derivados de los
+que depende. GrafoDerivados guarda, por sesión, el último valor de cada
+uno junto con la huella de sus entradas y solo lo recalcula cuando alguna
+cambió; si el valor recalculado es igual al anterior, los derivados que
+dependen de él tampoco se recalculan.
+
+    grafo = GrafoDerivados()
+    valores = grafo.vista(st.session_state.data)
+    valores['codigo'], valores['alertas']
+
+La función de un derivado recibe un ReporteEnzian armado solo con las rutas
+declaradas, de modo que una dependencia olvidada se nota en seguida en lugar
+de dejar un valor desactualizado.
+"""
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .alertas import RUTAS_ALERTAS, alertas_clinicas
+from .codigo import generar_codigo_enzian
+from .modelo import ReporteEnzian
+
+_FALTA = object()
+
+
+class Derivado:
+    """Valor calculado a partir de rutas del reporte y de otros derivados"""
+
+    __slots__ = ('nombre', 'rutas', 'depende', 'funcion')
+
+    def __init__(self, nombre: str, rutas: Tuple[str, ...], depende: Tuple[str, ...], funcion: Callable):
+        self.nombre = nombre
+        self.rutas = rutas
+        self.depende = depende
+        self.funcion = funcion
+
+    def __repr__(self):
+        return f"Derivado({self.nombre!r}, rutas={len(self.rutas)}, depende={self.depende!r})"
+
+
+# Derivados registrados, en orden de registro
+DERIVADOS: Dict[str, Derivado] = {}
+
+
+def derivado(*rutas: str, depende: Tuple[str, ...] = ()):
+    """Registra una función como derivado con el nombre de la función
+
+    La función recibe el reporte proyectado y, después, los valores de los
+    derivados de `depende` en el mismo orden.
+    """
+    def decorador(funcion):
+        faltantes = [nombre for nombre in depende if nombre not in DERIVADOS]
+        if faltantes:
+            raise ValueError(f"{funcion.__name__}: derivados no registrados {faltantes}")
+        DERIVADOS[funcion.__name__] = Derivado(funcion.__name__, tuple(rutas), tuple(depende), funcion)
+        return funcion
+    return decorador
+
+
+def leer_ruta(datos: Dict[str, Any], ruta: str):
+    """Valor de una ruta con puntos; _FALTA si alguna clave no existe"""
+    valor = datos
+    for clave in ruta.split('.'):
+        if not isinstance(valor, dict) or clave not in valor:
+            return _FALTA
+        valor = valor[clave]
+    return valor
+
+
+def proyectar(datos: Dict[str, Any], rutas) -> Dict[str, Any]:
+    """Dict con la forma del reporte que contiene solo las rutas dadas"""
+    proyeccion: Dict[str, Any] = {}
+    completas = set()
+    for ruta in sorted(rutas, key=lambda r: r.count('.')):
+        claves = ruta.split('.')
+        # Una ruta más corta ya trajo el valor completo
+        if any('.'.join(claves[:i]) in completas for i in range(1, len(claves))):
+            continue
+        valor = leer_ruta(datos, ruta)
+        if valor is _FALTA:
+            continue
+        destino = proyeccion
+        for clave in claves[:-1]:
+            destino = destino.setdefault(clave, {})
+        destino[claves[-1]] = valor
+        completas.add(ruta)
+    return proyeccion
+
+
+class _Nodo:
+    __slots__ = ('entradas', 'valor', 'version')
+
+    def __init__(self, entradas, valor):
+        self.entradas = entradas
+        self.valor = valor
+        self.version = 0
+
+
+class Vista:
+    """Valores derivados de un estado del reporte
+
+    Cada ruta se lee una sola vez por vista; si el reporte cambia después de
+    crearla hay que pedir una vista nueva.
+    """
+
+    def __init__(self, grafo: 'GrafoDerivados', datos: Dict[str, Any]):
+        self._grafo = grafo
+        self._datos = datos
+        self._huellas: Dict[str, str] = {}
+
+    def huella_ruta(self, ruta: str) -> str:
+        huella = self._huellas.get(ruta)
+        if huella is None:
+            valor = leer_ruta(self._datos, ruta)
+            huella = self._huellas[ruta] = '' if valor is _FALTA else repr(valor)
+        return huella
+
+    def __getitem__(self, nombre: str):
+        return self._grafo._valor(nombre, self)
+
+    @property
+    def datos(self) -> Dict[str, Any]:
+        return self._datos
+
+
+class GrafoDerivados:
+    """Últimos valores de los derivados de una sesión"""
+
+    def __init__(self, derivados: Optional[Dict[str, Derivado]] = None):
+        self._derivados = derivados if derivados is not None else DERIVADOS
+        self._nodos: Dict[str, _Nodo] = {}
+        self.recalculos: Counter = Counter()
+
+    def vista(self, datos: Dict[str, Any]) -> Vista:
+        """Vista de los derivados para el estado actual del reporte"""
+        return Vista(self, datos)
+
+    def _valor(self, nombre: str, vista: Vista):
+        definicion = self._derivados[nombre]
+        previos = [self._valor(dependencia, vista) for dependencia in definicion.depende]
+        entradas = (
+            tuple(vista.huella_ruta(ruta) for ruta in definicion.rutas),
+            tuple(self._nodos[dependencia].version for dependencia in definicion.depende),
+        )
+        nodo = self._nodos.get(nombre)
+        if nodo is not None and nodo.entradas == entradas:
+            return nodo.valor
+
+        self.recalculos[nombre] += 1
+        reporte = ReporteEnzian.desde_dict(proyectar(vista.datos, definicion.rutas))
+        valor = definicion.funcion(reporte, *previos)
+        if nodo is None:
+            self._nodos[nombre] = _Nodo(entradas, valor)
+        else:
+            if valor != nodo.valor:
+                nodo.version += 1
+                nodo.valor = valor
+            nodo.entradas = entradas
+        return self._nodos[nombre].valor
+
+
+# ============= Derivados de la pestaña Generar reporte =============
+
+CAMPOS_OBLIGATORIOS = (
+    ('nombre', "Nombre del paciente"),
+    ('cedula', "Número de identificación"),
+    ('fecha', "Fecha del estudio"),
+)
+
+LOCALIZACIONES_F = ('adenomiosis', 'vejiga', 'ureter', 'intestino', 'otras')
+
+
+def _lados(seccion, *campos):
+    return tuple(f"{seccion}.{lado}.{campo}" for lado in ('izquierdo', 'derecho') for campo in campos)
+
+
+_ESTADOS = (
+    'peritoneo.estado',
+    *_lados('ovarios', 'estado'),
+    *_lados('tubos', 'estado'),
+    'compartimento_a.estado',
+    *_lados('compartimento_b', 'estado'),
+    'compartimento_c.estado',
+)
+
+_CLASIFICACIONES = (
+    'peritoneo.clasificacion',
+    *_lados('ovarios', 'clasificacion'),
+    *_lados('tubos', 'clasificacion'),
+    'compartimento_a.clasificacion',
+    *_lados('compartimento_b', 'clasificacion'),
+    'compartimento_c.clasificacion',
+)
+
+_PRESENCIA_F = tuple(f"localizaciones_f.{clave}.presente" for clave in LOCALIZACIONES_F)
+
+
+@derivado(
+    *_ESTADOS, *_CLASIFICACIONES, *_PRESENCIA_F,
+    'localizaciones_f.ureter.lados', 'localizaciones_f.intestino.localizaciones', 'localizaciones_f.otras.tipos',
+)
+def codigo(reporte: ReporteEnzian) -> str:
+    """Código #Enzian del reporte"""
+    return generar_codigo_enzian(reporte)
+
+
+@derivado(*(f"paciente.{campo}" for campo, _ in CAMPOS_OBLIGATORIOS))
+def campos_obligatorios(reporte: ReporteEnzian) -> List[str]:
+    """Etiquetas de los campos obligatorios sin completar"""
+    return [etiqueta for campo, etiqueta in CAMPOS_OBLIGATORIOS if not reporte.paciente.get(campo)]
+
+
+@derivado(*_ESTADOS, *_PRESENCIA_F)
+def tiene_hallazgos(reporte: ReporteEnzian) -> bool:
+    """Indica si algún compartimento o localización tiene hallazgos"""
+    return (
+        reporte.peritoneo.get('estado') == 'anormal'
+        or any(ov.get('estado') == 'anormal' for ov in reporte.ovarios.values())
+        or any(tb.get('estado') == 'anormal' for tb in reporte.tubos.values())
+        or reporte.compartimento_a.get('estado') == 'anormal'
+        or any(lsu.get('estado') == 'anormal' for lsu in reporte.compartimento_b.values())
+        or reporte.compartimento_c.get('estado') == 'anormal'
+        or any(loc.get('presente') for loc in reporte.localizaciones_f.values() if isinstance(loc, dict))
+    )
+
+
+@derivado(*_ESTADOS, *_CLASIFICACIONES, *_PRESENCIA_F, 'localizaciones_f.ureter.lados')
+def resumen(reporte: ReporteEnzian) -> Dict[str, List[str]]:
+    """Líneas de cada columna del Resumen de Hallazgos (vacía si no hay hallazgos)"""
+    def anormal(seccion):
+        return seccion.get('estado') == 'anormal'
+
+    ovarios, tubos, lsu = reporte.ovarios, reporte.tubos, reporte.compartimento_b
+
+    profunda = []
+    if anormal(reporte.compartimento_a):
+        profunda.append(f"✓ Compartimento A: {reporte.compartimento_a.get('clasificacion', 'N/A')}")
+    if anormal(lsu['izquierdo']) or anormal(lsu['derecho']):
+        clase_izq = lsu['izquierdo'].get('clasificacion', 'B0')[1] if anormal(lsu['izquierdo']) else '0'
+        clase_der = lsu['derecho'].get('clasificacion', 'B0')[1] if anormal(lsu['derecho']) else '0'
+        profunda.append(f"✓ Compartimento B: B{clase_izq}/{clase_der}")
+    if anormal(reporte.compartimento_c):
+        profunda.append(f"✓ Compartimento C: {reporte.compartimento_c.get('clasificacion', 'N/A')}")
+
+    loc_f = reporte.localizaciones_f
+    asociadas = []
+    if loc_f.get('adenomiosis', {}).get('presente'):
+        asociadas.append("✓ Adenomiosis (FA)")
+    if loc_f.get('vejiga', {}).get('presente'):
+        asociadas.append("✓ Vejiga (FB)")
+    if loc_f.get('ureter', {}).get('presente'):
+        asociadas.append(f"✓ Uréter: {', '.join(loc_f['ureter'].get('lados', []))}")
+    if loc_f.get('intestino', {}).get('presente'):
+        asociadas.append("✓ Intestino (FI)")
+    if loc_f.get('otras', {}).get('presente'):
+        asociadas.append("✓ Otras localizaciones")
+
+    return {
+        'superficial': (
+            [f"✓ Peritoneo: {reporte.peritoneo.get('clasificacion', 'N/A')}"] if anormal(reporte.peritoneo) else []
+        ),
+        'ovarica': [
+            f"✓ {nombre}: {ovarios[lado].get('clasificacion', 'N/A')}"
+            for lado, nombre in (('izquierdo', 'Izquierdo'), ('derecho', 'Derecho')) if anormal(ovarios[lado])
+        ],
+        'adherencias': [
+            f"✓ {nombre}: {tubos[lado].get('clasificacion', 'N/A').split()[0]}"
+            for lado, nombre in (('izquierdo', 'Izquierdo'), ('derecho', 'Derecho')) if anormal(tubos[lado])
+        ],
+        'profunda': profunda,
+        'asociadas': asociadas,
+    }
+
+
+@derivado(*RUTAS_ALERTAS)
+def alertas(reporte: ReporteEnzian) -> List[str]:
+    """Mensajes de las alertas clínicas"""
+    return alertas_clinicas(reporte)
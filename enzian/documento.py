@@ -0,0 +1,514 @@
+"""Generación del reporte en Word (DOCX) a partir de un reporte #Enzian"""
+import copy
+import functools
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Tuple
+
+from docx import Document
+from docx.shared import Pt, RGBColor
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+from .codigo import generar_codigo_enzian
+from .documento_xml import FECHA_DETERMINISTA, generar_reporte_xml, reempacar
+from .modelo import ReporteEnzian
+
+
+@functools.lru_cache(maxsize=None)
+def _plantilla_base():
+    """DOCX con estilos y encabezado, construido una sola vez por proceso"""
+    doc = Document()
+    
+    # Configurar estilos
+    style = doc.styles['Normal']
+    style.font.name = 'Arial'
+    style.font.size = Pt(11)
+    
+    # Propiedades fijas: no dependen de la fecha ni de la versión de python-docx
+    propiedades = doc.core_properties
+    propiedades.title = 'Reporte ultrasonográfico #Enzian'
+    propiedades.author = 'Reporte #Enzian'
+    propiedades.comments = 'Evaluación de Endometriosis - Clasificación #Enzian'
+    propiedades.last_modified_by = 'Reporte #Enzian'
+    propiedades.revision = 1
+    propiedades.created = propiedades.modified = datetime(*FECHA_DETERMINISTA)
+    
+    # Encabezado
+    header = doc.add_heading('REPORTE ULTRASONOGRÁFICO ASOCIACIÓN COSTARRICENSE GINECOLOGIA', 0)
+    header.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    
+    subheader = doc.add_heading('Evaluación de Endometriosis - Clasificación #Enzian', level=2)
+    subheader.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    
+    doc.add_paragraph()
+    
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+@functools.lru_cache(maxsize=None)
+def _bloque_firma():
+    """Párrafos XML del bloque de firma, construidos una sola vez por proceso"""
+    doc = Document()
+    parrafos = [doc.add_paragraph(), doc.add_paragraph()]
+    
+    p = doc.add_paragraph()
+    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    p.add_run('_' * 50)
+    parrafos.append(p)
+    
+    p = doc.add_paragraph()
+    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    p.add_run('Médico Ginecólogo')
+    parrafos.append(p)
+    
+    return tuple(p._p for p in parrafos)
+
+
+def nuevo_documento():
+    """Devuelve una copia independiente de la plantilla base"""
+    return Document(io.BytesIO(_plantilla_base()))
+
+
+def _agregar_firma(doc):
+    """Agrega una copia del bloque de firma al final del documento"""
+    sect_pr = doc.element.body.sectPr
+    for parrafo in _bloque_firma():
+        sect_pr.addprevious(copy.deepcopy(parrafo))
+
+
+def _seccion_paciente(doc, reporte):
+    """Datos del paciente"""
+    doc.add_heading('DATOS DEL PACIENTE', level=1)
+    paciente = reporte.paciente
+    
+    tabla_paciente = doc.add_table(rows=5, cols=2)
+    tabla_paciente.style = 'Light Grid Accent 1'
+    
+    datos = [
+        ('Nombre:', paciente.get('nombre', 'N/A')),
+        ('Identificación:', paciente.get('cedula', 'N/A')),
+        ('Edad:', f"{paciente.get('edad', 'N/A')} años"),
+        ('Fecha del estudio:', str(paciente.get('fecha', 'N/A'))),
+        ('Médico solicitante:', paciente.get('medico', 'N/A'))
+    ]
+    
+    for i, (campo, valor) in enumerate(datos):
+        tabla_paciente.rows[i].cells[0].text = campo
+        tabla_paciente.rows[i].cells[1].text = str(valor)
+    
+    if paciente.get('indicacion'):
+        doc.add_paragraph()
+        p = doc.add_paragraph()
+        p.add_run('Indicación: ').bold = True
+        p.add_run(paciente['indicacion'])
+    
+    doc.add_page_break()
+
+
+def _seccion_codigo(doc, reporte):
+    """Código #Enzian y encabezado de hallazgos"""
+    doc.add_heading('CLASIFICACIÓN #ENZIAN', level=1)
+    codigo = generar_codigo_enzian(reporte)
+    p = doc.add_paragraph()
+    p.add_run('Código: ').bold = True
+    run = p.add_run(codigo)
+    run.font.size = Pt(14)
+    run.font.color.rgb = RGBColor(128, 0, 128)
+    
+    doc.add_paragraph()
+    
+    # HALLAZGOS DETALLADOS
+    doc.add_heading('HALLAZGOS DETALLADOS', level=1)
+
+
+def _seccion_peritoneo(doc, reporte):
+    """Peritoneo (P)"""
+    peritoneo = reporte.peritoneo
+    doc.add_heading('Peritoneo (P)', level=2)
+    
+    if peritoneo.get('estado') == 'anormal':
+        p = doc.add_paragraph()
+        p.add_run('Se identifican lesiones peritoneales superficiales. ')
+        p.add_run(f"Clasificación: {peritoneo.get('clasificacion', 'N/A')}. ")
+        
+        if peritoneo.get('localizaciones'):
+            p.add_run(f"Localizaciones: {', '.join(peritoneo['localizaciones'])}. ")
+        
+        if peritoneo.get('descripcion'):
+            p.add_run(peritoneo['descripcion'])
+    else:
+        doc.add_paragraph('Sin evidencia de lesiones peritoneales superficiales.')
+
+
+def _seccion_ovarios(doc, reporte):
+    """Ovarios (O)"""
+    doc.add_heading('Ovarios (O)', level=2)
+    
+    # Ovario derecho
+    ovario_der = reporte.ovarios['derecho']
+    p = doc.add_paragraph()
+    p.add_run('Ovario derecho: ').bold = True
+    
+    if ovario_der.get('estado') == 'anormal':
+        p.add_run(f"Endometrioma de {ovario_der.get('diametro', 0)}cm. ")
+        p.add_run(f"Clasificación: {ovario_der.get('clasificacion', 'N/A')}. ")
+        p.add_run(f"Estructura: {ovario_der.get('estructura', 'N/A')}. ")
+        p.add_run(f"Contenido: {ovario_der.get('contenido', 'N/A')}. ")
+        p.add_run(f"Vascularización: {ovario_der.get('vascularizacion', 'N/A')}. ")
+        
+        if ovario_der.get('adherencias'):
+            p.add_run('Signos de adherencias a estructuras adyacentes. ')
+            
+        if ovario_der.get('descripcion'):
+            p.add_run(ovario_der['descripcion'])
+    elif ovario_der.get('estado') == 'no_visualizado':
+        p.add_run('No visualizado.')
+    else:
+        p.add_run('Sin alteraciones evidentes.')
+    
+    # Ovario izquierdo
+    ovario_izq = reporte.ovarios['izquierdo']
+    p = doc.add_paragraph()
+    p.add_run('Ovario izquierdo: ').bold = True
+    
+    if ovario_izq.get('estado') == 'anormal':
+        p.add_run(f"Endometrioma de {ovario_izq.get('diametro', 0)}cm. ")
+        p.add_run(f"Clasificación: {ovario_izq.get('clasificacion', 'N/A')}. ")
+        p.add_run(f"Estructura: {ovario_izq.get('estructura', 'N/A')}. ")
+        p.add_run(f"Contenido: {ovario_izq.get('contenido', 'N/A')}. ")
+        p.add_run(f"Vascularización: {ovario_izq.get('vascularizacion', 'N/A')}. ")
+        
+        if ovario_izq.get('adherencias'):
+            p.add_run('Signos de adherencias a estructuras adyacentes. ')
+            
+        if ovario_izq.get('descripcion'):
+            p.add_run(ovario_izq['descripcion'])
+    elif ovario_izq.get('estado') == 'no_visualizado':
+        p.add_run('No visualizado.')
+    else:
+        p.add_run('Sin alteraciones evidentes.')
+
+
+def _seccion_tubos(doc, reporte):
+    """Condición tubo-ovárica (T)"""
+    doc.add_heading('Condición Tubo-Ovárica (T)', level=2)
+    
+    tubo_der = reporte.tubos['derecho']
+    p = doc.add_paragraph()
+    p.add_run('Lado derecho: ').bold = True
+    
+    if tubo_der.get('estado') == 'anormal':
+        p.add_run(f"{tubo_der.get('clasificacion', 'N/A')}. ")
+        p.add_run(f"Sliding sign: {tubo_der.get('sliding_sign', 'N/A')}. ")
+        
+        if tubo_der.get('permeabilidad') != 'No evaluada':
+            p.add_run(f"Permeabilidad: {tubo_der.get('permeabilidad', 'N/A')}. ")
+            
+        if tubo_der.get('descripcion'):
+            p.add_run(tubo_der['descripcion'])
+    else:
+        p.add_run('Movilidad preservada, sin adherencias evidentes.')
+    
+    tubo_izq = reporte.tubos['izquierdo']
+    p = doc.add_paragraph()
+    p.add_run('Lado izquierdo: ').bold = True
+    
+    if tubo_izq.get('estado') == 'anormal':
+        p.add_run(f"{tubo_izq.get('clasificacion', 'N/A')}. ")
+        p.add_run(f"Sliding sign: {tubo_izq.get('sliding_sign', 'N/A')}. ")
+        
+        if tubo_izq.get('permeabilidad') != 'No evaluada':
+            p.add_run(f"Permeabilidad: {tubo_izq.get('permeabilidad', 'N/A')}. ")
+            
+        if tubo_izq.get('descripcion'):
+            p.add_run(tubo_izq['descripcion'])
+    else:
+        p.add_run('Movilidad preservada, sin adherencias evidentes.')
+
+
+def _seccion_compartimento_a(doc, reporte):
+    """Compartimento A"""
+    doc.add_heading('Compartimento A (Vagina/Espacio Rectovaginal)', level=2)
+    comp_a = reporte.compartimento_a
+    
+    if comp_a.get('estado') == 'anormal':
+        p = doc.add_paragraph()
+        p.add_run(f"Lesión de endometriosis profunda de {comp_a.get('diametro', 0)}cm. ")
+        p.add_run(f"Clasificación: {comp_a.get('clasificacion', 'N/A')}. ")
+        
+        if comp_a.get('localizacion'):
+            p.add_run(f"Localización: {', '.join(comp_a['localizacion'])}. ")
+            
+        p.add_run(f"Ecogenicidad: {comp_a.get('ecogenicidad', 'N/A')}. ")
+        p.add_run(f"Contornos: {comp_a.get('contornos', 'N/A')}. ")
+        
+        if comp_a.get('descripcion'):
+            p.add_run(comp_a['descripcion'])
+    else:
+        doc.add_paragraph('Sin lesiones de endometriosis profunda en vagina ni espacio rectovaginal.')
+
+
+def _seccion_compartimento_b(doc, reporte):
+    """Compartimento B"""
+    doc.add_heading('Compartimento B (Ligamentos Uterosacros)', level=2)
+    
+    lsu_der = reporte.compartimento_b['derecho']
+    p = doc.add_paragraph()
+    p.add_run('Ligamento uterosacro derecho: ').bold = True
+    
+    if lsu_der.get('estado') == 'anormal':
+        p.add_run(f"Lesión de {lsu_der.get('diametro_max', 0)}cm ")
+        p.add_run(f"(AP: {lsu_der.get('dim_ap', 0)}cm, CC: {lsu_der.get('dim_cc', 0)}cm). ")
+        p.add_run(f"Clasificación: {lsu_der.get('clasificacion', 'N/A')}. ")
+        p.add_run(f"Sliding sign: {lsu_der.get('sliding_sign', 'N/A')}. ")
+        
+        if lsu_der.get('descripcion'):
+            p.add_run(lsu_der['descripcion'])
+    else:
+        p.add_run('Sin alteraciones.')
+    
+    lsu_izq = reporte.compartimento_b['izquierdo']
+    p = doc.add_paragraph()
+    p.add_run('Ligamento uterosacro izquierdo: ').bold = True
+    
+    if lsu_izq.get('estado') == 'anormal':
+        p.add_run(f"Lesión de {lsu_izq.get('diametro_max', 0)}cm ")
+        p.add_run(f"(AP: {lsu_izq.get('dim_ap', 0)}cm, CC: {lsu_izq.get('dim_cc', 0)}cm). ")
+        p.add_run(f"Clasificación: {lsu_izq.get('clasificacion', 'N/A')}. ")
+        p.add_run(f"Sliding sign: {lsu_izq.get('sliding_sign', 'N/A')}. ")
+        
+        if lsu_izq.get('descripcion'):
+            p.add_run(lsu_izq['descripcion'])
+    else:
+        p.add_run('Sin alteraciones.')
+
+
+def _seccion_compartimento_c(doc, reporte):
+    """Compartimento C"""
+    doc.add_heading('Compartimento C (Recto)', level=2)
+    comp_c = reporte.compartimento_c
+    
+    if comp_c.get('estado') == 'anormal':
+        p = doc.add_paragraph()
+        p.add_run(f"Lesión de endometriosis rectal de {comp_c.get('longitud', 0)}cm de longitud. ")
+        p.add_run(f"Clasificación: {comp_c.get('clasificacion', 'N/A')}. ")
+        p.add_run(f"Distancia desde margen anal: {comp_c.get('distancia_anal', 0)}cm. ")
+        p.add_run(f"Profundidad de infiltración: {comp_c.get('profundidad', 'N/A')}. ")
+        p.add_run(f"Circunferencia afectada: {comp_c.get('circunferencia', 0)}%. ")
+        
+        if comp_c.get('estenosis'):
+            p.add_run('Signos de estenosis presentes. ')
+            
+        p.add_run(f"Sliding sign: {comp_c.get('sliding_sign', 'N/A')}. ")
+        
+        if comp_c.get('descripcion'):
+            p.add_run(comp_c['descripcion'])
+    else:
+        doc.add_paragraph('Sin evidencia de endometriosis rectal.')
+
+
+def _seccion_localizaciones_f(doc, reporte):
+    """Localizaciones F"""
+    doc.add_heading('Localizaciones Extragenitales (F)', level=2)
+    loc_f = reporte.localizaciones_f
+    
+    # Adenomiosis
+    if loc_f.get('adenomiosis', {}).get('presente'):
+        p = doc.add_paragraph()
+        p.add_run('Adenomiosis (FA): ').bold = True
+        
+        criterios = loc_f['adenomiosis'].get('criterios_musa', [])
+        if criterios:
+            p.add_run(f"Criterios MUSA: {', '.join(criterios)}. ")
+            
+        if loc_f['adenomiosis'].get('descripcion'):
+            p.add_run(loc_f['adenomiosis']['descripcion'])
+    
+    # Vejiga
+    if loc_f.get('vejiga', {}).get('presente'):
+        p = doc.add_paragraph()
+        p.add_run('Vejiga (FB): ').bold = True
+        
+        vejiga_data = loc_f['vejiga']
+        p.add_run(f"Lesión en {vejiga_data.get('localizacion', 'N/A')}. ")
+        p.add_run(f"Profundidad: {vejiga_data.get('profundidad', 'N/A')}. ")
+        p.add_run(f"Dimensión: {vejiga_data.get('dimension', 0)}cm. ")
+        
+        if vejiga_data.get('descripcion'):
+            p.add_run(vejiga_data['descripcion'])
+    
+    # Uréter
+    if loc_f.get('ureter', {}).get('presente'):
+        p = doc.add_paragraph()
+        p.add_run('Uréter (FU): ').bold = True
+        
+        ureter_data = loc_f['ureter']
+        lados = ureter_data.get('lados', [])
+        p.add_run(f"Compromiso ureteral {'bilateral' if len(lados) == 2 else lados[0].lower()}. ")
+        p.add_run(f"Tipo: {ureter_data.get('tipo_compromiso', 'N/A')}. ")
+        
+        if ureter_data.get('descripcion'):
+            p.add_run(ureter_data['descripcion'])
+    
+    # Intestino
+    if loc_f.get('intestino', {}).get('presente'):
+        p = doc.add_paragraph()
+        p.add_run('Intestino (FI): ').bold = True
+        
+        intestino_data = loc_f['intestino']
+        locs = intestino_data.get('localizaciones', [])
+        p.add_run(f"Compromiso intestinal en: {', '.join(locs)}. ")
+        p.add_run(f"Dimensión: {intestino_data.get('dimension', 0)}cm. ")
+        
+        if intestino_data.get('descripcion'):
+            p.add_run(intestino_data['descripcion'])
+    
+    # Otras localizaciones
+    if loc_f.get('otras', {}).get('presente'):
+        p = doc.add_paragraph()
+        p.add_run('Otras localizaciones: ').bold = True
+        
+        tipos = loc_f['otras'].get('tipos', [])
+        p.add_run(f"{', '.join(tipos)}.")
+    
+    # Si no hay localizaciones F
+    tiene_loc_f = any([
+        loc_f.get('adenomiosis', {}).get('presente'),
+        loc_f.get('vejiga', {}).get('presente'),
+        loc_f.get('ureter', {}).get('presente'),
+        loc_f.get('intestino', {}).get('presente'),
+        loc_f.get('otras', {}).get('presente')
+    ])
+    
+    if not tiene_loc_f:
+        doc.add_paragraph('Sin compromiso de localizaciones extragenitales.')
+    
+    doc.add_page_break()
+
+
+def _seccion_conclusiones(doc, reporte):
+    """Conclusiones y recomendaciones"""
+    codigo = generar_codigo_enzian(reporte)
+    
+    doc.add_heading('CONCLUSIONES', level=1)
+    
+    p = doc.add_paragraph()
+    p.add_run('Hallazgos ultrasonográficos compatibles con endometriosis según clasificación #Enzian:')
+    
+    doc.add_paragraph()
+    p = doc.add_paragraph()
+    run = p.add_run(codigo)
+    run.bold = True
+    run.font.size = Pt(12)
+    run.font.color.rgb = RGBColor(128, 0, 128)
+    
+    doc.add_paragraph()
+    
+    # Recomendaciones
+    doc.add_heading('RECOMENDACIONES', level=2)
+    doc.add_paragraph('1. Correlación clínica con sintomatología de la paciente.')
+    doc.add_paragraph('2. Valoración por especialista en endometriosis.')
+    doc.add_paragraph('3. Considerar estudios complementarios según criterio clínico.')
+    doc.add_paragraph('4. Planificación quirúrgica multidisciplinaria si está indicada.')
+
+
+# Secciones del documento en orden: (nombre, datos de los que depende, función que la agrega)
+SECCIONES_DOCUMENTO = (
+    ('paciente', lambda reporte: reporte.paciente, _seccion_paciente),
+    ('codigo', generar_codigo_enzian, _seccion_codigo),
+    ('peritoneo', lambda reporte: reporte.peritoneo, _seccion_peritoneo),
+    ('ovarios', lambda reporte: reporte.ovarios, _seccion_ovarios),
+    ('tubos', lambda reporte: reporte.tubos, _seccion_tubos),
+    ('compartimento_a', lambda reporte: reporte.compartimento_a, _seccion_compartimento_a),
+    ('compartimento_b', lambda reporte: reporte.compartimento_b, _seccion_compartimento_b),
+    ('compartimento_c', lambda reporte: reporte.compartimento_c, _seccion_compartimento_c),
+    ('localizaciones_f', lambda reporte: reporte.localizaciones_f, _seccion_localizaciones_f),
+    ('conclusiones', generar_codigo_enzian, _seccion_conclusiones),
+)
+
+# Elementos XML ya construidos de cada sección, por (nombre, huella de sus datos)
+MAXIMO_FRAGMENTOS = 512
+_fragmentos: 'OrderedDict[Tuple[str, str], Tuple[Any, ...]]' = OrderedDict()
+_candado_fragmentos = threading.Lock()
+
+
+def _insertar(cuerpo, elemento):
+    """Agrega un elemento al final del cuerpo, antes de las propiedades de sección"""
+    if cuerpo.sectPr is not None:
+        cuerpo.sectPr.addprevious(elemento)
+    else:
+        cuerpo.append(elemento)
+
+
+def _fin(cuerpo):
+    """Posición del cuerpo donde python-docx agrega el siguiente elemento"""
+    return len(cuerpo) - (1 if cuerpo.sectPr is not None else 0)
+
+
+def _agregar_seccion(doc, nombre, datos, agregar, reporte):
+    """Agrega una sección copiando su XML si ya se construyó con los mismos datos"""
+    clave = (nombre, hashlib.sha1(repr(datos).encode('utf-8')).hexdigest())
+    cuerpo = doc.element.body
+    
+    with _candado_fragmentos:
+        fragmento = _fragmentos.get(clave)
+        if fragmento is not None:
+            _fragmentos.move_to_end(clave)
+            for elemento in fragmento:
+                _insertar(cuerpo, copy.deepcopy(elemento))
+            return
+    
+    inicio = _fin(cuerpo)
+    agregar(doc, reporte)
+    fragmento = tuple(copy.deepcopy(elemento) for elemento in cuerpo[inicio:_fin(cuerpo)])
+    
+    with _candado_fragmentos:
+        _fragmentos[clave] = fragmento
+        while len(_fragmentos) > MAXIMO_FRAGMENTOS:
+            _fragmentos.popitem(last=False)
+
+
+def invalidar_cache_secciones():
+    """Vacía la caché de fragmentos XML de las secciones"""
+    with _candado_fragmentos:
+        _fragmentos.clear()
+
+
+# Motores de generación: 'docx' (python-docx) y 'xml' (escritor directo, ver documento_xml)
+MOTORES = ('docx', 'xml')
+
+
+def generar_reporte_word(reporte: ReporteEnzian, motor: str = 'docx', determinista: bool = False) -> io.BytesIO:
+    """Genera el reporte en Word y lo devuelve en memoria
+
+    Cada sección se construye con python-docx solo la primera vez que aparece
+    con sus datos; después se copian sus elementos XML desde la caché.
+    Con motor='xml' el documento lo escribe documento_xml, con el mismo contenido.
+    Con determinista=True los mismos datos dan los mismos bytes con ambos motores.
+    """
+    if motor not in MOTORES:
+        raise ValueError(f"Motor desconocido: {motor!r}; use uno de {MOTORES}")
+    if motor == 'xml':
+        return generar_reporte_xml(reporte, determinista)
+    
+    doc = nuevo_documento()
+    
+    for nombre, datos, agregar in SECCIONES_DOCUMENTO:
+        _agregar_seccion(doc, nombre, datos(reporte), agregar, reporte)
+    
+    # Firma
+    _agregar_firma(doc)
+    
+    # Guardar en memoria
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    if determinista:
+        buffer = io.BytesIO(reempacar(buffer.getvalue()))
+    buffer.seek(0)
+    
+    return buffer
@@ -0,0 +1,481 @@
+"""Escritor directo de WordprocessingML para el reporte #Enzian
+
+Alternativa rápida a documento.generar_reporte_word() para la estructura fija
+del reporte: en lugar del modelo de objetos de python-docx, cada sección se
+escribe como texto XML con las mismas construcciones que produce python-docx
+(párrafos, runs, encabezados, saltos de página y la tabla del paciente), y el
+DOCX se arma escribiendo directamente las entradas del zip.
+
+Las partes fijas de la plantilla (estilos, tema, numeración, propiedades...)
+se comprimen una sola vez por proceso y se copian ya comprimidas en cada
+documento; solo word/document.xml se comprime por reporte. El resultado es
+byte a byte el mismo contenido que el camino de python-docx, con las
+entradas del zip en el mismo orden y con los mismos encabezados que
+escribe zipfile. verificar() compara ambos caminos para un reporte.
+
+Con determinista=True todas las entradas llevan la fecha 1980-01-01, de modo
+que los mismos datos dan siempre los mismos bytes; reempacar() hace lo mismo
+con un DOCX ya escrito por python-docx.
+
+python-docx solo se usa una vez por proceso, para obtener la plantilla.
+"""
+import functools
+import io
+import re
+import struct
+import time
+import zipfile
+import zlib
+from typing import List, Tuple
+from xml.sax.saxutils import escape
+
+from .codigo import generar_codigo_enzian
+from .modelo import ReporteEnzian
+
+DOCUMENTO = 'word/document.xml'
+
+# Propiedades de run, en el orden en que python-docx las escribe
+NEGRITA = '<w:b/>'
+CODIGO = '<w:color w:val="800080"/><w:sz w:val="28"/>'
+CODIGO_CONCLUSION = '<w:b/><w:color w:val="800080"/><w:sz w:val="24"/>'
+
+CENTRADO = '<w:jc w:val="center"/>'
+
+SALTO_PAGINA = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+_SEPARADORES = re.compile(r'([\t\r\n])')
+_NO_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_TABLA_INICIO = (
+    '<w:tbl><w:tblPr><w:tblStyle w:val="LightGrid-Accent1"/><w:tblW w:type="auto" w:w="0"/>'
+    '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" w:noHBand="0" '
+    'w:noVBand="1" w:val="04A0"/></w:tblPr><w:tblGrid><w:gridCol w:w="4320"/><w:gridCol w:w="4320"/></w:tblGrid>'
+)
+_CELDA = '<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="4320"/></w:tcPr>{}</w:tc>'
+
+
+# ============= Construcciones de WordprocessingML =============
+
+def _contenido(texto: str) -> str:
+    """Contenido de un run como lo escribe python-docx: tabs y saltos aparte"""
+    if _NO_XML.search(texto):
+        raise ValueError("All strings must be XML compatible: Unicode or ASCII, no NULL bytes or control characters")
+    salida = []
+    for trozo in _SEPARADORES.split(texto):
+        if trozo == '\t':
+            salida.append('<w:tab/>')
+        elif trozo in ('\r', '\n'):
+            salida.append('<w:br/>')
+        elif trozo:
+            espacio = ' xml:space="preserve"' if len(trozo.strip()) < len(trozo) else ''
+            salida.append(f'<w:t{espacio}>{escape(trozo)}</w:t>')
+    return ''.join(salida)
+
+
+def run(texto: str, propiedades: str = '') -> str:
+    """Un run con sus propiedades (<w:rPr>) y su texto"""
+    interior = (f'<w:rPr>{propiedades}</w:rPr>' if propiedades else '') + (_contenido(texto) if texto else '')
+    return f'<w:r>{interior}</w:r>' if interior else '<w:r/>'
+
+
+def parrafo(*runs: str, propiedades: str = '') -> str:
+    """Un párrafo con sus propiedades (<w:pPr>) y sus runs"""
+    interior = (f'<w:pPr>{propiedades}</w:pPr>' if propiedades else '') + ''.join(runs)
+    return f'<w:p>{interior}</w:p>' if interior else '<w:p/>'
+
+
+def encabezado(texto: str, nivel: int) -> str:
+    """Equivalente de doc.add_heading()"""
+    estilo = 'Title' if nivel == 0 else f'Heading{nivel}'
+    return parrafo(run(texto), propiedades=f'<w:pStyle w:val="{estilo}"/>')
+
+
+def _tabla(filas) -> str:
+    """Tabla de dos columnas con el estilo de la tabla de datos del paciente"""
+    return _TABLA_INICIO + ''.join(
+        '<w:tr>' + ''.join(_CELDA.format(parrafo(run(texto))) for texto in fila) + '</w:tr>'
+        for fila in filas
+    ) + '</w:tbl>'
+
+
+# ============= Secciones (mismo contenido que documento.py) =============
+
+def _seccion_paciente(reporte: ReporteEnzian, xml: List[str]):
+    xml.append(encabezado('DATOS DEL PACIENTE', 1))
+    paciente = reporte.paciente
+
+    datos = [
+        ('Nombre:', paciente.get('nombre', 'N/A')),
+        ('Identificación:', paciente.get('cedula', 'N/A')),
+        ('Edad:', f"{paciente.get('edad', 'N/A')} años"),
+        ('Fecha del estudio:', str(paciente.get('fecha', 'N/A'))),
+        ('Médico solicitante:', paciente.get('medico', 'N/A'))
+    ]
+    xml.append(_tabla((campo, str(valor)) for campo, valor in datos))
+
+    if paciente.get('indicacion'):
+        xml.append(parrafo())
+        xml.append(parrafo(run('Indicación: ', NEGRITA), run(paciente['indicacion'])))
+
+    xml.append(SALTO_PAGINA)
+
+
+def _seccion_codigo(reporte: ReporteEnzian, xml: List[str]):
+    xml.append(encabezado('CLASIFICACIÓN #ENZIAN', 1))
+    xml.append(parrafo(run('Código: ', NEGRITA), run(generar_codigo_enzian(reporte), CODIGO)))
+    xml.append(parrafo())
+    xml.append(encabezado('HALLAZGOS DETALLADOS', 1))
+
+
+def _seccion_peritoneo(reporte: ReporteEnzian, xml: List[str]):
+    peritoneo = reporte.peritoneo
+    xml.append(encabezado('Peritoneo (P)', 2))
+
+    if peritoneo.get('estado') == 'anormal':
+        runs = [
+            run('Se identifican lesiones peritoneales superficiales. '),
+            run(f"Clasificación: {peritoneo.get('clasificacion', 'N/A')}. "),
+        ]
+        if peritoneo.get('localizaciones'):
+            runs.append(run(f"Localizaciones: {', '.join(peritoneo['localizaciones'])}. "))
+        if peritoneo.get('descripcion'):
+            runs.append(run(peritoneo['descripcion']))
+        xml.append(parrafo(*runs))
+    else:
+        xml.append(parrafo(run('Sin evidencia de lesiones peritoneales superficiales.')))
+
+
+def _ovario(nombre, ovario) -> str:
+    runs = [run(f'Ovario {nombre}: ', NEGRITA)]
+    if ovario.get('estado') == 'anormal':
+        runs += [
+            run(f"Endometrioma de {ovario.get('diametro', 0)}cm. "),
+            run(f"Clasificación: {ovario.get('clasificacion', 'N/A')}. "),
+            run(f"Estructura: {ovario.get('estructura', 'N/A')}. "),
+            run(f"Contenido: {ovario.get('contenido', 'N/A')}. "),
+            run(f"Vascularización: {ovario.get('vascularizacion', 'N/A')}. "),
+        ]
+        if ovario.get('adherencias'):
+            runs.append(run('Signos de adherencias a estructuras adyacentes. '))
+        if ovario.get('descripcion'):
+            runs.append(run(ovario['descripcion']))
+    elif ovario.get('estado') == 'no_visualizado':
+        runs.append(run('No visualizado.'))
+    else:
+        runs.append(run('Sin alteraciones evidentes.'))
+    return parrafo(*runs)
+
+
+def _seccion_ovarios(reporte: ReporteEnzian, xml: List[str]):
+    xml.append(encabezado('Ovarios (O)', 2))
+    xml.append(_ovario('derecho', reporte.ovarios['derecho']))
+    xml.append(_ovario('izquierdo', reporte.ovarios['izquierdo']))
+
+
+def _tubo(nombre, tubo) -> str:
+    runs = [run(f'Lado {nombre}: ', NEGRITA)]
+    if tubo.get('estado') == 'anormal':
+        runs += [
+            run(f"{tubo.get('clasificacion', 'N/A')}. "),
+            run(f"Sliding sign: {tubo.get('sliding_sign', 'N/A')}. "),
+        ]
+        if tubo.get('permeabilidad') != 'No evaluada':
+            runs.append(run(f"Permeabilidad: {tubo.get('permeabilidad', 'N/A')}. "))
+        if tubo.get('descripcion'):
+            runs.append(run(tubo['descripcion']))
+    else:
+        runs.append(run('Movilidad preservada, sin adherencias evidentes.'))
+    return parrafo(*runs)
+
+
+def _seccion_tubos(reporte: ReporteEnzian, xml: List[str]):
+    xml.append(encabezado('Condición Tubo-Ovárica (T)', 2))
+    xml.append(_tubo('derecho', reporte.tubos['derecho']))
+    xml.append(_tubo('izquierdo', reporte.tubos['izquierdo']))
+
+
+def _seccion_compartimento_a(reporte: ReporteEnzian, xml: List[str]):
+    xml.append(encabezado('Compartimento A (Vagina/Espacio Rectovaginal)', 2))
+    comp_a = reporte.compartimento_a
+
+    if comp_a.get('estado') == 'anormal':
+        runs = [
+            run(f"Lesión de endometriosis profunda de {comp_a.get('diametro', 0)}cm. "),
+            run(f"Clasificación: {comp_a.get('clasificacion', 'N/A')}. "),
+        ]
+        if comp_a.get('localizacion'):
+            runs.append(run(f"Localización: {', '.join(comp_a['localizacion'])}. "))
+        runs += [
+            run(f"Ecogenicidad: {comp_a.get('ecogenicidad', 'N/A')}. "),
+            run(f"Contornos: {comp_a.get('contornos', 'N/A')}. "),
+        ]
+        if comp_a.get('descripcion'):
+            runs.append(run(comp_a['descripcion']))
+        xml.append(parrafo(*runs))
+    else:
+        xml.append(parrafo(run('Sin lesiones de endometriosis profunda en vagina ni espacio rectovaginal.')))
+
+
+def _ligamento(nombre, lsu) -> str:
+    runs = [run(f'Ligamento uterosacro {nombre}: ', NEGRITA)]
+    if lsu.get('estado') == 'anormal':
+        runs += [
+            run(f"Lesión de {lsu.get('diametro_max', 0)}cm "),
+            run(f"(AP: {lsu.get('dim_ap', 0)}cm, CC: {lsu.get('dim_cc', 0)}cm). "),
+            run(f"Clasificación: {lsu.get('clasificacion', 'N/A')}. "),
+            run(f"Sliding sign: {lsu.get('sliding_sign', 'N/A')}. "),
+        ]
+        if lsu.get('descripcion'):
+            runs.append(run(lsu['descripcion']))
+    else:
+        runs.append(run('Sin alteraciones.'))
+    return parrafo(*runs)
+
+
+def _seccion_compartimento_b(reporte: ReporteEnzian, xml: List[str]):
+    xml.append(encabezado('Compartimento B (Ligamentos Uterosacros)', 2))
+    xml.append(_ligamento('derecho', reporte.compartimento_b['derecho']))
+    xml.append(_ligamento('izquierdo', reporte.compartimento_b['izquierdo']))
+
+
+def _seccion_compartimento_c(reporte: ReporteEnzian, xml: List[str]):
+    xml.append(encabezado('Compartimento C (Recto)', 2))
+    comp_c = reporte.compartimento_c
+
+    if comp_c.get('estado') == 'anormal':
+        runs = [
+            run(f"Lesión de endometriosis rectal de {comp_c.get('longitud', 0)}cm de longitud. "),
+            run(f"Clasificación: {comp_c.get('clasificacion', 'N/A')}. "),
+            run(f"Distancia desde margen anal: {comp_c.get('distancia_anal', 0)}cm. "),
+            run(f"Profundidad de infiltración: {comp_c.get('profundidad', 'N/A')}. "),
+            run(f"Circunferencia afectada: {comp_c.get('circunferencia', 0)}%. "),
+        ]
+        if comp_c.get('estenosis'):
+            runs.append(run('Signos de estenosis presentes. '))
+        runs.append(run(f"Sliding sign: {comp_c.get('sliding_sign', 'N/A')}. "))
+        if comp_c.get('descripcion'):
+            runs.append(run(comp_c['descripcion']))
+        xml.append(parrafo(*runs))
+    else:
+        xml.append(parrafo(run('Sin evidencia de endometriosis rectal.')))
+
+
+def _seccion_localizaciones_f(reporte: ReporteEnzian, xml: List[str]):
+    xml.append(encabezado('Localizaciones Extragenitales (F)', 2))
+    loc_f = reporte.localizaciones_f
+
+    if loc_f.get('adenomiosis', {}).get('presente'):
+        runs = [run('Adenomiosis (FA): ', NEGRITA)]
+        criterios = loc_f['adenomiosis'].get('criterios_musa', [])
+        if criterios:
+            runs.append(run(f"Criterios MUSA: {', '.join(criterios)}. "))
+        if loc_f['adenomiosis'].get('descripcion'):
+            runs.append(run(loc_f['adenomiosis']['descripcion']))
+        xml.append(parrafo(*runs))
+
+    if loc_f.get('vejiga', {}).get('presente'):
+        vejiga_data = loc_f['vejiga']
+        runs = [
+            run('Vejiga (FB): ', NEGRITA),
+            run(f"Lesión en {vejiga_data.get('localizacion', 'N/A')}. "),
+            run(f"Profundidad: {vejiga_data.get('profundidad', 'N/A')}. "),
+            run(f"Dimensión: {vejiga_data.get('dimension', 0)}cm. "),
+        ]
+        if vejiga_data.get('descripcion'):
+            runs.append(run(vejiga_data['descripcion']))
+        xml.append(parrafo(*runs))
+
+    if loc_f.get('ureter', {}).get('presente'):
+        ureter_data = loc_f['ureter']
+        lados = ureter_data.get('lados', [])
+        runs = [
+            run('Uréter (FU): ', NEGRITA),
+            run(f"Compromiso ureteral {'bilateral' if len(lados) == 2 else lados[0].lower()}. "),
+            run(f"Tipo: {ureter_data.get('tipo_compromiso', 'N/A')}. "),
+        ]
+        if ureter_data.get('descripcion'):
+            runs.append(run(ureter_data['descripcion']))
+        xml.append(parrafo(*runs))
+
+    if loc_f.get('intestino', {}).get('presente'):
+        intestino_data = loc_f['intestino']
+        runs = [
+            run('Intestino (FI): ', NEGRITA),
+            run(f"Compromiso intestinal en: {', '.join(intestino_data.get('localizaciones', []))}. "),
+            run(f"Dimensión: {intestino_data.get('dimension', 0)}cm. "),
+        ]
+        if intestino_data.get('descripcion'):
+            runs.append(run(intestino_data['descripcion']))
+        xml.append(parrafo(*runs))
+
+    if loc_f.get('otras', {}).get('presente'):
+        tipos = loc_f['otras'].get('tipos', [])
+        xml.append(parrafo(run('Otras localizaciones: ', NEGRITA), run(f"{', '.join(tipos)}.")))
+
+    tiene_loc_f = any(
+        loc_f.get(clave, {}).get('presente') for clave in ('adenomiosis', 'vejiga', 'ureter', 'intestino', 'otras')
+    )
+    if not tiene_loc_f:
+        xml.append(parrafo(run('Sin compromiso de localizaciones extragenitales.')))
+
+    xml.append(SALTO_PAGINA)
+
+
+def _seccion_conclusiones(reporte: ReporteEnzian, xml: List[str]):
+    xml.append(encabezado('CONCLUSIONES', 1))
+    xml.append(parrafo(run('Hallazgos ultrasonográficos compatibles con endometriosis según clasificación #Enzian:')))
+    xml.append(parrafo())
+    xml.append(parrafo(run(generar_codigo_enzian(reporte), CODIGO_CONCLUSION)))
+    xml.append(parrafo())
+
+    xml.append(encabezado('RECOMENDACIONES', 2))
+    xml.append(parrafo(run('1. Correlación clínica con sintomatología de la paciente.')))
+    xml.append(parrafo(run('2. Valoración por especialista en endometriosis.')))
+    xml.append(parrafo(run('3. Considerar estudios complementarios según criterio clínico.')))
+    xml.append(parrafo(run('4. Planificación quirúrgica multidisciplinaria si está indicada.')))
+
+
+def _firma(xml: List[str]):
+    xml.append(parrafo())
+    xml.append(parrafo())
+    xml.append(parrafo(run('_' * 50), propiedades=CENTRADO))
+    xml.append(parrafo(run('Médico Ginecólogo'), propiedades=CENTRADO))
+
+
+SECCIONES = (
+    _seccion_paciente,
+    _seccion_codigo,
+    _seccion_peritoneo,
+    _seccion_ovarios,
+    _seccion_tubos,
+    _seccion_compartimento_a,
+    _seccion_compartimento_b,
+    _seccion_compartimento_c,
+    _seccion_localizaciones_f,
+    _seccion_conclusiones,
+)
+
+
+def documento_xml(reporte: ReporteEnzian) -> bytes:
+    """Contenido de word/document.xml del reporte"""
+    prefijo, sufijo = _paquete()[1:]
+    xml = []
+    for seccion in SECCIONES:
+        seccion(reporte, xml)
+    _firma(xml)
+    return prefijo + ''.join(xml).encode('utf-8') + sufijo
+
+
+# ============= Paquete zip =============
+
+class _Entrada:
+    """Entrada del zip ya comprimida, con los campos que escribe zipfile"""
+
+    __slots__ = ('nombre', 'crc', 'comprimido', 'tamano')
+
+    def __init__(self, nombre: str, crc: int, comprimido: bytes, tamano: int):
+        self.nombre = nombre.encode('ascii')
+        self.crc = crc
+        self.comprimido = comprimido
+        self.tamano = tamano
+
+    @classmethod
+    def comprimir(cls, nombre: str, contenido: bytes) -> '_Entrada':
+        compresor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        return cls(nombre, zlib.crc32(contenido), compresor.compress(contenido) + compresor.flush(), len(contenido))
+
+
+@functools.lru_cache(maxsize=None)
+def _paquete() -> Tuple[Tuple[_Entrada, ...], bytes, bytes]:
+    """Entradas fijas de la plantilla comprimidas y document.xml partido alrededor del cuerpo"""
+    # python-docx solo se importa aquí, para construir la plantilla una vez por proceso
+    from .documento import _plantilla_base
+
+    plantilla = zipfile.ZipFile(io.BytesIO(_plantilla_base()))
+    entradas = tuple(
+        None if nombre == DOCUMENTO else _Entrada.comprimir(nombre, plantilla.read(nombre))
+        for nombre in plantilla.namelist()
+    )
+    documento = plantilla.read(DOCUMENTO)
+    corte = documento.rindex(b'<w:sectPr')
+    return entradas, documento[:corte], documento[corte:]
+
+
+# Cabeceras de zipfile para entradas DEFLATE de tamaño conocido
+_CABECERA_LOCAL = struct.Struct('<4s2B4HL2L2H')
+_CABECERA_CENTRAL = struct.Struct('<4s4B4HL2L5HLL')
+_FIN_CENTRAL = struct.Struct('<4s4H2LH')
+_VERSION = 20
+_SISTEMA = zipfile.ZipInfo().create_system
+_ATRIBUTOS = 0o600 << 16
+
+# Fecha de las entradas en modo determinista: la mínima que admite el formato zip
+FECHA_DETERMINISTA = (1980, 1, 1, 0, 0, 0)
+
+
+def _fecha_dos(fecha) -> Tuple[int, int]:
+    return (fecha[0] - 1980) << 9 | fecha[1] << 5 | fecha[2], fecha[3] << 11 | fecha[4] << 5 | fecha[5] // 2
+
+
+def escribir_zip(entradas, fecha=None) -> bytes:
+    """Arma el zip a partir de entradas ya comprimidas, como lo haría zipfile.writestr()"""
+    dia, hora = _fecha_dos(fecha or time.localtime(time.time())[:6])
+    salida = io.BytesIO()
+    central = []
+    for entrada in entradas:
+        desplazamiento = salida.tell()
+        salida.write(_CABECERA_LOCAL.pack(
+            b'PK\003\004', _VERSION, 0, 0, zipfile.ZIP_DEFLATED, hora, dia,
+            entrada.crc, len(entrada.comprimido), entrada.tamano, len(entrada.nombre), 0
+        ))
+        salida.write(entrada.nombre)
+        salida.write(entrada.comprimido)
+        central.append(_CABECERA_CENTRAL.pack(
+            b'PK\001\002', _VERSION, _SISTEMA, _VERSION, 0, 0, zipfile.ZIP_DEFLATED, hora, dia,
+            entrada.crc, len(entrada.comprimido), entrada.tamano, len(entrada.nombre), 0, 0, 0, 0,
+            _ATRIBUTOS, desplazamiento
+        ) + entrada.nombre)
+    inicio_central = salida.tell()
+    for registro in central:
+        salida.write(registro)
+    salida.write(_FIN_CENTRAL.pack(
+        b'PK\005\006', 0, 0, len(central), len(central), salida.tell() - inicio_central, inicio_central, 0
+    ))
+    return salida.getvalue()
+
+
+def reempacar(contenido: bytes, fecha=FECHA_DETERMINISTA) -> bytes:
+    """Reescribe un DOCX con otra fecha en todas sus entradas, sin volver a comprimirlas"""
+    paquete = zipfile.ZipFile(io.BytesIO(contenido))
+    entradas = []
+    for info in paquete.infolist():
+        if info.compress_type != zipfile.ZIP_DEFLATED:
+            raise ValueError(f"{info.filename}: se esperaba una entrada DEFLATE")
+        # Los datos empiezan después de la cabecera local, con su nombre y su campo extra
+        largo_nombre, largo_extra = struct.unpack_from('<2H', contenido, info.header_offset + 26)
+        inicio = info.header_offset + _CABECERA_LOCAL.size + largo_nombre + largo_extra
+        comprimido = contenido[inicio:inicio + info.compress_size]
+        entradas.append(_Entrada(info.filename, info.CRC, comprimido, info.file_size))
+    return escribir_zip(entradas, fecha)
+
+
+def generar_reporte_xml(reporte: ReporteEnzian, determinista: bool = False) -> io.BytesIO:
+    """Genera el reporte en Word escribiendo el XML directamente"""
+    entradas, _, _ = _paquete()
+    documento = _Entrada.comprimir(DOCUMENTO, documento_xml(reporte))
+    buffer = io.BytesIO(escribir_zip(
+        (documento if entrada is None else entrada for entrada in entradas),
+        FECHA_DETERMINISTA if determinista else None
+    ))
+    return buffer
+
+
+def verificar(reporte: ReporteEnzian) -> List[str]:
+    """Partes del DOCX en las que este escritor difiere de python-docx (vacía si coinciden)"""
+    from .documento import generar_reporte_word
+
+    rapido = zipfile.ZipFile(generar_reporte_xml(reporte))
+    referencia = zipfile.ZipFile(generar_reporte_word(reporte))
+    if rapido.namelist() != referencia.namelist():
+        return ['(orden de las entradas)']
+    return [nombre for nombre in referencia.namelist() if rapido.read(nombre) != referencia.read(nombre)]
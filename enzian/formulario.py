@@ -0,0 +1,292 @@
+"""Correspondencia entre el reporte y las claves de los widgets de la aplicación
+
+Las pestañas reconstruyen st.session_state.data a partir de sus widgets en
+cada ejecución, de modo que cargar un estudio (borrador JSON o registro del
+almacén) consiste en escribir sus valores en las claves de los widgets:
+
+    for clave in list(st.session_state):
+        if es_clave_formulario(clave):
+            del st.session_state[clave]
+    st.session_state.update(valores_formulario(datos))
+
+Solo se incluyen los campos de detalle de las secciones anormales o
+presentes, como en la aplicación. Un valor que el widget no admite (fuera de
+rango o que no es una de sus opciones) se omite y el widget queda con su
+valor por defecto.
+"""
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Tuple
+
+_OMITIR = object()
+
+Conversion = Callable[[Any], Any]
+
+
+# ============= Conversiones por tipo de widget =============
+
+def _texto(valor):
+    return valor if isinstance(valor, str) else _OMITIR
+
+
+def _booleano(valor):
+    return valor if isinstance(valor, bool) else _OMITIR
+
+
+def _numero(tipo, minimo, maximo) -> Conversion:
+    def convertir(valor):
+        if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+            return _OMITIR
+        valor = tipo(valor)
+        return valor if minimo <= valor <= maximo else _OMITIR
+    return convertir
+
+
+def _real(minimo, maximo) -> Conversion:
+    return _numero(float, minimo, maximo)
+
+
+def _entero(minimo, maximo) -> Conversion:
+    return _numero(int, minimo, maximo)
+
+
+def _opcion(*opciones) -> Conversion:
+    return lambda valor: valor if valor in opciones else _OMITIR
+
+
+def _opciones(*opciones) -> Conversion:
+    def convertir(valor):
+        if not isinstance(valor, list):
+            return _OMITIR
+        return [v for v in valor if v in opciones]
+    return convertir
+
+
+def _fecha(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    try:
+        return date.fromisoformat(str(valor)[:10])
+    except ValueError:
+        return _OMITIR
+
+
+# ============= Widgets de cada pestaña =============
+
+_SLIDING = _opcion("Positivo (móvil)", "Limitado", "Negativo (fijo)")
+_SI_NO = {True: "Sí", False: "No"}
+
+PACIENTE = (
+    ('nombre_paciente', 'nombre', _texto),
+    ('edad_paciente', 'edad', _entero(0, 120)),
+    ('cedula_paciente', 'cedula', _texto),
+    ('fecha_estudio', 'fecha', _fecha),
+    ('medico_solicitante', 'medico', _texto),
+    ('indicacion_estudio', 'indicacion', _texto),
+)
+
+PERITONEO = (
+    ('clasificacion_p', 'clasificacion', _opcion("P1 (<3 cm)", "P2 (3-7 cm)", "P3 (>7 cm)")),
+    ('diametro_peritoneo', 'diametro', _real(0.0, 20.0)),
+    ('localizaciones_peritoneo', 'localizaciones', _opciones(
+        "Fondo de saco de Douglas", "Peritoneo pélvico lateral", "Ligamento ancho", "Peritoneo vesical", "Otras"
+    )),
+    ('descripcion_peritoneo', 'descripcion', _texto),
+)
+
+
+def _ovario(s):
+    return (
+        (f'diametro_ovario_{s}', 'diametro', _real(0.0, 15.0)),
+        (f'num_endometriomas_{s}', 'num_endometriomas', _entero(1, 10)),
+        (f'clasificacion_o_{s}', 'clasificacion', _opcion("O1 (<3cm)", "O2 (3-7cm)", "O3 (>7cm)")),
+        (f'estructura_ovario_{s}', 'estructura', _opcion(
+            "Unilocular", "Multilocular", "Unilocular-sólido", "Multilocular-sólido", "Sólido"
+        )),
+        (f'contenido_ovario_{s}', 'contenido', _opcion(
+            "Anecoico", "Homogéneo de baja intensidad (ground glass)", "Heterogéneo", "Con nivel líquido-líquido"
+        )),
+        (f'vascularizacion_{s}', 'vascularizacion', _opcion("Ausente", "Mínima periférica", "Moderada", "Abundante")),
+        (f'adherencias_ovario_{s}', 'adherencias', _booleano),
+        (f'descripcion_ovario_{s}', 'descripcion', _texto),
+    )
+
+
+def _tubo(s):
+    return (
+        (f'clasificacion_t_{s}', 'clasificacion', _opcion(
+            "T1 - Adherencias ovario-pared pélvica",
+            "T2 - T1 + adherencias al útero",
+            "T3 - T2 + adherencias a LSU/intestino",
+        )),
+        (f'sliding_sign_{s}', 'sliding_sign', _SLIDING),
+        (f'permeabilidad_{s}', 'permeabilidad', _opcion("No evaluada", "Permeable (+)", "No permeable (-)")),
+        (f'descripcion_tubo_{s}', 'descripcion', _texto),
+    )
+
+
+COMPARTIMENTO_A = (
+    ('diametro_comp_a', 'diametro', _real(0.0, 10.0)),
+    ('clasificacion_a', 'clasificacion', _opcion("A1 (<1 cm)", "A2 (1-3 cm)", "A3 (>3 cm)")),
+    ('localizacion_comp_a', 'localizacion', _opciones(
+        "Fórnix vaginal posterior", "Espacio rectovaginal", "Área retrocervical"
+    )),
+    ('ecogenicidad_comp_a', 'ecogenicidad', _opcion("Hipoecogénica", "Isoecogénica", "Heterogénea")),
+    ('contornos_comp_a', 'contornos', _opcion("Regulares", "Irregulares", "Espiculados")),
+    ('descripcion_comp_a', 'descripcion', _texto),
+)
+
+
+def _ligamento(s):
+    return (
+        (f'diametro_lsu_{s}', 'diametro_max', _real(0.0, 10.0)),
+        (f'dim_ap_lsu_{s}', 'dim_ap', _real(0.0, 10.0)),
+        (f'dim_cc_lsu_{s}', 'dim_cc', _real(0.0, 10.0)),
+        (f'clasificacion_b_{s}', 'clasificacion', _opcion("B1 (<1 cm)", "B2 (1-3 cm)", "B3 (>3 cm)")),
+        (f'sliding_lsu_{s}', 'sliding_sign', _SLIDING),
+        (f'distancia_cervix_{s}', 'distancia_cervix', _real(0.0, 10.0)),
+        (f'descripcion_lsu_{s}', 'descripcion', _texto),
+    )
+
+
+COMPARTIMENTO_C = (
+    ('longitud_lesion_c', 'longitud', _real(0.0, 20.0)),
+    ('clasificacion_c', 'clasificacion', _opcion("C1 (<1 cm)", "C2 (1-3 cm)", "C3 (>3 cm)")),
+    ('distancia_anal_c', 'distancia_anal', _real(0.0, 16.0)),
+    ('profundidad_infiltracion_c', 'profundidad', _opcion("Serosa/subserosa", "Muscular propia", "Submucosa", "Mucosa")),
+    ('porcentaje_circunferencia_c', 'circunferencia', _entero(0, 100)),
+    ('estenosis_c', 'estenosis', _booleano),
+    ('sliding_sign_rectal', 'sliding_sign', _SLIDING),
+    ('descripcion_comp_c', 'descripcion', _texto),
+)
+
+ADENOMIOSIS = (
+    ('criterios_musa', 'criterios_musa', _opciones(
+        "Asimetría de paredes miometriales",
+        "Quistes miometriales",
+        "Hiperplasia endometrial focal",
+        "Líneas de sombra",
+        "Áreas heterogéneas en miometrio",
+        "Zona juncional irregular",
+        "Vascularización translesional",
+    )),
+    ('descripcion_adenomiosis', 'descripcion', _texto),
+)
+
+VEJIGA = (
+    ('localizacion_vejiga', 'localizacion', _opcion("Pared posterior", "Cúpula", "Trígono", "Otras")),
+    ('profundidad_vejiga', 'profundidad', _opcion("Serosa", "Muscular", "Submucosa", "Mucosa")),
+    ('dimension_vejiga', 'dimension', _real(0.0, 10.0)),
+    ('descripcion_vejiga', 'descripcion', _texto),
+)
+
+LADOS_URETER = ("Derecho", "Izquierdo")
+
+URETER = (
+    ('lado_ureter', 'lados', _opciones(*LADOS_URETER)),
+    ('tipo_compromiso_ureter', 'tipo_compromiso', _opcion("Extrínseco", "Intrínseco", "Mixto")),
+    ('descripcion_ureter', 'descripcion', _texto),
+)
+
+URETER_POR_LADO = (
+    ('diametro_ureter_{}', 'diametro', _real(0.0, 20.0)),
+    ('hidronefrosis_{}', 'hidronefrosis', _opcion("Ausente", "Leve", "Moderada", "Severa")),
+)
+
+INTESTINO = (
+    ('localizacion_intestino', 'localizaciones', _opciones(
+        "Sigma (>16cm)", "Colon transverso", "Ciego", "Apéndice", "Intestino delgado"
+    )),
+    ('dimension_intestino', 'dimension', _real(0.0, 15.0)),
+    ('descripcion_intestino', 'descripcion', _texto),
+)
+
+TIPOS_OTRAS = ("Pared abdominal", "Diafragma", "Pulmón", "Nervio", "Cicatriz quirúrgica", "Ombligo", "Otras")
+
+OTRAS = (
+    ('tipos_otras_localizaciones', 'tipos', _opciones(*TIPOS_OTRAS)),
+)
+
+# Radio de estado de cada sección: (clave, ruta, valor del reporte -> opción, campos de detalle)
+_NORMAL_ANORMAL = {'normal': "Normal", 'anormal': "Anormal"}
+_OVARIO = {**_NORMAL_ANORMAL, 'no_visualizado': "No visualizado"}
+_TUBO = {
+    'normal': "Normal - Movilidad preservada",
+    'anormal': "Anormal - Adherencias presentes",
+    'no_evaluable': "No evaluable",
+}
+
+ESTADOS: Tuple[Tuple[str, Tuple[str, ...], Dict[Any, str], tuple], ...] = (
+    ('peritoneo_estado', ('peritoneo',), _NORMAL_ANORMAL, PERITONEO),
+    ('ovario_der_estado', ('ovarios', 'derecho'), _OVARIO, _ovario('der')),
+    ('ovario_izq_estado', ('ovarios', 'izquierdo'), _OVARIO, _ovario('izq')),
+    ('tubo_der_estado', ('tubos', 'derecho'), _TUBO, _tubo('der')),
+    ('tubo_izq_estado', ('tubos', 'izquierdo'), _TUBO, _tubo('izq')),
+    ('comp_a_estado', ('compartimento_a',), _NORMAL_ANORMAL, COMPARTIMENTO_A),
+    ('lsu_der_estado', ('compartimento_b', 'derecho'), _NORMAL_ANORMAL, _ligamento('der')),
+    ('lsu_izq_estado', ('compartimento_b', 'izquierdo'), _NORMAL_ANORMAL, _ligamento('izq')),
+    ('comp_c_estado', ('compartimento_c',), _NORMAL_ANORMAL, COMPARTIMENTO_C),
+    ('adenomiosis_presente', ('localizaciones_f', 'adenomiosis'), _SI_NO, ADENOMIOSIS),
+    ('vejiga_presente', ('localizaciones_f', 'vejiga'), _SI_NO, VEJIGA),
+    ('ureter_presente', ('localizaciones_f', 'ureter'), _SI_NO, URETER),
+    ('intestino_presente', ('localizaciones_f', 'intestino'), _SI_NO, INTESTINO),
+    ('otras_localizaciones_presente', ('localizaciones_f', 'otras'), _SI_NO, OTRAS),
+)
+
+# Claves que dependen de los valores elegidos (lado del uréter, tipo de otra localización)
+PREFIJOS_DINAMICOS = ('diametro_ureter_', 'hidronefrosis_', 'descripcion_otra_')
+
+CLAVES = frozenset(
+    [clave for clave, _, _ in PACIENTE]
+    + [clave for clave, _, _, campos in ESTADOS for clave in (clave, *(c for c, _, _ in campos))]
+)
+
+
+def es_clave_formulario(clave: str) -> bool:
+    """Indica si la clave de session_state pertenece a un widget del formulario"""
+    return clave in CLAVES or clave.startswith(PREFIJOS_DINAMICOS)
+
+
+def _seccion(datos, ruta) -> Dict[str, Any]:
+    for clave in ruta:
+        datos = datos.get(clave) if isinstance(datos, dict) else None
+    return datos if isinstance(datos, dict) else {}
+
+
+def _copiar(valores, seccion, campos):
+    for clave, campo, convertir in campos:
+        if campo in seccion:
+            valor = convertir(seccion[campo])
+            if valor is not _OMITIR:
+                valores[clave] = valor
+
+
+def valores_formulario(datos: Dict[str, Any]) -> Dict[str, Any]:
+    """Valores de los widgets que reproducen un reporte, por clave de widget"""
+    valores: Dict[str, Any] = {}
+    _copiar(valores, _seccion(datos, ('paciente',)), PACIENTE)
+
+    for clave, ruta, opciones, campos in ESTADOS:
+        seccion = _seccion(datos, ruta)
+        estado = seccion.get('presente', False) if opciones is _SI_NO else seccion.get('estado', 'normal')
+        if estado not in opciones:
+            continue
+        valores[clave] = opciones[estado]
+        if estado in ('anormal', True):
+            _copiar(valores, seccion, campos)
+
+    ureter = _seccion(datos, ('localizaciones_f', 'ureter'))
+    if valores.get('ureter_presente') == "Sí":
+        por_lado = ureter.get('por_lado') if isinstance(ureter.get('por_lado'), dict) else {}
+        for lado in valores.get('lado_ureter', []):
+            campos = tuple((plantilla.format(lado.lower()), campo, c) for plantilla, campo, c in URETER_POR_LADO)
+            _copiar(valores, _seccion(por_lado, (lado.lower(),)), campos)
+
+    otras = _seccion(datos, ('localizaciones_f', 'otras'))
+    if valores.get('otras_localizaciones_presente') == "Sí":
+        descripciones = otras.get('descripciones') if isinstance(otras.get('descripciones'), dict) else {}
+        for tipo in valores.get('tipos_otras_localizaciones', []):
+            _copiar(valores, descripciones, ((f"descripcion_otra_{tipo.replace(' ', '_')}", tipo, _texto),))
+
+    return valores
@@ -0,0 +1,263 @@
+"""Índice invertido de bitmaps sobre los componentes del código #Enzian
+
+Uso:
+    python -m enzian.indice_bitmap BORRADORES [BORRADORES ...] [-o indice.json]
+    python -m enzian.indice_bitmap --db reportes_enzian.db [-o indice.json]
+
+Cada registro ocupa una posición y cada valor de componente tiene un bitmap
+(un int de Python) con un bit por registro:
+
+    P1-P3, A1-A3, C1-C3           grado del componente
+    O.izq.0-3/x, O.der.0-3/x      ovario por lado (x: no visualizado)
+    T.izq.0-3, T.der.0-3          condición tubo-ovárica por lado
+    B.izq.0-3, B.der.0-3          ligamentos uterosacros por lado
+    FA, FB, FU.l, FU.r            componentes sin grado
+    FI:<localización>, F:<tipo>   localizaciones con nombre
+
+Las consultas se resuelven con &, | y ~ sobre enteros, sin volver a leer los
+registros: "B>=2 en cualquier lado AND C3 AND FU" es
+
+    indice.grado('B', 2) & indice.bitmap('C3') & indice.fu()
+
+En disco cada bitmap se guarda comprimido con zlib, que reduce a unos pocos
+bytes las largas rachas de ceros de los componentes poco frecuentes.
+"""
+import argparse
+import base64
+import json
+import sys
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .analizador import analizar_codigo
+from .codigo import ComponentesEnzian, desglose_enzian
+from .modelo import leer_borradores
+
+VERSION = 1
+
+LADOS = ('izq', 'der')
+
+# Componentes con un grado por lado y sus valores posibles
+_VALORES_LADO = {'O': '0123x', 'T': '0123', 'B': '0123'}
+
+
+def claves_componentes(comp: ComponentesEnzian) -> List[str]:
+    """Claves de bitmap que activa un desglose #Enzian"""
+    claves = [grado for grado in (comp.p, comp.a, comp.c) if grado]
+    for componente, par in (('O', comp.o), ('T', comp.t), ('B', comp.b)):
+        if par:
+            claves.extend(f"{componente}.{lado}.{valor}" for lado, valor in zip(LADOS, par))
+    if comp.fa:
+        claves.append('FA')
+    if comp.fb:
+        claves.append('FB')
+    claves.extend(f"FU.{lado}" for lado in comp.fu)
+    claves.extend(f"FI:{nombre}" for nombre in comp.fi)
+    claves.extend(f"F:{nombre}" for nombre in comp.f)
+    return claves
+
+
+def _bitmap_desde_posiciones(posiciones, desplazamiento, total):
+    """Construye un bitmap en O(n) a partir de posiciones relativas"""
+    bits = bytearray((total + 7) // 8)
+    for posicion in posiciones:
+        bits[posicion >> 3] |= 1 << (posicion & 7)
+    return int.from_bytes(bits, 'little') << desplazamiento
+
+
+def contar(bitmap: int) -> int:
+    """Número de registros en un bitmap"""
+    return bitmap.bit_count()
+
+
+def posiciones(bitmap: int) -> List[int]:
+    """Posiciones activas de un bitmap, en orden"""
+    binario = format(bitmap, 'b')[::-1] if bitmap else ''
+    return [i for i, bit in enumerate(binario) if bit == '1']
+
+
+class IndiceBitmap:
+    """Bitmaps por valor de componente sobre una colección de registros"""
+
+    def __init__(self):
+        self.ids: List[Any] = []
+        self._bitmaps: Dict[str, int] = {}
+        # Borradores que no se pudieron leer: ruta -> error (no se guarda en disco)
+        self.omitidos: Dict[str, str] = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __repr__(self):
+        return f"IndiceBitmap({len(self.ids)} registros, {len(self._bitmaps)} bitmaps)"
+
+    # Construcción
+
+    def agregar(self, registros: Iterable[Tuple[Any, ComponentesEnzian]]):
+        """Agrega registros (id, desglose) al final del índice"""
+        inicio = len(self.ids)
+        nuevas: Dict[str, List[int]] = {}
+        for id_registro, comp in registros:
+            posicion = len(self.ids) - inicio
+            self.ids.append(id_registro)
+            for clave in claves_componentes(comp):
+                nuevas.setdefault(clave, []).append(posicion)
+        total = len(self.ids) - inicio
+        for clave, lista in nuevas.items():
+            self._bitmaps[clave] = self._bitmaps.get(clave, 0) | _bitmap_desde_posiciones(lista, inicio, total)
+        return self
+
+    @classmethod
+    def construir(cls, registros: Iterable[Tuple[Any, ComponentesEnzian]]) -> 'IndiceBitmap':
+        """Crea un índice a partir de pares (id, desglose)"""
+        return cls().agregar(registros)
+
+    @classmethod
+    def desde_borradores(cls, rutas) -> 'IndiceBitmap':
+        """Crea un índice a partir de borradores JSON; el id de cada registro es su ruta
+
+        Los archivos que no son reportes válidos quedan fuera y se anotan en omitidos.
+        """
+        indice = cls()
+        return indice.agregar(leer_borradores(rutas, indice.omitidos, desglose_enzian))
+
+    @classmethod
+    def desde_almacen(cls, almacen, tipo=None) -> 'IndiceBitmap':
+        """Crea un índice a partir del almacén local; el id es el de la fila"""
+        condicion, parametros = ("WHERE tipo = ?", (tipo,)) if tipo else ("", ())
+        with almacen.conexion() as con:
+            filas = con.execute(f"SELECT id, codigo FROM reportes {condicion} ORDER BY id", parametros).fetchall()
+        return cls.construir((fila['id'], analizar_codigo(fila['codigo'])) for fila in filas)
+
+    # Consultas
+
+    def todos(self) -> int:
+        """Bitmap con todos los registros"""
+        return (1 << len(self.ids)) - 1
+
+    def negar(self, bitmap: int) -> int:
+        """Complemento de un bitmap dentro del índice"""
+        return self.todos() & ~bitmap
+
+    def claves(self) -> List[str]:
+        """Claves con al menos un registro"""
+        return sorted(self._bitmaps)
+
+    def bitmap(self, clave: str) -> int:
+        """Bitmap de una clave; vacío si ningún registro la tiene"""
+        return self._bitmaps.get(clave, 0)
+
+    def grado(self, componente: str, minimo=1, maximo=3, lado: Optional[str] = None) -> int:
+        """Registros con el componente entre minimo y maximo
+
+        Para O, T y B sin lado se unen ambos lados ("en cualquier lado").
+        """
+        componente = componente.upper()
+        grados = range(minimo, maximo + 1)
+        if componente in _VALORES_LADO:
+            lados = (lado,) if lado else LADOS
+            return self._unir(f"{componente}.{l}.{g}" for l in lados for g in grados)
+        if lado:
+            raise ValueError(f"El componente {componente} no tiene lados")
+        return self._unir(f"{componente}{g}" for g in grados)
+
+    def fu(self, lado: Optional[str] = None) -> int:
+        """Registros con compromiso ureteral, de un lado ('l'/'r') o de cualquiera"""
+        return self._unir(f"FU.{l}" for l in ((lado,) if lado else ('l', 'r')))
+
+    def fi(self, nombre: Optional[str] = None) -> int:
+        """Registros con compromiso intestinal, en una localización o en cualquiera"""
+        return self._prefijo('FI:', nombre)
+
+    def f(self, nombre: Optional[str] = None) -> int:
+        """Registros con otras localizaciones F(...), de un tipo o de cualquiera"""
+        return self._prefijo('F:', nombre)
+
+    def _unir(self, claves) -> int:
+        resultado = 0
+        for clave in claves:
+            resultado |= self._bitmaps.get(clave, 0)
+        return resultado
+
+    def _prefijo(self, prefijo, nombre):
+        if nombre is not None:
+            return self.bitmap(prefijo + nombre)
+        return self._unir(clave for clave in self._bitmaps if clave.startswith(prefijo))
+
+    def registros(self, bitmap: int) -> List[Any]:
+        """Ids de los registros de un bitmap"""
+        return [self.ids[i] for i in posiciones(bitmap)]
+
+    # Persistencia
+
+    def guardar(self, ruta):
+        """Escribe el índice en un archivo JSON con los bitmaps comprimidos"""
+        total = (len(self.ids) + 7) // 8
+        contenido = {
+            'version': VERSION,
+            'ids': self.ids,
+            'bitmaps': {
+                clave: base64.b64encode(zlib.compress(bitmap.to_bytes(total, 'little'))).decode('ascii')
+                for clave, bitmap in sorted(self._bitmaps.items())
+            },
+        }
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(contenido, f, ensure_ascii=False)
+
+    @classmethod
+    def cargar(cls, ruta) -> 'IndiceBitmap':
+        """Lee un índice escrito con guardar()"""
+        with open(ruta, encoding='utf-8') as f:
+            contenido = json.load(f)
+        if contenido.get('version') != VERSION:
+            raise ValueError(f"Versión de índice no soportada: {contenido.get('version')!r}")
+        indice = cls()
+        indice.ids = contenido['ids']
+        indice._bitmaps = {
+            clave: int.from_bytes(zlib.decompress(base64.b64decode(datos)), 'little')
+            for clave, datos in contenido['bitmaps'].items()
+        }
+        return indice
+
+
+def main(argv=None):
+    """Punto de entrada de la línea de comandos"""
+    from .lote import expandir_entradas
+
+    parser = argparse.ArgumentParser(
+        prog='python -m enzian.indice_bitmap',
+        description='Construye el índice de bitmaps #Enzian de un conjunto de reportes.'
+    )
+    parser.add_argument('entradas', nargs='*', help='Directorios, patrones glob o archivos JSON de borradores')
+    parser.add_argument('--db', help='Construir desde el almacén SQLite en lugar de borradores')
+    parser.add_argument('-o', '--salida', help='Archivo donde guardar el índice')
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    if args.db:
+        from .almacen import Almacen
+        indice = IndiceBitmap.desde_almacen(Almacen(args.db))
+    else:
+        rutas = expandir_entradas(args.entradas)
+        if not rutas:
+            print("❌ No se encontraron borradores JSON", file=sys.stderr)
+            return 2
+        indice = IndiceBitmap.desde_borradores(rutas)
+    duracion = time.perf_counter() - inicio
+
+    if args.salida:
+        indice.guardar(args.salida)
+
+    for ruta, error in indice.omitidos.items():
+        print(f"⚠️ Omitido {ruta}: {error}", file=sys.stderr)
+    print(f"Registros indexados: {len(indice)}")
+    print(f"Bitmaps: {len(indice.claves())}")
+    print(f"Tiempo de construcción: {duracion:.2f} s")
+    for clave in indice.claves():
+        print(f"  {clave:<24} {contar(indice.bitmap(clave))}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""Generación por lotes de reportes Word a partir de borradores JSON
+
+Uso:
+    python -m enzian.lote BORRADORES [BORRADORES ...] -o SALIDA [-j PROCESOS] [--motor xml]
+
+Cada entrada puede ser un directorio (se procesan sus *.json), un patrón
+glob o un archivo JSON generado por "Guardar Borrador". Con --motor xml
+los documentos se escriben con el escritor directo de documento_xml y con
+--determinista los mismos borradores dan siempre los mismos bytes.
+
+Cada DOCX se llama como su borrador; si dos borradores tienen el mismo
+nombre, solo se genera el primero y los demás se informan como errores.
+"""
+import argparse
+import functools
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .documento import MOTORES, generar_reporte_word
+from .modelo import ReporteEnzian
+
+# (borrador, docx generado o None, segundos, error o None)
+Resultado = Tuple[str, Optional[str], float, Optional[str]]
+
+
+def expandir_entradas(entradas: Iterable[str]) -> List[Path]:
+    """Convierte directorios, patrones glob y archivos en una lista de borradores"""
+    rutas = []
+    for entrada in entradas:
+        ruta = Path(entrada)
+        if ruta.is_dir():
+            rutas.extend(sorted(ruta.glob('*.json')))
+        elif ruta.is_file():
+            rutas.append(ruta)
+        else:
+            rutas.extend(Path(r) for r in sorted(glob.glob(entrada, recursive=True)))
+    # Eliminar duplicados conservando el orden
+    return list(dict.fromkeys(rutas))
+
+
+def nombre_salida(ruta: Path) -> str:
+    """Nombre del DOCX que se genera para un borrador"""
+    return f"{ruta.stem}.docx"
+
+
+def salidas_repetidas(rutas: Iterable[Path]) -> Dict[Path, Path]:
+    """Borradores cuyo DOCX tendría el nombre del de uno anterior: ruta -> ruta anterior
+
+    Los nombres se comparan sin distinguir mayúsculas, como en los sistemas de archivos que no las distinguen.
+    """
+    primeras: Dict[str, Path] = {}
+    repetidas = {}
+    for ruta in rutas:
+        nombre = nombre_salida(ruta).casefold()
+        if nombre in primeras:
+            repetidas[ruta] = primeras[nombre]
+        else:
+            primeras[nombre] = ruta
+    return repetidas
+
+
+def renderizar_borrador(ruta: Path, directorio_salida: Path, motor: str = 'docx', determinista: bool = False) -> Resultado:
+    """Genera el DOCX de un borrador; los errores se devuelven en lugar de propagarse"""
+    inicio = time.perf_counter()
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            datos = json.load(f)
+        buffer = generar_reporte_word(ReporteEnzian.desde_dict(datos), motor, determinista)
+        salida = directorio_salida / nombre_salida(ruta)
+        salida.write_bytes(buffer.getvalue())
+        return str(ruta), str(salida), time.perf_counter() - inicio, None
+    except Exception:
+        return str(ruta), None, time.perf_counter() - inicio, traceback.format_exc(limit=3)
+
+
+def procesar_lote(rutas, directorio_salida, procesos=None, tamano_bloque=8, al_progresar=None, motor='docx',
+                  determinista=False):
+    """Genera los reportes de todos los borradores con un pool de procesos"""
+    directorio_salida = Path(directorio_salida)
+    directorio_salida.mkdir(parents=True, exist_ok=True)
+    tarea = functools.partial(
+        renderizar_borrador, directorio_salida=directorio_salida, motor=motor, determinista=determinista
+    )
+
+    # Dos borradores con el mismo nombre escribirían el mismo DOCX: solo se genera el primero
+    rutas = list(rutas)
+    repetidas = salidas_repetidas(rutas)
+    resultados = []
+    for ruta, anterior in repetidas.items():
+        resultados.append((str(ruta), None, 0.0, f"El DOCX {nombre_salida(ruta)} ya corresponde a {anterior}"))
+        if al_progresar:
+            al_progresar(len(resultados), len(rutas), resultados[-1])
+    rutas_pendientes = [ruta for ruta in rutas if ruta not in repetidas]
+
+    if procesos == 1:
+        # Sin pool: útil para depurar y para lotes pequeños
+        for resultado in map(tarea, rutas_pendientes):
+            resultados.append(resultado)
+            if al_progresar:
+                al_progresar(len(resultados), len(rutas), resultado)
+        return resultados
+
+    with multiprocessing.Pool(processes=procesos) as pool:
+        for resultado in pool.imap_unordered(tarea, rutas_pendientes, chunksize=tamano_bloque):
+            resultados.append(resultado)
+            if al_progresar:
+                al_progresar(len(resultados), len(rutas), resultado)
+    return resultados
+
+
+def _imprimir_progreso(hechos, total, resultado):
+    """Muestra una línea de progreso por borrador en stderr"""
+    ruta, _, segundos, error = resultado
+    estado = "✓" if error is None else "✗"
+    print(f"[{hechos}/{total}] {estado} {os.path.basename(ruta)} ({segundos * 1000:.0f} ms)", file=sys.stderr)
+
+
+def main(argv=None):
+    """Punto de entrada de la línea de comandos"""
+    parser = argparse.ArgumentParser(
+        prog='python -m enzian.lote',
+        description='Genera reportes Word #Enzian a partir de borradores JSON.'
+    )
+    parser.add_argument('entradas', nargs='+', help='Directorios, patrones glob o archivos JSON de borradores')
+    parser.add_argument('-o', '--salida', required=True, help='Directorio donde escribir los DOCX')
+    parser.add_argument('-j', '--procesos', type=int, default=None,
+                        help='Número de procesos (por defecto, uno por CPU)')
+    parser.add_argument('--bloque', type=int, default=8, help='Borradores por tarea enviada a cada proceso')
+    parser.add_argument('--motor', choices=MOTORES, default='docx',
+                        help='Motor de generación: python-docx o escritor XML directo')
+    parser.add_argument('--determinista', action='store_true',
+                        help='DOCX reproducibles: los mismos datos dan siempre los mismos bytes')
+    parser.add_argument('-q', '--silencioso', action='store_true', help='No mostrar el progreso por archivo')
+    args = parser.parse_args(argv)
+
+    rutas = expandir_entradas(args.entradas)
+    if not rutas:
+        print("❌ No se encontraron borradores JSON", file=sys.stderr)
+        return 2
+
+    inicio = time.perf_counter()
+    resultados = procesar_lote(
+        rutas,
+        args.salida,
+        procesos=args.procesos,
+        tamano_bloque=args.bloque,
+        al_progresar=None if args.silencioso else _imprimir_progreso,
+        motor=args.motor,
+        determinista=args.determinista,
+    )
+    duracion = time.perf_counter() - inicio
+
+    errores = [r for r in resultados if r[3] is not None]
+    generados = len(resultados) - len(errores)
+
+    for ruta, _, _, error in errores:
+        print(f"\n❌ {ruta}\n{error}", file=sys.stderr)
+
+    print(f"Reportes generados: {generados}/{len(resultados)}")
+    print(f"Errores: {len(errores)}")
+    print(f"Tiempo total: {duracion:.2f} s")
+    print(f"Rendimiento: {len(resultados) / duracion if duracion else 0:.1f} reportes/s")
+
+    return 1 if errores else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
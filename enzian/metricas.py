@@ -0,0 +1,180 @@
+"""Contadores e histogramas de tiempos con exportación en formato Prometheus
+
+    metricas = Metricas()
+    with metricas.medir('pestana_ovarios', destino=tiempos):
+        ...
+    metricas.contar('enzian_ejecuciones_total')
+    texto = metricas.exportar_prometheus()
+
+medir() suma la duración al histograma enzian_seccion_duracion_segundos
+con la etiqueta seccion y, si se da un dict destino, guarda ahí la última
+duración de la sección (el desglose de la ejecución actual).
+
+El texto se puede publicar en http://<host>:<puerto>/metrics con
+servir_http() o escribir en un archivo con escribir_archivo(), p. ej.
+para el textfile collector de node_exporter.
+"""
+import bisect
+import contextlib
+import http.server
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Límites superiores de los cubos de los histogramas, en segundos
+CUBOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HISTOGRAMA_SECCIONES = 'enzian_seccion_duracion_segundos'
+
+_AYUDA = {
+    HISTOGRAMA_SECCIONES: "Duración de cada sección del script por ejecución",
+    'enzian_ejecuciones_total': "Ejecuciones completas del script",
+    'enzian_reportes_total': "Reportes Word solicitados, por resultado (listo, error o cache)",
+}
+
+Etiquetas = Tuple[Tuple[str, str], ...]
+
+
+def _etiquetas(etiquetas: Dict[str, str]) -> Etiquetas:
+    return tuple(sorted(etiquetas.items()))
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formato_etiquetas(etiquetas: Etiquetas, extra=()) -> str:
+    pares = list(etiquetas) + list(extra)
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{clave}="{_escapar(valor)}"' for clave, valor in pares) + '}'
+
+
+class _Histograma:
+    __slots__ = ('cubos', 'suma', 'cantidad')
+
+    def __init__(self):
+        self.cubos = [0] * (len(CUBOS) + 1)
+        self.suma = 0.0
+        self.cantidad = 0
+
+    def observar(self, valor):
+        self.cubos[bisect.bisect_left(CUBOS, valor)] += 1
+        self.suma += valor
+        self.cantidad += 1
+
+
+class Metricas:
+    """Registro de contadores e histogramas, seguro entre hilos"""
+
+    def __init__(self):
+        self._contadores: Dict[Tuple[str, Etiquetas], float] = {}
+        self._histogramas: Dict[Tuple[str, Etiquetas], _Histograma] = {}
+        self._candado = threading.Lock()
+
+    def contar(self, nombre: str, incremento=1, **etiquetas):
+        """Incrementa un contador"""
+        clave = (nombre, _etiquetas(etiquetas))
+        with self._candado:
+            self._contadores[clave] = self._contadores.get(clave, 0) + incremento
+
+    def observar(self, nombre: str, valor: float, **etiquetas):
+        """Agrega una observación a un histograma"""
+        clave = (nombre, _etiquetas(etiquetas))
+        with self._candado:
+            histograma = self._histogramas.get(clave)
+            if histograma is None:
+                histograma = self._histogramas[clave] = _Histograma()
+            histograma.observar(valor)
+
+    def registrar(self, seccion: str, duracion: float, destino: Optional[Dict[str, float]] = None):
+        """Registra la duración de una sección, en segundos"""
+        self.observar(HISTOGRAMA_SECCIONES, duracion, seccion=seccion)
+        if destino is not None:
+            destino[seccion] = duracion
+
+    @contextlib.contextmanager
+    def medir(self, seccion: str, destino: Optional[Dict[str, float]] = None):
+        """Mide la duración del bloque y la registra para la sección"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(seccion, time.perf_counter() - inicio, destino)
+
+    def secciones(self) -> Dict[str, Tuple[int, float]]:
+        """Por sección: número de mediciones y duración media en segundos"""
+        with self._candado:
+            return {
+                dict(etiquetas)['seccion']: (h.cantidad, h.suma / h.cantidad if h.cantidad else 0.0)
+                for (nombre, etiquetas), h in self._histogramas.items()
+                if nombre == HISTOGRAMA_SECCIONES
+            }
+
+    def exportar_prometheus(self) -> str:
+        """Todas las métricas en el formato de texto de Prometheus"""
+        lineas = []
+        with self._candado:
+            contadores = sorted(self._contadores.items())
+            histogramas = [
+                (clave, list(h.cubos), h.suma, h.cantidad) for clave, h in sorted(self._histogramas.items())
+            ]
+
+        vistos = set()
+        for (nombre, etiquetas), valor in contadores:
+            if nombre not in vistos:
+                vistos.add(nombre)
+                lineas.append(f"# HELP {nombre} {_AYUDA.get(nombre, nombre)}")
+                lineas.append(f"# TYPE {nombre} counter")
+            lineas.append(f"{nombre}{_formato_etiquetas(etiquetas)} {valor}")
+
+        for (nombre, etiquetas), cubos, suma, cantidad in histogramas:
+            if nombre not in vistos:
+                vistos.add(nombre)
+                lineas.append(f"# HELP {nombre} {_AYUDA.get(nombre, nombre)}")
+                lineas.append(f"# TYPE {nombre} histogram")
+            acumulado = 0
+            for limite, cuenta in zip(CUBOS + (float('inf'),), cubos):
+                acumulado += cuenta
+                le = '+Inf' if limite == float('inf') else repr(limite)
+                lineas.append(f"{nombre}_bucket{_formato_etiquetas(etiquetas, [('le', le)])} {acumulado}")
+            lineas.append(f"{nombre}_sum{_formato_etiquetas(etiquetas)} {repr(suma)}")
+            lineas.append(f"{nombre}_count{_formato_etiquetas(etiquetas)} {cantidad}")
+        return '\n'.join(lineas) + '\n'
+
+    def escribir_archivo(self, ruta):
+        """Escribe la exportación de forma atómica (archivo temporal y reemplazo)"""
+        directorio = os.path.dirname(os.path.abspath(ruta))
+        descriptor, temporal = tempfile.mkstemp(dir=directorio, prefix='.metricas-', suffix='.prom')
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+                f.write(self.exportar_prometheus())
+            os.replace(temporal, ruta)
+        except BaseException:
+            os.unlink(temporal)
+            raise
+
+    def servir_http(self, puerto: int, host='127.0.0.1') -> http.server.ThreadingHTTPServer:
+        """Publica /metrics en un hilo de fondo y devuelve el servidor"""
+        metricas = self
+
+        class Manejador(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                cuerpo = metricas.exportar_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        servidor = http.server.ThreadingHTTPServer((host, puerto), Manejador)
+        threading.Thread(target=servidor.serve_forever, name='enzian-metricas', daemon=True).start()
+        return servidor
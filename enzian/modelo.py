@@ -0,0 +1,112 @@
+"""Modelo de datos de un reporte #Enzian"""
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+Seccion = Dict[str, Any]
+
+# Secciones del reporte, en el orden de las pestañas de la aplicación
+SECCIONES = (
+    'paciente',
+    'peritoneo',
+    'ovarios',
+    'tubos',
+    'compartimento_a',
+    'compartimento_b',
+    'compartimento_c',
+    'localizaciones_f',
+)
+
+# Secciones con un registro por lado
+SECCIONES_BILATERALES = ('ovarios', 'tubos', 'compartimento_b')
+
+
+def _bilateral(seccion: Optional[Seccion]) -> Dict[str, Seccion]:
+    """Garantiza que una sección bilateral tenga ambos lados"""
+    seccion = seccion if seccion is not None else {}
+    seccion.setdefault('izquierdo', {})
+    seccion.setdefault('derecho', {})
+    return seccion
+
+
+class ReporteEnzian:
+    """Datos de un caso, con la misma forma que st.session_state.data"""
+
+    __slots__ = SECCIONES
+
+    paciente: Seccion
+    peritoneo: Seccion
+    ovarios: Dict[str, Seccion]
+    tubos: Dict[str, Seccion]
+    compartimento_a: Seccion
+    compartimento_b: Dict[str, Seccion]
+    compartimento_c: Seccion
+    localizaciones_f: Dict[str, Seccion]
+
+    def __init__(
+        self,
+        paciente: Optional[Seccion] = None,
+        peritoneo: Optional[Seccion] = None,
+        ovarios: Optional[Seccion] = None,
+        tubos: Optional[Seccion] = None,
+        compartimento_a: Optional[Seccion] = None,
+        compartimento_b: Optional[Seccion] = None,
+        compartimento_c: Optional[Seccion] = None,
+        localizaciones_f: Optional[Seccion] = None,
+    ):
+        self.paciente = paciente if paciente is not None else {}
+        self.peritoneo = peritoneo if peritoneo is not None else {}
+        self.ovarios = _bilateral(ovarios)
+        self.tubos = _bilateral(tubos)
+        self.compartimento_a = compartimento_a if compartimento_a is not None else {}
+        self.compartimento_b = _bilateral(compartimento_b)
+        self.compartimento_c = compartimento_c if compartimento_c is not None else {}
+        self.localizaciones_f = localizaciones_f if localizaciones_f is not None else {}
+
+    @classmethod
+    def desde_dict(cls, datos: Dict[str, Any]) -> 'ReporteEnzian':
+        """Construye el reporte a partir de un dict (session_state o borrador JSON)"""
+        return cls(**{seccion: datos.get(seccion) for seccion in SECCIONES})
+
+    def a_dict(self) -> Dict[str, Any]:
+        """Devuelve el reporte con la forma de st.session_state.data"""
+        return {seccion: getattr(self, seccion) for seccion in SECCIONES}
+
+    def __repr__(self):
+        nombre = self.paciente.get('nombre') or 'sin nombre'
+        return f"ReporteEnzian({nombre!r})"
+
+
+class BorradorInvalido(ValueError):
+    """El archivo no se puede leer o no es un borrador de reporte #Enzian"""
+
+
+def leer_borrador(ruta) -> ReporteEnzian:
+    """Lee un borrador JSON; lanza BorradorInvalido si no tiene la forma de un reporte"""
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            datos = json.load(f)
+    except (OSError, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise BorradorInvalido(f"No se pudo leer el JSON: {e}") from e
+    if not isinstance(datos, dict) or not any(seccion in datos for seccion in SECCIONES):
+        raise BorradorInvalido("El JSON no es un reporte #Enzian")
+    for seccion in SECCIONES:
+        if not isinstance(datos.get(seccion, {}), (dict, type(None))):
+            raise BorradorInvalido(f"La sección {seccion!r} no es un objeto")
+    return ReporteEnzian.desde_dict(datos)
+
+
+def leer_borradores(rutas: Iterable, omitidos: Dict[str, str],
+                    preparar: Optional[Callable[[ReporteEnzian], Any]] = None) -> Iterator[Tuple[str, Any]]:
+    """Pares (ruta, reporte) de los borradores válidos; los demás se anotan en omitidos como ruta -> error
+
+    Con preparar, cada reporte se sustituye por preparar(reporte) y un error ahí también omite el archivo.
+    """
+    for ruta in rutas:
+        try:
+            reporte = leer_borrador(ruta)
+            resultado = preparar(reporte) if preparar else reporte
+        except Exception as e:
+            omitidos[str(ruta)] = str(e) if isinstance(e, BorradorInvalido) else f"{type(e).__name__}: {e}"
+            continue
+        omitidos.pop(str(ruta), None)
+        yield str(ruta), resultado
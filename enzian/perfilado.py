@@ -0,0 +1,178 @@
+"""Perfilado con cProfile de las próximas N generaciones de reportes
+
+Pensado para producción: se arma con armar(n) sin reiniciar el servidor y
+cada generación posterior consume un turno con tomar(). Cada bloque
+perfilado con perfilar() deja en el directorio dos archivos con el mismo
+nombre base, <fecha>_<etiqueta>_<huella>:
+- .pstats: las estadísticas, legibles con pstats o snakeviz,
+- .json: etiqueta, huella del caso, duración y tamaño del caso (caracteres
+  de texto libre y número de otras localizaciones).
+Un bloque en el que se llama a descartar() no deja archivos.
+
+La huella identifica el caso sin exponer datos de la paciente.
+funciones_calientes() suma los .pstats elegidos en una tabla de funciones.
+
+Los bloques perfilados se ejecutan de uno en uno: desde Python 3.12,
+cProfile no admite dos perfiles activos a la vez en el mismo proceso.
+"""
+import contextlib
+import cProfile
+import glob
+import hashlib
+import io
+import json
+import marshal
+import os
+import pstats
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from .almacen import textos_libres
+from .modelo import ReporteEnzian
+
+ORDENES = ('tottime', 'cumtime', 'ncalls')
+
+
+def huella_caso(datos: Dict[str, Any]) -> str:
+    """Huella corta del contenido completo de un caso"""
+    contenido = json.dumps(datos, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(contenido.encode('utf-8')).hexdigest()[:12]
+
+
+def tamano_caso(datos: Dict[str, Any]) -> Dict[str, int]:
+    """Medidas del caso que suelen explicar una generación lenta"""
+    reporte = ReporteEnzian.desde_dict(datos)
+    otras = reporte.localizaciones_f.get('otras', {})
+    return {
+        'caracteres_texto': sum(len(texto) for texto in textos_libres(reporte).values()),
+        'localizaciones_otras': len(otras.get('tipos', [])) if otras.get('presente') else 0,
+    }
+
+
+class BloquePerfilado:
+    """Bloque en curso de Perfilador.perfilar()"""
+
+    __slots__ = ('descartado',)
+
+    def __init__(self):
+        self.descartado = False
+
+    def descartar(self):
+        """El perfil del bloque no se guarda"""
+        self.descartado = True
+
+
+class Perfilador:
+    """Turnos de perfilado y archivos .pstats de un directorio"""
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self._restantes = 0
+        self._candado = threading.Lock()
+        self._perfilando = threading.Lock()
+
+    @property
+    def restantes(self) -> int:
+        return self._restantes
+
+    def armar(self, n: int):
+        """Perfila las próximas n generaciones (0 desarma)"""
+        with self._candado:
+            self._restantes = max(int(n), 0)
+
+    def tomar(self) -> bool:
+        """Consume un turno; False si no queda ninguno"""
+        with self._candado:
+            if not self._restantes:
+                return False
+            self._restantes -= 1
+            return True
+
+    def devolver(self):
+        """Devuelve un turno tomado con tomar() que no llegó a usarse"""
+        with self._candado:
+            self._restantes += 1
+
+    @contextlib.contextmanager
+    def perfilar(self, etiqueta: str, datos: Dict[str, Any]):
+        """Perfila el bloque en el hilo actual y guarda sus estadísticas, salvo que se llame a descartar()"""
+        huella = huella_caso(datos)
+        base = os.path.join(self.directorio, f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}_{etiqueta}_{huella}")
+        bloque = BloquePerfilado()
+        with self._perfilando:
+            perfil = cProfile.Profile()
+            inicio = time.perf_counter()
+            perfil.enable()
+            try:
+                yield bloque
+            finally:
+                perfil.disable()
+                duracion = time.perf_counter() - inicio
+                if not bloque.descartado:
+                    os.makedirs(self.directorio, exist_ok=True)
+                    perfil.dump_stats(base + '.pstats')
+                    with open(base + '.json', 'w', encoding='utf-8') as f:
+                        json.dump(
+                            {'etiqueta': etiqueta, 'huella': huella, 'duracion_s': duracion, **tamano_caso(datos)}, f
+                        )
+
+    def perfiles(self) -> List[Dict[str, Any]]:
+        """Perfiles guardados, del más reciente al más antiguo"""
+        resultado = []
+        for ruta in sorted(glob.glob(os.path.join(self.directorio, '*.pstats')), reverse=True):
+            try:
+                with open(ruta[:-len('.pstats')] + '.json', encoding='utf-8') as f:
+                    datos = json.load(f)
+            except (OSError, ValueError):
+                datos = {}
+            resultado.append({'archivo': os.path.basename(ruta), 'ruta': ruta, **datos})
+        return resultado
+
+    def borrar(self):
+        """Elimina todos los perfiles guardados"""
+        for ruta in glob.glob(os.path.join(self.directorio, '*.pstats')):
+            os.remove(ruta)
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(ruta[:-len('.pstats')] + '.json')
+
+
+def _estadisticas(rutas: Sequence[str]) -> pstats.Stats:
+    return pstats.Stats(*rutas, stream=io.StringIO())
+
+
+def funciones_calientes(rutas: Sequence[str], orden='tottime', limite: Optional[int] = 30) -> List[Dict[str, Any]]:
+    """Tabla de funciones sumada sobre varios .pstats, ordenada por `orden`"""
+    if orden not in ORDENES:
+        raise ValueError(f"Orden desconocido: {orden!r}; use uno de {ORDENES}")
+    if not rutas:
+        return []
+    filas = [
+        {
+            'funcion': f"{nombre} ({os.path.basename(archivo)}:{linea})" if linea else nombre,
+            'ncalls': llamadas,
+            'tottime': propio,
+            'cumtime': acumulado,
+            'percall': acumulado / llamadas if llamadas else 0.0,
+        }
+        for (archivo, linea, nombre), (_, llamadas, propio, acumulado, _) in _estadisticas(rutas).stats.items()
+    ]
+    filas.sort(key=lambda fila: fila[orden], reverse=True)
+    return filas[:limite] if limite else filas
+
+
+def combinar(rutas: Sequence[str]) -> bytes:
+    """Un único .pstats con la suma de varios"""
+    # Mismo formato que escribe pstats.Stats.dump_stats()
+    return marshal.dumps(_estadisticas(rutas).stats)
+
+
+def reporte_texto(rutas: Sequence[str], orden='tottime', limite: Optional[int] = 30) -> str:
+    """Tabla de pstats.print_stats() sumada sobre varios .pstats"""
+    if not rutas:
+        return ''
+    salida = io.StringIO()
+    estadisticas = pstats.Stats(*rutas, stream=salida)
+    estadisticas.sort_stats(orden).print_stats(*([limite] if limite else []))
+    return salida.getvalue()
@@ -0,0 +1,52 @@
+"""Clasificación vectorizada (NumPy) de mediciones de cohortes
+
+Versiones por arreglo de calcular_clasificacion_ovario() y
+calcular_clasificacion_compartimento(), con los mismos límites:
+O1 < 3 cm <= O2 <= 7 cm < O3 y grado 1 < 1 cm <= grado 2 <= 3 cm < grado 3.
+Igual que las funciones escalares, un NaN cae en el grado 3.
+"""
+from typing import Dict, Mapping
+
+import numpy as np
+
+_ETIQUETAS = {
+    prefijo: np.array(['', f'{prefijo}1', f'{prefijo}2', f'{prefijo}3'])
+    for prefijo in ('O', 'A', 'B', 'C')
+}
+
+
+def _grados(medidas, limite_inferior, limite_superior) -> np.ndarray:
+    """Grado 1, 2 o 3 por elemento, con límites < inferior y <= superior"""
+    medidas = np.asarray(medidas, dtype=np.float64)
+    return np.where(
+        medidas < limite_inferior, 1,
+        np.where(medidas <= limite_superior, 2, 3)
+    ).astype(np.int8)
+
+
+def clasificar_ovarios(diametros) -> np.ndarray:
+    """Grados O (1-3) para un arreglo de diámetros en cm"""
+    return _grados(diametros, 3, 7)
+
+
+def clasificar_compartimentos(medidas) -> np.ndarray:
+    """Grados A/B/C (1-3) para un arreglo de medidas en cm"""
+    return _grados(medidas, 1, 3)
+
+
+def etiquetas(grados, prefijo) -> np.ndarray:
+    """Convierte grados 1-3 en etiquetas ("O2", "B3", ...)"""
+    return _ETIQUETAS[prefijo][np.asarray(grados, dtype=np.intp)]
+
+
+def clasificar_cohorte(columnas: Mapping[str, object]) -> Dict[str, np.ndarray]:
+    """Clasifica varias columnas de una vez
+
+    Las columnas cuyo nombre empieza con "ovario" (p. ej. ovario_izq,
+    ovario_der) usan los límites O; el resto (a, b_izq, b_der, c, ...) los
+    de compartimentos.
+    """
+    return {
+        nombre: clasificar_ovarios(valores) if nombre.startswith('ovario') else clasificar_compartimentos(valores)
+        for nombre, valores in columnas.items()
+    }
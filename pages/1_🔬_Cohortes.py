@@ -0,0 +1,152 @@
+import streamlit as st
+import csv
+import io
+import os
+
+from enzian import generar_codigo_enzian
+from enzian.cohortes import MEDIDAS_CLASES, Cohorte, ConsultaInvalida, compilar, nombres_campos
+from enzian.indice_bitmap import contar
+from enzian.lote import expandir_entradas
+from recursos import directorio_borradores, obtener_almacen, raiz_borradores
+
+st.set_page_config(page_title="Cohortes #Enzian", page_icon="🔬", layout="wide")
+
+st.markdown("## 🔬 Selección de Cohortes")
+st.caption("Filtre los reportes con una consulta sobre el código #Enzian y los hallazgos registrados")
+
+# Máximo de filas mostradas en pantalla; la descarga CSV incluye todas
+MAXIMO_FILAS = 500
+
+
+@st.cache_resource(show_spinner="Indexando reportes del almacén...")
+def cohorte_almacen(tipo):
+    """Cohorte del almacén local, compartida entre sesiones; cada vista solo agrega las filas nuevas"""
+    return Cohorte.desde_almacen(obtener_almacen(), tipo)
+
+
+@st.cache_resource(max_entries=4, show_spinner="Indexando borradores...")
+def cohorte_borradores(directorio, firma):
+    """Cohorte de un directorio de borradores; firma cambia cuando cambian los archivos"""
+    return Cohorte.desde_borradores(expandir_entradas([directorio]))
+
+
+def firma_directorio(directorio):
+    """Número de borradores y fecha de modificación más reciente"""
+    fechas = [entrada.stat().st_mtime for entrada in os.scandir(directorio) if entrada.name.endswith('.json')]
+    return len(fechas), max(fechas, default=0)
+
+
+def tabla_csv(filas):
+    """Convierte las filas de resultados en CSV"""
+    salida = io.StringIO()
+    escritor = csv.DictWriter(salida, fieldnames=list(filas[0]))
+    escritor.writeheader()
+    escritor.writerows(filas)
+    return salida.getvalue().encode('utf-8-sig')
+
+
+# Origen de los registros
+col1, col2 = st.columns([1, 2])
+with col1:
+    origen = st.radio("Origen", ["Almacén local", "Directorio de borradores"], key="origen_cohorte")
+
+with col2:
+    if origen == "Almacén local":
+        tipos = {"Todos": None, "Reportes finales": 'final', "Borradores": 'borrador'}
+        tipo = st.selectbox("Registros", list(tipos), key="tipo_cohorte")
+        cohorte = cohorte_almacen(tipos[tipo])
+        cohorte.actualizar_desde_almacen(obtener_almacen(), tipos[tipo])
+    else:
+        raiz = raiz_borradores()
+        if raiz is None:
+            st.info("Defina ENZIAN_BORRADORES en el servidor para leer directorios de borradores")
+            st.stop()
+        texto = st.text_input("Directorio en el servidor", key="directorio_cohorte", help=f"Relativo a {raiz}")
+        directorio = directorio_borradores(texto)
+        if directorio is None:
+            st.info(f"Ingrese un directorio existente con borradores JSON dentro de {raiz}")
+            st.stop()
+        cohorte = cohorte_borradores(str(directorio), firma_directorio(directorio))
+
+st.metric("Registros indexados", len(cohorte))
+
+if cohorte.omitidos:
+    with st.expander(f"⚠️ Archivos omitidos por no ser borradores válidos: {len(cohorte.omitidos)}"):
+        st.dataframe(
+            [{'Archivo': ruta, 'Error': error} for ruta, error in cohorte.omitidos.items()],
+            use_container_width=True,
+            hide_index=True
+        )
+
+# Consulta
+consulta_texto = st.text_input(
+    "Consulta",
+    key="consulta_cohorte",
+    placeholder="C >= 2 and ovario.der.diametro > 7 and ureter.hidronefrosis",
+    help="Combine condiciones con and, or, not y paréntesis. Un campo sin comparación es verdadero si está presente o es mayor que 0"
+)
+
+with st.expander("📖 Campos disponibles"):
+    st.markdown("""
+    **Componentes del código** (se resuelven con el índice):
+    `P`, `A`, `C`, `O`, `T`, `B` comparados con un grado 0-3; `O`, `T` y `B` sin lado
+    toman el mayor de ambos lados (`B.izq`, `B.der` para uno solo).
+    `FA`, `FB`, `FU`, `FU.izq`, `FU.der`, `FI`, `F` sin comparación o con `= true/false`;
+    `FI = 'Ciego'` y `F = 'Ombligo'` buscan una localización concreta.
+
+    **Campos del reporte** (se resuelven recorriendo la columna):
+    """)
+    st.code(", ".join(nombres_campos()), language=None)
+
+if not consulta_texto.strip():
+    st.stop()
+
+try:
+    consulta = compilar(consulta_texto)
+except ConsultaInvalida as e:
+    st.error(f"❌ {e.mensaje}")
+    st.code(f"{e.texto}\n{' ' * e.posicion}^", language=None)
+    st.stop()
+
+bitmap = consulta.ejecutar(cohorte)
+total = contar(bitmap)
+
+st.success(f"✅ {total} de {len(cohorte)} registros cumplen la consulta")
+
+with st.expander("⚙️ Plan de ejecución"):
+    st.code(consulta.explicar(), language=None)
+
+if total:
+    filas = [
+        {
+            'Registro': id_registro,
+            'Paciente': reporte.paciente.get('nombre', ''),
+            'Cédula': reporte.paciente.get('cedula', ''),
+            'Fecha estudio': str(reporte.paciente.get('fecha', ''))[:10],
+            'Código #Enzian': generar_codigo_enzian(reporte),
+        }
+        for id_registro, reporte in cohorte.registros(bitmap)
+    ]
+
+    if total > MAXIMO_FILAS:
+        st.caption(f"Mostrando los primeros {MAXIMO_FILAS} registros; la descarga incluye los {total}")
+    st.dataframe(filas[:MAXIMO_FILAS], use_container_width=True, hide_index=True)
+
+    with st.expander("📏 Clases según las medidas"):
+        st.caption("Clase que sugiere cada medida registrada, con los mismos límites de la pestaña de captura")
+        st.dataframe(
+            [
+                {'Medida': campo, **clases}
+                for (campo, _), clases in zip(MEDIDAS_CLASES.values(), cohorte.clases_por_medida(bitmap).values())
+            ],
+            use_container_width=True,
+            hide_index=True
+        )
+
+    st.download_button(
+        label="⬇️ Descargar cohorte (CSV)",
+        data=tabla_csv(filas),
+        file_name="cohorte_enzian.csv",
+        mime="text/csv",
+        key="descargar_cohorte"
+    )
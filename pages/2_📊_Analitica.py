@@ -0,0 +1,143 @@
+import streamlit as st
+
+from enzian.agregados import Agregados
+from enzian.lote import expandir_entradas
+from recursos import directorio_borradores, obtener_almacen, raiz_borradores
+
+st.set_page_config(page_title="Analítica #Enzian", page_icon="📊", layout="wide")
+
+st.markdown("## 📊 Analítica del Archivo de Reportes")
+st.caption(
+    "Distribuciones acumuladas de todos los reportes; cada vista solo agrega los registros nuevos. "
+    "Cada caso (cédula y fecha del estudio) cuenta una vez, con su registro más reciente: "
+    "los borradores y el reporte final de un mismo estudio no se suman por separado"
+)
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+@st.cache_resource
+def agregados_almacen(tipo):
+    """Agregados del almacén local, compartidos entre sesiones"""
+    return Agregados()
+
+
+@st.cache_resource(max_entries=4)
+def agregados_borradores(directorio):
+    """Agregados de un directorio de borradores, compartidos entre sesiones"""
+    return Agregados()
+
+
+# Origen de los registros
+col1, col2 = st.columns([1, 2])
+with col1:
+    origen = st.radio("Origen", ["Almacén local", "Directorio de borradores"], key="origen_analitica")
+
+with col2:
+    if origen == "Almacén local":
+        tipos = {"Reportes finales": 'final', "Borradores": 'borrador', "Todos": None}
+        tipo = st.selectbox("Registros", list(tipos), key="tipo_analitica")
+        agregados = agregados_almacen(tipos[tipo])
+        antes = agregados.total
+        agregados.actualizar_desde_almacen(obtener_almacen(), tipos[tipo])
+    else:
+        raiz = raiz_borradores()
+        if raiz is None:
+            st.info("Defina ENZIAN_BORRADORES en el servidor para leer directorios de borradores")
+            st.stop()
+        texto = st.text_input("Directorio en el servidor", key="directorio_analitica", help=f"Relativo a {raiz}")
+        directorio = directorio_borradores(texto)
+        if directorio is None:
+            st.info(f"Ingrese un directorio existente con borradores JSON dentro de {raiz}")
+            st.stop()
+        agregados = agregados_borradores(str(directorio))
+        antes = agregados.total
+        agregados.actualizar_desde_borradores(expandir_entradas([directorio]))
+
+col1, col2, col3 = st.columns(3)
+col1.metric("Casos agregados", agregados.total, delta=(agregados.total - antes) or None)
+col2.metric("Endometriomas medidos", sum(agregados.diametros))
+col3.metric("Con alguna alerta clínica", agregados.con_alertas)
+
+if agregados.omitidos:
+    with st.expander(f"⚠️ Archivos omitidos por no ser borradores válidos: {len(agregados.omitidos)}"):
+        st.caption("Se vuelven a intentar en cada actualización")
+        st.dataframe(
+            [{'Archivo': ruta, 'Error': error} for ruta, error in agregados.omitidos.items()],
+            use_container_width=True,
+            hide_index=True
+        )
+
+if not agregados.total:
+    st.info("Todavía no hay registros para analizar")
+    st.stop()
+
+st.markdown("---")
+
+# Frecuencia de componentes
+st.markdown("### Frecuencia de Componentes #Enzian")
+frecuencias = agregados.frecuencia_componentes()
+st.bar_chart(
+    {'Componente': list(frecuencias), 'Casos': list(frecuencias.values())},
+    x='Componente',
+    y='Casos',
+    sort=False
+)
+
+with st.expander("Detalle por valor de componente"):
+    st.dataframe(
+        [
+            {'Valor': clave, 'Casos': cantidad, '%': round(100 * cantidad / agregados.total, 1)}
+            for clave, cantidad in sorted(agregados.valores.items())
+        ],
+        use_container_width=True,
+        hide_index=True
+    )
+
+col1, col2 = st.columns(2)
+
+# Diámetros de endometriomas
+with col1:
+    st.markdown("### Diámetro de Endometriomas")
+    if sum(agregados.diametros):
+        st.dataframe(
+            [{'Percentil': f"P{p}", 'Diámetro (cm)': agregados.percentil(p)} for p in PERCENTILES],
+            use_container_width=True,
+            hide_index=True
+        )
+        st.dataframe(
+            [
+                {'Clase': clase, 'Endometriomas': agregados.clases_ovario[clase]}
+                for clase in ('O1', 'O2', 'O3')
+            ],
+            use_container_width=True,
+            hide_index=True
+        )
+    else:
+        st.write("Sin endometriomas medidos")
+
+# Tabla cruzada B x C
+with col2:
+    st.markdown("### Grado B (mayor de ambos lados) × Grado C")
+    st.dataframe(
+        [
+            {'': f"B{b}", **{f"C{c}": agregados.b_por_c[b][c] for c in range(4)}}
+            for b in range(4)
+        ],
+        use_container_width=True,
+        hide_index=True
+    )
+    st.caption("Grado 0: sin hallazgos en el compartimento")
+
+st.markdown("---")
+
+# Alertas clínicas
+st.markdown("### Alertas Clínicas")
+st.dataframe(
+    [
+        {'Alerta': mensaje, 'Casos': cantidad, '%': round(100 * proporcion, 1)}
+        for mensaje, cantidad, proporcion in agregados.tasas_alertas().values()
+    ],
+    use_container_width=True,
+    hide_index=True
+)
@@ -0,0 +1,81 @@
+"""Recursos compartidos entre las páginas de la aplicación"""
+import os
+from pathlib import Path
+
+import streamlit as st
+
+from enzian.almacen import Almacen
+from enzian.cola import ColaReportes
+from enzian.metricas import Metricas
+from enzian.perfilado import Perfilador
+
+
+@st.cache_resource
+def obtener_almacen():
+    """Almacén local de borradores y reportes, compartido entre sesiones"""
+    return Almacen(os.environ.get('ENZIAN_DB', 'reportes_enzian.db'))
+
+
+@st.cache_resource
+def obtener_cola():
+    """Cola de generación de reportes en segundo plano, compartida entre sesiones"""
+    return ColaReportes(
+        trabajadores=int(os.environ.get('ENZIAN_TRABAJADORES', 2)),
+        maximo_pendientes=int(os.environ.get('ENZIAN_COLA_MAXIMA', 8))
+    )
+
+
+@st.cache_resource
+def obtener_metricas():
+    """Métricas de tiempos del proceso; con ENZIAN_METRICAS_PUERTO se publican en /metrics"""
+    metricas = Metricas()
+    puerto = os.environ.get('ENZIAN_METRICAS_PUERTO')
+    if puerto:
+        metricas.servir_http(int(puerto))
+    return metricas
+
+
+@st.cache_resource
+def obtener_perfilador():
+    """Turnos de perfilado de generaciones; los perfiles se guardan en ENZIAN_PERFILES"""
+    return Perfilador(os.environ.get('ENZIAN_PERFILES', 'perfiles_enzian'))
+
+
+def motor_docx():
+    """Motor de generación del DOCX (ENZIAN_MOTOR_DOCX: 'docx', por defecto, o 'xml')"""
+    return os.environ.get('ENZIAN_MOTOR_DOCX', 'docx')
+
+
+def docx_determinista():
+    """Indica si los DOCX se generan byte a byte reproducibles (ENZIAN_DOCX_DETERMINISTA=1)"""
+    return os.environ.get('ENZIAN_DOCX_DETERMINISTA') == '1'
+
+
+def publicar_metricas():
+    """Escribe las métricas en ENZIAN_METRICAS_ARCHIVO, si está definido"""
+    ruta = os.environ.get('ENZIAN_METRICAS_ARCHIVO')
+    if ruta:
+        obtener_metricas().escribir_archivo(ruta)
+
+
+def raiz_borradores():
+    """Directorio bajo el que se pueden leer borradores del servidor (ENZIAN_BORRADORES); None si no está definido"""
+    raiz = os.environ.get('ENZIAN_BORRADORES')
+    return Path(raiz).resolve() if raiz else None
+
+
+def directorio_borradores(texto):
+    """Resuelve un directorio relativo a raiz_borradores(); None si no existe o queda fuera de la raíz"""
+    raiz = raiz_borradores()
+    if raiz is None or not texto:
+        return None
+    ruta = (raiz / texto).resolve()
+    if ruta != raiz and raiz not in ruta.parents:
+        return None
+    return ruta if ruta.is_dir() else None
+
+
+def modo_desarrollo():
+    """Indica si se muestra el panel de desarrollo (ENZIAN_DESARROLLO=1 en el servidor)"""
+    # No se activa desde la URL: el panel expone tiempos y perfiles de todas las sesiones
+    return os.environ.get('ENZIAN_DESARROLLO') == '1'
@@ -1,10 +1,34 @@
 import streamlit as st
 from datetime import datetime
-from docx import Document
-from docx.shared import Pt, RGBColor, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-import io
+import contextlib
+import copy
+import functools
+import hashlib
 import json
+import time
+
+from enzian import (
+    ReporteEnzian,
+    calcular_clasificacion_compartimento,
+    calcular_clasificacion_ovario,
+    validar_consistencia,
+)
+from enzian.cola import ColaLlena, clave_docx, generar_docx, nombre_docx
+from enzian.derivados import CAMPOS_OBLIGATORIOS, GrafoDerivados
+from enzian.formulario import es_clave_formulario, valores_formulario
+from enzian.perfilado import ORDENES, combinar, funciones_calientes, reporte_texto
+from recursos import (
+    docx_determinista,
+    modo_desarrollo,
+    motor_docx,
+    obtener_almacen,
+    obtener_cola,
+    obtener_metricas,
+    obtener_perfilador,
+    publicar_metricas,
+)
+
+inicio_ejecucion = time.perf_counter()
 
 # Configuración de la página
 st.set_page_config(
@@ -13,6 +37,41 @@ st.set_page_config(
     layout="wide"
 )
 
+# Tiempos por sección de esta ejecución (los fragmentos actualizan los suyos)
+st.session_state['tiempos_secciones'] = {}
+obtener_metricas().contar('enzian_ejecuciones_total')
+
+def medir(seccion):
+    """Mide un bloque del script y lo registra en las métricas y en el desglose de la sesión"""
+    return obtener_metricas().medir(seccion, st.session_state.setdefault('tiempos_secciones', {}))
+
+def perfilado_al_generar(funcion):
+    """Perfila la ejecución en que se pulsa Generar reporte si envía a la cola una generación con turno de perfilado"""
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        perfilador = obtener_perfilador()
+        if st.session_state.get('btn_generar_reporte') and perfilador.restantes:
+            st.session_state['turno_perfilado'] = False
+            with perfilador.perfilar('ejecucion', st.session_state.data) as bloque:
+                try:
+                    return funcion(*args, **kwargs)
+                finally:
+                    # DOCX de la caché, cola llena o turno tomado por otra sesión: no hay perfil que guardar
+                    if not st.session_state.pop('turno_perfilado', False):
+                        bloque.descartar()
+        return funcion(*args, **kwargs)
+    return envoltura
+
+def medido(seccion):
+    """Decorador que mide cada llamada a una función del script, incluidas las de fragmentos"""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with medir(seccion):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
 # CSS personalizado
 st.markdown("""
     <style>
@@ -47,6 +106,13 @@ st.markdown('<h1 class="main-header">📊 Sistema de Reporte Ultrasonográfico d
 
 # Barra superior con botones
 col1, col2, col3 = st.columns([5, 1, 1])
+with col1:
+    st.toggle(
+        "📝 Captura por lotes",
+        key="captura_por_lotes",
+        help="Agrupa los campos de detalle de cada hallazgo en un formulario que se aplica con un solo clic"
+    )
+
 with col2:
     if st.button("🆕 Nuevo Reporte", key="btn_nuevo_sup", help="Iniciar un nuevo reporte desde cero"):
         st.session_state['mostrar_confirmacion'] = True
@@ -65,7 +131,7 @@ if st.session_state.get('mostrar_confirmacion', False):
     with col1:
         if st.button("✅ Sí, continuar", type="primary", key="confirmar_nuevo"):
             # Limpiar todos los datos excepto las confirmaciones
-            keys_to_keep = ['mostrar_confirmacion', 'mostrar_ayuda']
+            keys_to_keep = ['mostrar_confirmacion', 'mostrar_ayuda', 'captura_por_lotes']
             for key in list(st.session_state.keys()):
                 if key not in keys_to_keep:
                     del st.session_state[key]
@@ -79,7 +145,7 @@ if st.session_state.get('mostrar_confirmacion', False):
 
 # Modal de ayuda
 if st.session_state.get('mostrar_ayuda', False):
-    with st.expander("📖 **Guía Completa de Uso del Sistema**", expanded=True):
+    with medir('ayuda'), st.expander("📖 **Guía Completa de Uso del Sistema**", expanded=True):
         st.markdown("""
         ### 🎯 Cómo usar este sistema:
         
@@ -122,6 +188,7 @@ if st.session_state.get('mostrar_ayuda', False):
         - **Alertas clínicas**: Identificación de hallazgos críticos
         - **Guardar borrador**: Guarde su progreso en formato JSON
         - **Cargar borrador**: Continue un reporte guardado previamente
+        - **Captura por lotes**: Los campos de detalle de cada hallazgo se aplican juntos con "Aplicar cambios"
         
         ---
         
@@ -167,43 +234,246 @@ st.markdown("---")
 
 # Inicializar session state
 if 'data' not in st.session_state:
-    st.session_state.data = {
-        'paciente': {},
-        'peritoneo': {},
-        'ovarios': {'izquierdo': {}, 'derecho': {}},
-        'tubos': {'izquierdo': {}, 'derecho': {}},
-        'compartimento_a': {},
-        'compartimento_b': {'izquierdo': {}, 'derecho': {}},
-        'compartimento_c': {},
-        'localizaciones_f': {}
-    }
+    st.session_state.data = ReporteEnzian().a_dict()
 
-# Funciones de validación
-def calcular_clasificacion_ovario(diametro):
-    """Calcula la clasificación O según el diámetro"""
-    if diametro < 3:
-        return "O1"
-    elif 3 <= diametro <= 7:
-        return "O2"
-    else:
-        return "O3"
+def cargar_en_formulario(datos):
+    """Programa la carga de un estudio en el formulario y vuelve a ejecutar la aplicación"""
+    # Los widgets ya creados en esta ejecución no se pueden modificar: la carga
+    # se aplica al inicio de la siguiente, antes de dibujar las pestañas
+    st.session_state['estudio_por_cargar'] = datos
+    st.rerun()
 
-def calcular_clasificacion_compartimento(medida):
-    """Calcula clasificación para compartimentos A, B, C"""
-    if medida < 1:
-        return "1"
-    elif 1 <= medida <= 3:
-        return "2"
-    else:
-        return "3"
+# Carga pendiente: las pestañas reconstruyen data desde sus widgets, así que el
+# estudio se escribe en las claves de los widgets además de en data
+if 'estudio_por_cargar' in st.session_state:
+    reporte_cargado = ReporteEnzian.desde_dict(st.session_state.pop('estudio_por_cargar')).a_dict()
+    for clave in [clave for clave in st.session_state if es_clave_formulario(clave)]:
+        del st.session_state[clave]
+    st.session_state.update(valores_formulario(reporte_cargado))
+    st.session_state.data = reporte_cargado
+
+def derivados():
+    """Valores derivados del reporte; solo se recalculan los que tienen entradas modificadas"""
+    grafo = st.session_state.setdefault('derivados', GrafoDerivados())
+    return grafo.vista(st.session_state.data)
+
+def contenedor_captura(clave):
+    """Agrupa los campos de detalle de una sección en un formulario si la captura por lotes está activa"""
+    # Los selectores de estado quedan fuera: al marcar "Anormal" los campos aparecen en seguida
+    if st.session_state.get('captura_por_lotes', False):
+        return st.form(clave, border=False)
+    return contextlib.nullcontext()
+
+def boton_aplicar():
+    """Botón que confirma el formulario de la sección en captura por lotes"""
+    if st.session_state.get('captura_por_lotes', False):
+        st.form_submit_button("✅ Aplicar cambios", type="primary", use_container_width=True)
 
-def validar_consistencia(compartimento, medida, clasificacion_manual):
-    """Valida que la clasificación manual coincida con la medida"""
-    if compartimento in ['A', 'B', 'C']:
-        clasificacion_calculada = calcular_clasificacion_compartimento(medida)
-        if clasificacion_calculada != clasificacion_manual:
-            return False, f"⚠️ Inconsistencia: La medida {medida}cm sugiere clasificación {clasificacion_calculada}, pero seleccionaste {clasificacion_manual}"
-    return True, ""
+@medido('vista_previa_codigo')
+def vista_previa_codigo():
+    """Muestra el código #Enzian actual al pie de las pestañas de hallazgos"""
+    st.markdown("---")
+    st.caption(f"Código #Enzian actual: **{derivados()['codigo']}**")
+
+def acciones_registro(id_registro, clave):
+    """Botones para cargar o descargar un registro del almacén local"""
+    registro = obtener_almacen().obtener(id_registro)
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if st.button("📂 Cargar en el formulario", use_container_width=True, key=f"cargar_{clave}"):
+            cargar_en_formulario(registro['datos'])
+    with col2:
+        st.download_button(
+            label="⬇️ JSON",
+            data=json.dumps(registro['datos'], indent=2, default=str).encode(),
+            file_name=f"Estudio_{registro['id']}.json",
+            mime="application/json",
+            use_container_width=True,
+            key=f"descargar_{clave}_json"
+        )
+    with col3:
+        if registro['docx']:
+            st.download_button(
+                label="⬇️ Word",
+                data=registro['docx'],
+                file_name=f"Estudio_{registro['id']}.docx",
+                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                use_container_width=True,
+                key=f"descargar_{clave}_docx"
+            )
+
+def estado_trabajo_reporte():
+    """Muestra el avance del reporte en cola y, al terminar, su descarga"""
+    trabajo = st.session_state.get('trabajo_reporte')
+    if not trabajo:
+        return
+    
+    # El último DOCX generado queda en la sesión; la cola solo se consulta hasta tenerlo
+    generado = st.session_state.get('docx_generado')
+    listo = generado is not None and generado['clave'] == trabajo['clave']
+    if not listo:
+        en_cola = obtener_cola().trabajo(trabajo['id'])
+        if en_cola is None:
+            del st.session_state['trabajo_reporte']
+            return
+        
+        if not en_cola.terminado:
+            posicion = obtener_cola().posicion(trabajo['id'])
+            st.info("⏳ Generando reporte profesional..." + (f" ({posicion} en cola antes que este)" if posicion else ""))
+            return
+        
+        if en_cola.estado == 'listo':
+            generado = st.session_state['docx_generado'] = {'clave': trabajo['clave'], 'docx': en_cola.resultado}
+            trabajo['error_guardado'] = en_cola.error_al_terminar
+            listo = True
+    
+    if not trabajo['mostrado']:
+        # Ejecución completa para dejar de consultar y mostrar la sección final
+        trabajo['mostrado'] = True
+        st.session_state['reporte_generado'] = listo
+        st.rerun()
+    
+    if not listo:
+        st.error(f"❌ Error al generar el reporte: {en_cola.error}")
+        return
+    
+    st.success("✅ ¡Reporte generado exitosamente!")
+    if trabajo.get('error_guardado'):
+        st.warning(f"⚠️ El reporte no se pudo guardar en el almacén local: {trabajo['error_guardado']}")
+    st.download_button(
+        label="⬇️ DESCARGAR REPORTE WORD",
+        data=generado['docx'],
+        file_name=trabajo['nombre_archivo'],
+        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        use_container_width=True,
+        key="download_reporte"
+    )
+
+def generar_docx_medido(metricas, datos, perfilador=None, motor='docx', determinista=False):
+    """Genera el DOCX en la cola registrando su duración y resultado; con perfilador, también su perfil"""
+    perfil = perfilador.perfilar('generacion', datos) if perfilador else contextlib.nullcontext()
+    with metricas.medir('generacion_word'), perfil:
+        try:
+            docx = generar_docx(datos, motor, determinista)
+        except Exception:
+            metricas.contar('enzian_reportes_total', resultado='error')
+            raise
+    metricas.contar('enzian_reportes_total', resultado='listo')
+    return docx
+
+def panel_desarrollo():
+    """Desglose de tiempos, exportación de métricas y perfilado de generaciones"""
+    metricas = obtener_metricas()
+    tiempos = st.session_state.get('tiempos_secciones', {})
+    historico = metricas.secciones()
+    
+    with st.expander("🛠️ Panel de desarrollo: tiempos por sección"):
+        st.dataframe(
+            [
+                {
+                    'Sección': seccion,
+                    'Última ejecución (ms)': round(1000 * tiempos[seccion], 1) if seccion in tiempos else None,
+                    'Mediciones': cantidad,
+                    'Media (ms)': round(1000 * media, 1)
+                }
+                for seccion, (cantidad, media) in sorted(historico.items(), key=lambda item: -tiempos.get(item[0], 0))
+            ],
+            use_container_width=True,
+            hide_index=True
+        )
+        st.caption(
+            "Las pestañas se vuelven a ejecutar como fragmentos; su última medición puede ser posterior "
+            "a la ejecución completa. La generación Word se mide en la cola de segundo plano."
+        )
+        grafo = st.session_state.get('derivados')
+        if grafo is not None:
+            st.caption(
+                "Recálculos de valores derivados en esta sesión: "
+                + ", ".join(f"{nombre} {cantidad}" for nombre, cantidad in grafo.recalculos.items())
+            )
+        st.download_button(
+            label="⬇️ Métricas (formato Prometheus)",
+            data=metricas.exportar_prometheus().encode(),
+            file_name="metricas_enzian.prom",
+            mime="text/plain",
+            key="descargar_metricas"
+        )
+    
+    with st.expander("🔬 Panel de desarrollo: perfilado de generaciones"):
+        perfilador = obtener_perfilador()
+        
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            n = st.number_input("Generaciones a perfilar", min_value=1, max_value=50, value=3, key="perfilar_n")
+        with col2:
+            if st.button("▶️ Perfilar próximas", use_container_width=True, key="armar_perfilado"):
+                perfilador.armar(n)
+        with col3:
+            if st.button("⏹️ Desarmar", use_container_width=True, key="desarmar_perfilado"):
+                perfilador.armar(0)
+        st.caption(
+            f"Turnos restantes: {perfilador.restantes}. Cada generación perfilada guarda su perfil y el de la "
+            f"ejecución en que se pulsó Generar en `{perfilador.directorio}`."
+        )
+        
+        perfiles = perfilador.perfiles()
+        if not perfiles:
+            st.info("Todavía no hay perfiles guardados")
+            return
+        
+        st.dataframe(
+            [
+                {
+                    'Archivo': perfil['archivo'],
+                    'Bloque': perfil.get('etiqueta'),
+                    'Huella del caso': perfil.get('huella'),
+                    'Duración (ms)': round(1000 * perfil['duracion_s'], 1) if 'duracion_s' in perfil else None,
+                    'Caracteres de texto': perfil.get('caracteres_texto'),
+                    'Otras localizaciones': perfil.get('localizaciones_otras')
+                }
+                for perfil in perfiles
+            ],
+            use_container_width=True,
+            hide_index=True
+        )
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            seleccion = st.multiselect(
+                "Perfiles a sumar (todos si no se elige ninguno)",
+                [perfil['archivo'] for perfil in perfiles],
+                key="perfiles_seleccionados"
+            )
+        with col2:
+            orden = st.selectbox("Ordenar por", ORDENES, key="orden_perfiles")
+        rutas = [perfil['ruta'] for perfil in perfiles if not seleccion or perfil['archivo'] in seleccion]
+        
+        st.dataframe(funciones_calientes(rutas, orden), use_container_width=True, hide_index=True)
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.download_button(
+                label="⬇️ Tabla de funciones (texto)",
+                data=reporte_texto(rutas, orden, limite=None).encode(),
+                file_name="funciones_calientes.txt",
+                mime="text/plain",
+                use_container_width=True,
+                key="descargar_funciones_calientes"
+            )
+        with col2:
+            st.download_button(
+                label="⬇️ Perfil sumado (.pstats)",
+                data=combinar(rutas),
+                file_name="perfil_enzian.pstats",
+                mime="application/octet-stream",
+                use_container_width=True,
+                key="descargar_perfil_sumado"
+            )
+        with col3:
+            if st.button("🗑️ Borrar perfiles", use_container_width=True, key="borrar_perfiles"):
+                perfilador.borrar()
+                st.rerun()
 
 # Funciones para guardar y cargar borradores
 def guardar_borrador():
@@ -218,15 +488,29 @@ def guardar_borrador():
     return data_json.encode(), nombre_archivo
 
 def cargar_borrador(uploaded_file):
-    """Carga un borrador desde archivo JSON"""
+    """Carga un borrador JSON en el formulario, una sola vez por contenido distinto; devuelve (éxito, mensaje)"""
+    contenido = uploaded_file.getvalue()
+    huella = hashlib.sha256(contenido).hexdigest()
+    
+    # Mientras el archivo siga en el uploader, no volver a leerlo ni pisar las ediciones
+    cargado = st.session_state.get('borrador_cargado')
+    if cargado and cargado[0] == huella:
+        return cargado[1], cargado[2]
+    
     try:
-        data_cargada = json.loads(uploaded_file.read())
-        st.session_state.data = data_cargada
-        return True, "✅ Borrador cargado exitosamente"
+        data_cargada = json.loads(contenido)
+        ReporteEnzian.desde_dict(data_cargada)
     except Exception as e:
-        return False, f"❌ Error al cargar borrador: {str(e)}"
+        st.session_state['borrador_cargado'] = (huella, False, f"❌ Error al cargar borrador: {str(e)}")
+        return st.session_state['borrador_cargado'][1:]
+    
+    # La carga vuelve a ejecutar la aplicación; en esa ejecución se devuelve el mensaje guardado
+    st.session_state['borrador_cargado'] = (huella, True, "✅ Borrador cargado exitosamente")
+    cargar_en_formulario(data_cargada)
 
 # Pestañas principales
+# Cada pestaña es un fragmento que se vuelve a ejecutar por separado; al cambiar
+# de pestaña se ejecuta el script completo para que el resumen esté al día
 tabs = st.tabs([
     "👤 Datos del Paciente",
     "🔴 Peritoneo (P)",
@@ -237,10 +521,13 @@ tabs = st.tabs([
     "🅲 Compartimento C",
     "📍 Localizaciones F",
     "📋 Generar Reporte"
-])
+], key="pestanas", on_change="rerun")
 
 # ============= PESTAÑA 1: DATOS DEL PACIENTE =============
-with tabs[0]:
+@st.fragment
+@medido('pestana_datos_paciente')
+def pestana_datos_paciente():
+    """Contenido de la pestaña Datos del paciente"""
     st.markdown('<div class="section-header"><h2>Datos del Paciente</h2></div>', unsafe_allow_html=True)
     
     col1, col2 = st.columns(2)
@@ -251,7 +538,8 @@ with tabs[0]:
         cedula = st.text_input("Número de identificación *", key="cedula_paciente", help="Campo obligatorio")
         
     with col2:
-        fecha_estudio = st.date_input("Fecha del estudio *", datetime.now(), help="Campo obligatorio")
+        st.session_state.setdefault('fecha_estudio', datetime.now().date())
+        fecha_estudio = st.date_input("Fecha del estudio *", key="fecha_estudio", help="Campo obligatorio")
         medico = st.text_input("Médico solicitante", key="medico_solicitante")
         indicacion = st.text_area("Indicación del estudio", key="indicacion_estudio", help="Motivo del estudio ultrasonográfico")
     
@@ -270,8 +558,14 @@ with tabs[0]:
     else:
         st.info("ℹ️ Complete los campos marcados con * para continuar")
 
+with tabs[0]:
+    pestana_datos_paciente()
+
 # ============= PESTAÑA 2: PERITONEO (P) =============
-with tabs[1]:
+@st.fragment
+@medido('pestana_peritoneo')
+def pestana_peritoneo():
+    """Contenido de la pestaña Peritoneo (P)"""
     st.markdown('<div class="section-header"><h2>🔴 Peritoneo (P)</h2></div>', unsafe_allow_html=True)
     st.info("📌 Lesiones superficiales peritoneales (<5mm de invasión subperitoneal)")
     
@@ -283,49 +577,60 @@ with tabs[1]:
     )
     
     if peritoneo_estado == "Anormal":
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            clasificacion_p = st.select_slider(
-                "Clasificación según diámetro virtual (suma de lesiones):",
-                options=["P1 (<3 cm)", "P2 (3-7 cm)", "P3 (>7 cm)"],
-                key="clasificacion_p"
+        with contenedor_captura("form_peritoneo"):
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                clasificacion_p = st.select_slider(
+                    "Clasificación según diámetro virtual (suma de lesiones):",
+                    options=["P1 (<3 cm)", "P2 (3-7 cm)", "P3 (>7 cm)"],
+                    key="clasificacion_p"
+                )
+                
+            with col2:
+                diametro_total = st.number_input(
+                    "Diámetro total aproximado (cm):",
+                    min_value=0.0,
+                    max_value=20.0,
+                    step=0.1,
+                    key="diametro_peritoneo"
+                )
+            
+            localizaciones = st.multiselect(
+                "Localizaciones afectadas:",
+                ["Fondo de saco de Douglas", "Peritoneo pélvico lateral", 
+                 "Ligamento ancho", "Peritoneo vesical", "Otras"],
+                key="localizaciones_peritoneo"
             )
             
-        with col2:
-            diametro_total = st.number_input(
-                "Diámetro total aproximado (cm):",
-                min_value=0.0,
-                max_value=20.0,
-                step=0.1,
-                key="diametro_peritoneo"
+            descripcion_p = st.text_area(
+                "Descripción adicional:",
+                key="descripcion_peritoneo",
+                help="Describa características adicionales de las lesiones peritoneales"
             )
-        
-        localizaciones = st.multiselect(
-            "Localizaciones afectadas:",
-            ["Fondo de saco de Douglas", "Peritoneo pélvico lateral", 
-             "Ligamento ancho", "Peritoneo vesical", "Otras"],
-            key="localizaciones_peritoneo"
-        )
-        
-        descripcion_p = st.text_area(
-            "Descripción adicional:",
-            key="descripcion_peritoneo",
-            help="Describa características adicionales de las lesiones peritoneales"
-        )
-        
-        st.session_state.data['peritoneo'] = {
-            'estado': 'anormal',
-            'clasificacion': clasificacion_p,
-            'diametro': diametro_total,
-            'localizaciones': localizaciones,
-            'descripcion': descripcion_p
-        }
+            
+            st.session_state.data['peritoneo'] = {
+                'estado': 'anormal',
+                'clasificacion': clasificacion_p,
+                'diametro': diametro_total,
+                'localizaciones': localizaciones,
+                'descripcion': descripcion_p
+            }
+            
+            boton_aplicar()
     else:
         st.session_state.data['peritoneo'] = {'estado': 'normal'}
+    
+    vista_previa_codigo()
+
+with tabs[1]:
+    pestana_peritoneo()
 
 # ============= PESTAÑA 3: OVARIOS (O) =============
-with tabs[2]:
+@st.fragment
+@medido('pestana_ovarios')
+def pestana_ovarios():
+    """Contenido de la pestaña Ovarios (O)"""
     st.markdown('<div class="section-header"><h2>🥚 Ovarios (O)</h2></div>', unsafe_allow_html=True)
     st.info("📌 Incluye endometriomas y focos infiltrantes de superficie ovárica (≥5mm)")
     
@@ -339,84 +644,87 @@ with tabs[2]:
     )
     
     if ovario_der_estado == "Anormal":
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            diametro_der = st.number_input(
-                "Diámetro máximo (cm):",
-                min_value=0.0,
-                max_value=15.0,
-                step=0.1,
-                key="diametro_ovario_der"
-            )
+        with contenedor_captura("form_ovario_der"):
+            col1, col2, col3 = st.columns(3)
             
-            # Calcular clasificación automática
-            if diametro_der > 0:
-                clasificacion_auto = calcular_clasificacion_ovario(diametro_der)
-                st.info(f"💡 Clasificación sugerida: {clasificacion_auto}")
+            with col1:
+                diametro_der = st.number_input(
+                    "Diámetro máximo (cm):",
+                    min_value=0.0,
+                    max_value=15.0,
+                    step=0.1,
+                    key="diametro_ovario_der"
+                )
+                
+                # Calcular clasificación automática
+                if diametro_der > 0:
+                    clasificacion_auto = calcular_clasificacion_ovario(diametro_der)
+                    st.info(f"💡 Clasificación sugerida: {clasificacion_auto}")
+                
+            with col2:
+                num_endometriomas_der = st.number_input(
+                    "Número de endometriomas:",
+                    min_value=1,
+                    max_value=10,
+                    step=1,
+                    key="num_endometriomas_der"
+                )
+                
+            with col3:
+                clasificacion_o_der = st.select_slider(
+                    "Clasificación:",
+                    options=["O1 (<3cm)", "O2 (3-7cm)", "O3 (>7cm)"],
+                    key="clasificacion_o_der"
+                )
             
-        with col2:
-            num_endometriomas_der = st.number_input(
-                "Número de endometriomas:",
-                min_value=1,
-                max_value=10,
-                step=1,
-                key="num_endometriomas_der"
-            )
+            # Criterios IOTA
+            st.markdown("#### Criterios IOTA")
+            col1, col2 = st.columns(2)
             
-        with col3:
-            clasificacion_o_der = st.select_slider(
-                "Clasificación:",
-                options=["O1 (<3cm)", "O2 (3-7cm)", "O3 (>7cm)"],
-                key="clasificacion_o_der"
-            )
-        
-        # Criterios IOTA
-        st.markdown("#### Criterios IOTA")
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            estructura_der = st.selectbox(
-                "Estructura:",
-                ["Unilocular", "Multilocular", "Unilocular-sólido", "Multilocular-sólido", "Sólido"],
-                key="estructura_ovario_der"
-            )
+            with col1:
+                estructura_der = st.selectbox(
+                    "Estructura:",
+                    ["Unilocular", "Multilocular", "Unilocular-sólido", "Multilocular-sólido", "Sólido"],
+                    key="estructura_ovario_der"
+                )
+                
+                contenido_der = st.selectbox(
+                    "Contenido:",
+                    ["Anecoico", "Homogéneo de baja intensidad (ground glass)", 
+                     "Heterogéneo", "Con nivel líquido-líquido"],
+                    key="contenido_ovario_der"
+                )
+                
+            with col2:
+                vascularizacion_der = st.selectbox(
+                    "Vascularización al Doppler:",
+                    ["Ausente", "Mínima periférica", "Moderada", "Abundante"],
+                    key="vascularizacion_der"
+                )
+                
+                adherencias_der = st.checkbox(
+                    "Signos de adherencias a estructuras adyacentes",
+                    key="adherencias_ovario_der"
+                )
             
-            contenido_der = st.selectbox(
-                "Contenido:",
-                ["Anecoico", "Homogéneo de baja intensidad (ground glass)", 
-                 "Heterogéneo", "Con nivel líquido-líquido"],
-                key="contenido_ovario_der"
+            descripcion_ovario_der = st.text_area(
+                "Descripción adicional del ovario derecho:",
+                key="descripcion_ovario_der"
             )
             
-        with col2:
-            vascularizacion_der = st.selectbox(
-                "Vascularización al Doppler:",
-                ["Ausente", "Mínima periférica", "Moderada", "Abundante"],
-                key="vascularizacion_der"
-            )
+            st.session_state.data['ovarios']['derecho'] = {
+                'estado': 'anormal',
+                'diametro': diametro_der,
+                'num_endometriomas': num_endometriomas_der,
+                'clasificacion': clasificacion_o_der,
+                'estructura': estructura_der,
+                'contenido': contenido_der,
+                'vascularizacion': vascularizacion_der,
+                'adherencias': adherencias_der,
+                'descripcion': descripcion_ovario_der
+            }
             
-            adherencias_der = st.checkbox(
-                "Signos de adherencias a estructuras adyacentes",
-                key="adherencias_ovario_der"
-            )
-        
-        descripcion_ovario_der = st.text_area(
-            "Descripción adicional del ovario derecho:",
-            key="descripcion_ovario_der"
-        )
-        
-        st.session_state.data['ovarios']['derecho'] = {
-            'estado': 'anormal',
-            'diametro': diametro_der,
-            'num_endometriomas': num_endometriomas_der,
-            'clasificacion': clasificacion_o_der,
-            'estructura': estructura_der,
-            'contenido': contenido_der,
-            'vascularizacion': vascularizacion_der,
-            'adherencias': adherencias_der,
-            'descripcion': descripcion_ovario_der
-        }
+            boton_aplicar()
     elif ovario_der_estado == "No visualizado":
         st.session_state.data['ovarios']['derecho'] = {'estado': 'no_visualizado'}
     else:
@@ -434,89 +742,100 @@ with tabs[2]:
     )
     
     if ovario_izq_estado == "Anormal":
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            diametro_izq = st.number_input(
-                "Diámetro máximo (cm):",
-                min_value=0.0,
-                max_value=15.0,
-                step=0.1,
-                key="diametro_ovario_izq"
-            )
+        with contenedor_captura("form_ovario_izq"):
+            col1, col2, col3 = st.columns(3)
             
-            if diametro_izq > 0:
-                clasificacion_auto = calcular_clasificacion_ovario(diametro_izq)
-                st.info(f"💡 Clasificación sugerida: {clasificacion_auto}")
+            with col1:
+                diametro_izq = st.number_input(
+                    "Diámetro máximo (cm):",
+                    min_value=0.0,
+                    max_value=15.0,
+                    step=0.1,
+                    key="diametro_ovario_izq"
+                )
+                
+                if diametro_izq > 0:
+                    clasificacion_auto = calcular_clasificacion_ovario(diametro_izq)
+                    st.info(f"💡 Clasificación sugerida: {clasificacion_auto}")
+                
+            with col2:
+                num_endometriomas_izq = st.number_input(
+                    "Número de endometriomas:",
+                    min_value=1,
+                    max_value=10,
+                    step=1,
+                    key="num_endometriomas_izq"
+                )
+                
+            with col3:
+                clasificacion_o_izq = st.select_slider(
+                    "Clasificación:",
+                    options=["O1 (<3cm)", "O2 (3-7cm)", "O3 (>7cm)"],
+                    key="clasificacion_o_izq"
+                )
             
-        with col2:
-            num_endometriomas_izq = st.number_input(
-                "Número de endometriomas:",
-                min_value=1,
-                max_value=10,
-                step=1,
-                key="num_endometriomas_izq"
-            )
+            st.markdown("#### Criterios IOTA")
+            col1, col2 = st.columns(2)
             
-        with col3:
-            clasificacion_o_izq = st.select_slider(
-                "Clasificación:",
-                options=["O1 (<3cm)", "O2 (3-7cm)", "O3 (>7cm)"],
-                key="clasificacion_o_izq"
-            )
-        
-        st.markdown("#### Criterios IOTA")
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            estructura_izq = st.selectbox(
-                "Estructura:",
-                ["Unilocular", "Multilocular", "Unilocular-sólido", "Multilocular-sólido", "Sólido"],
-                key="estructura_ovario_izq"
-            )
+            with col1:
+                estructura_izq = st.selectbox(
+                    "Estructura:",
+                    ["Unilocular", "Multilocular", "Unilocular-sólido", "Multilocular-sólido", "Sólido"],
+                    key="estructura_ovario_izq"
+                )
+                
+                contenido_izq = st.selectbox(
+                    "Contenido:",
+                    ["Anecoico", "Homogéneo de baja intensidad (ground glass)", 
+                     "Heterogéneo", "Con nivel líquido-líquido"],
+                    key="contenido_ovario_izq"
+                )
+                
+            with col2:
+                vascularizacion_izq = st.selectbox(
+                    "Vascularización al Doppler:",
+                    ["Ausente", "Mínima periférica", "Moderada", "Abundante"],
+                    key="vascularizacion_izq"
+                )
+                
+                adherencias_izq = st.checkbox(
+                    "Signos de adherencias a estructuras adyacentes",
+                    key="adherencias_ovario_izq"
+                )
             
-            contenido_izq = st.selectbox(
-                "Contenido:",
-                ["Anecoico", "Homogéneo de baja intensidad (ground glass)", 
-                 "Heterogéneo", "Con nivel líquido-líquido"],
-                key="contenido_ovario_izq"
+            descripcion_ovario_izq = st.text_area(
+                "Descripción adicional del ovario izquierdo:",
+                key="descripcion_ovario_izq"
             )
             
-        with col2:
-            vascularizacion_izq = st.selectbox(
-                "Vascularización al Doppler:",
-                ["Ausente", "Mínima periférica", "Moderada", "Abundante"],
-                key="vascularizacion_izq"
-            )
+            st.session_state.data['ovarios']['izquierdo'] = {
+                'estado': 'anormal',
+                'diametro': diametro_izq,
+                'num_endometriomas': num_endometriomas_izq,
+                'clasificacion': clasificacion_o_izq,
+                'estructura': estructura_izq,
+                'contenido': contenido_izq,
+                'vascularizacion': vascularizacion_izq,
+                'adherencias': adherencias_izq,
+                'descripcion': descripcion_ovario_izq
+            }
             
-            adherencias_izq = st.checkbox(
-                "Signos de adherencias a estructuras adyacentes",
-                key="adherencias_ovario_izq"
-            )
-        
-        descripcion_ovario_izq = st.text_area(
-            "Descripción adicional del ovario izquierdo:",
-            key="descripcion_ovario_izq"
-        )
-        
-        st.session_state.data['ovarios']['izquierdo'] = {
-            'estado': 'anormal',
-            'diametro': diametro_izq,
-            'num_endometriomas': num_endometriomas_izq,
-            'clasificacion': clasificacion_o_izq,
-            'estructura': estructura_izq,
-            'contenido': contenido_izq,
-            'vascularizacion': vascularizacion_izq,
-            'adherencias': adherencias_izq,
-            'descripcion': descripcion_ovario_izq
-        }
+            boton_aplicar()
     elif ovario_izq_estado == "No visualizado":
         st.session_state.data['ovarios']['izquierdo'] = {'estado': 'no_visualizado'}
     else:
         st.session_state.data['ovarios']['izquierdo'] = {'estado': 'normal'}
+    
+    vista_previa_codigo()
+
+with tabs[2]:
+    pestana_ovarios()
 
 # ============= PESTAÑA 4: CONDICIÓN TUBO-OVÁRICA (T) =============
-with tabs[3]:
+@st.fragment
+@medido('pestana_tubos')
+def pestana_tubos():
+    """Contenido de la pestaña Condición tubo-ovárica (T)"""
     st.markdown('<div class="section-header"><h2>🎗️ Condición Tubo-Ovárica (T)</h2></div>', unsafe_allow_html=True)
     st.info("📌 Evaluación de adherencias y movilidad tubo-ovárica mediante sliding sign")
     
@@ -530,41 +849,44 @@ with tabs[3]:
     )
     
     if tubo_der_estado == "Anormal - Adherencias presentes":
-        clasificacion_t_der = st.select_slider(
-            "Clasificación:",
-            options=[
-                "T1 - Adherencias ovario-pared pélvica",
-                "T2 - T1 + adherencias al útero",
-                "T3 - T2 + adherencias a LSU/intestino"
-            ],
-            key="clasificacion_t_der"
-        )
-        
-        sliding_sign_der = st.select_slider(
-            "Sliding sign:",
-            options=["Positivo (móvil)", "Limitado", "Negativo (fijo)"],
-            key="sliding_sign_der"
-        )
-        
-        permeabilidad_der = st.radio(
-            "Permeabilidad tubárica (opcional):",
-            ["No evaluada", "Permeable (+)", "No permeable (-)"],
-            key="permeabilidad_der",
-            horizontal=True
-        )
-        
-        descripcion_tubo_der = st.text_area(
-            "Descripción adicional lado derecho:",
-            key="descripcion_tubo_der"
-        )
-        
-        st.session_state.data['tubos']['derecho'] = {
-            'estado': 'anormal',
-            'clasificacion': clasificacion_t_der,
-            'sliding_sign': sliding_sign_der,
-            'permeabilidad': permeabilidad_der,
-            'descripcion': descripcion_tubo_der
-        }
+        with contenedor_captura("form_tubo_der"):
+            clasificacion_t_der = st.select_slider(
+                "Clasificación:",
+                options=[
+                    "T1 - Adherencias ovario-pared pélvica",
+                    "T2 - T1 + adherencias al útero",
+                    "T3 - T2 + adherencias a LSU/intestino"
+                ],
+                key="clasificacion_t_der"
+            )
+            
+            sliding_sign_der = st.select_slider(
+                "Sliding sign:",
+                options=["Positivo (móvil)", "Limitado", "Negativo (fijo)"],
+                key="sliding_sign_der"
+            )
+            
+            permeabilidad_der = st.radio(
+                "Permeabilidad tubárica (opcional):",
+                ["No evaluada", "Permeable (+)", "No permeable (-)"],
+                key="permeabilidad_der",
+                horizontal=True
+            )
+            
+            descripcion_tubo_der = st.text_area(
+                "Descripción adicional lado derecho:",
+                key="descripcion_tubo_der"
+            )
+            
+            st.session_state.data['tubos']['derecho'] = {
+                'estado': 'anormal',
+                'clasificacion': clasificacion_t_der,
+                'sliding_sign': sliding_sign_der,
+                'permeabilidad': permeabilidad_der,
+                'descripcion': descripcion_tubo_der
+            }
+            
+            boton_aplicar()
     elif tubo_der_estado == "No evaluable":
         st.session_state.data['tubos']['derecho'] = {'estado': 'no_evaluable'}
     else:
@@ -582,48 +904,59 @@ with tabs[3]:
     )
     
     if tubo_izq_estado == "Anormal - Adherencias presentes":
-        clasificacion_t_izq = st.select_slider(
-            "Clasificación:",
-            options=[
-                "T1 - Adherencias ovario-pared pélvica",
-                "T2 - T1 + adherencias al útero",
-                "T3 - T2 + adherencias a LSU/intestino"
-            ],
-            key="clasificacion_t_izq"
-        )
-        
-        sliding_sign_izq = st.select_slider(
-            "Sliding sign:",
-            options=["Positivo (móvil)", "Limitado", "Negativo (fijo)"],
-            key="sliding_sign_izq"
-        )
-        
-        permeabilidad_izq = st.radio(
-            "Permeabilidad tubárica (opcional):",
-            ["No evaluada", "Permeable (+)", "No permeable (-)"],
-            key="permeabilidad_izq",
-            horizontal=True
-        )
-        
-        descripcion_tubo_izq = st.text_area(
-            "Descripción adicional lado izquierdo:",
-            key="descripcion_tubo_izq"
-        )
-        
-        st.session_state.data['tubos']['izquierdo'] = {
-            'estado': 'anormal',
-            'clasificacion': clasificacion_t_izq,
-            'sliding_sign': sliding_sign_izq,
-            'permeabilidad': permeabilidad_izq,
-            'descripcion': descripcion_tubo_izq
-        }
+        with contenedor_captura("form_tubo_izq"):
+            clasificacion_t_izq = st.select_slider(
+                "Clasificación:",
+                options=[
+                    "T1 - Adherencias ovario-pared pélvica",
+                    "T2 - T1 + adherencias al útero",
+                    "T3 - T2 + adherencias a LSU/intestino"
+                ],
+                key="clasificacion_t_izq"
+            )
+            
+            sliding_sign_izq = st.select_slider(
+                "Sliding sign:",
+                options=["Positivo (móvil)", "Limitado", "Negativo (fijo)"],
+                key="sliding_sign_izq"
+            )
+            
+            permeabilidad_izq = st.radio(
+                "Permeabilidad tubárica (opcional):",
+                ["No evaluada", "Permeable (+)", "No permeable (-)"],
+                key="permeabilidad_izq",
+                horizontal=True
+            )
+            
+            descripcion_tubo_izq = st.text_area(
+                "Descripción adicional lado izquierdo:",
+                key="descripcion_tubo_izq"
+            )
+            
+            st.session_state.data['tubos']['izquierdo'] = {
+                'estado': 'anormal',
+                'clasificacion': clasificacion_t_izq,
+                'sliding_sign': sliding_sign_izq,
+                'permeabilidad': permeabilidad_izq,
+                'descripcion': descripcion_tubo_izq
+            }
+            
+            boton_aplicar()
     elif tubo_izq_estado == "No evaluable":
         st.session_state.data['tubos']['izquierdo'] = {'estado': 'no_evaluable'}
     else:
         st.session_state.data['tubos']['izquierdo'] = {'estado': 'normal'}
+    
+    vista_previa_codigo()
+
+with tabs[3]:
+    pestana_tubos()
 
 # ============= PESTAÑA 5: COMPARTIMENTO A =============
-with tabs[4]:
+@st.fragment
+@medido('pestana_compartimento_a')
+def pestana_compartimento_a():
+    """Contenido de la pestaña Compartimento A"""
     st.markdown('<div class="section-header"><h2>🅰️ Compartimento A</h2></div>', unsafe_allow_html=True)
     st.info("📌 Vagina, espacio rectovaginal y área retrocervical (eje craneocaudal)")
     
@@ -635,72 +968,83 @@ with tabs[4]:
     )
     
     if comp_a_estado == "Anormal":
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            diametro_a = st.number_input(
-                "Diámetro máximo en plano sagital medio (cm):",
-                min_value=0.0,
-                max_value=10.0,
-                step=0.1,
-                key="diametro_comp_a"
-            )
+        with contenedor_captura("form_comp_a"):
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                diametro_a = st.number_input(
+                    "Diámetro máximo en plano sagital medio (cm):",
+                    min_value=0.0,
+                    max_value=10.0,
+                    step=0.1,
+                    key="diametro_comp_a"
+                )
+                
+                if diametro_a > 0:
+                    clasificacion_sugerida = calcular_clasificacion_compartimento(diametro_a)
+                    st.info(f"💡 Clasificación sugerida: A{clasificacion_sugerida}")
+                
+            with col2:
+                clasificacion_a = st.select_slider(
+                    "Clasificación:",
+                    options=["A1 (<1 cm)", "A2 (1-3 cm)", "A3 (>3 cm)"],
+                    key="clasificacion_a"
+                )
             
+            # Validación de consistencia
             if diametro_a > 0:
-                clasificacion_sugerida = calcular_clasificacion_compartimento(diametro_a)
-                st.info(f"💡 Clasificación sugerida: A{clasificacion_sugerida}")
+                clase_manual = clasificacion_a[1]  # Extraer el número
+                es_valido, mensaje = validar_consistencia('A', diametro_a, clase_manual)
+                if not es_valido:
+                    st.warning(mensaje)
             
-        with col2:
-            clasificacion_a = st.select_slider(
-                "Clasificación:",
-                options=["A1 (<1 cm)", "A2 (1-3 cm)", "A3 (>3 cm)"],
-                key="clasificacion_a"
+            localizacion_a = st.multiselect(
+                "Localización específica:",
+                ["Fórnix vaginal posterior", "Espacio rectovaginal", "Área retrocervical"],
+                key="localizacion_comp_a"
             )
-        
-        # Validación de consistencia
-        if diametro_a > 0:
-            clase_manual = clasificacion_a[1]  # Extraer el número
-            es_valido, mensaje = validar_consistencia('A', diametro_a, clase_manual)
-            if not es_valido:
-                st.warning(mensaje)
-        
-        localizacion_a = st.multiselect(
-            "Localización específica:",
-            ["Fórnix vaginal posterior", "Espacio rectovaginal", "Área retrocervical"],
-            key="localizacion_comp_a"
-        )
-        
-        ecogenicidad_a = st.selectbox(
-            "Ecogenicidad de la lesión:",
-            ["Hipoecogénica", "Isoecogénica", "Heterogénea"],
-            key="ecogenicidad_comp_a"
-        )
-        
-        contornos_a = st.selectbox(
-            "Contornos:",
-            ["Regulares", "Irregulares", "Espiculados"],
-            key="contornos_comp_a"
-        )
-        
-        descripcion_a = st.text_area(
-            "Descripción adicional:",
-            key="descripcion_comp_a"
-        )
-        
-        st.session_state.data['compartimento_a'] = {
-            'estado': 'anormal',
-            'diametro': diametro_a,
-            'clasificacion': clasificacion_a,
-            'localizacion': localizacion_a,
-            'ecogenicidad': ecogenicidad_a,
-            'contornos': contornos_a,
-            'descripcion': descripcion_a
-        }
+            
+            ecogenicidad_a = st.selectbox(
+                "Ecogenicidad de la lesión:",
+                ["Hipoecogénica", "Isoecogénica", "Heterogénea"],
+                key="ecogenicidad_comp_a"
+            )
+            
+            contornos_a = st.selectbox(
+                "Contornos:",
+                ["Regulares", "Irregulares", "Espiculados"],
+                key="contornos_comp_a"
+            )
+            
+            descripcion_a = st.text_area(
+                "Descripción adicional:",
+                key="descripcion_comp_a"
+            )
+            
+            st.session_state.data['compartimento_a'] = {
+                'estado': 'anormal',
+                'diametro': diametro_a,
+                'clasificacion': clasificacion_a,
+                'localizacion': localizacion_a,
+                'ecogenicidad': ecogenicidad_a,
+                'contornos': contornos_a,
+                'descripcion': descripcion_a
+            }
+            
+            boton_aplicar()
     else:
         st.session_state.data['compartimento_a'] = {'estado': 'normal'}
+    
+    vista_previa_codigo()
+
+with tabs[4]:
+    pestana_compartimento_a()
 
 # ============= PESTAÑA 6: COMPARTIMENTO B =============
-with tabs[5]:
+@st.fragment
+@medido('pestana_compartimento_b')
+def pestana_compartimento_b():
+    """Contenido de la pestaña Compartimento B"""
     st.markdown('<div class="section-header"><h2>🅱️ Compartimento B</h2></div>', unsafe_allow_html=True)
     st.info("📌 Ligamentos uterosacros, ligamentos cardinales y pared pélvica lateral (eje mediolateral)")
     
@@ -714,82 +1058,85 @@ with tabs[5]:
     )
     
     if lsu_der_estado == "Anormal":
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            diametro_max_b_der = st.number_input(
-                "Diámetro máximo (cm):",
-                min_value=0.0,
-                max_value=10.0,
-                step=0.1,
-                key="diametro_lsu_der"
+        with contenedor_captura("form_lsu_der"):
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                diametro_max_b_der = st.number_input(
+                    "Diámetro máximo (cm):",
+                    min_value=0.0,
+                    max_value=10.0,
+                    step=0.1,
+                    key="diametro_lsu_der"
+                )
+                
+                if diametro_max_b_der > 0:
+                    clasificacion_sugerida = calcular_clasificacion_compartimento(diametro_max_b_der)
+                    st.info(f"💡 Clasificación sugerida: B{clasificacion_sugerida}")
+            
+            with col2:
+                dim_ap_b_der = st.number_input(
+                    "Dimensión anteroposterior (cm):",
+                    min_value=0.0,
+                    max_value=10.0,
+                    step=0.1,
+                    key="dim_ap_lsu_der"
+                )
+            
+            with col3:
+                dim_cc_b_der = st.number_input(
+                    "Dimensión craneocaudal (cm):",
+                    min_value=0.0,
+                    max_value=10.0,
+                    step=0.1,
+                    key="dim_cc_lsu_der"
+                )
+            
+            clasificacion_b_der = st.select_slider(
+                "Clasificación:",
+                options=["B1 (<1 cm)", "B2 (1-3 cm)", "B3 (>3 cm)"],
+                key="clasificacion_b_der"
             )
             
+            # Validación
             if diametro_max_b_der > 0:
-                clasificacion_sugerida = calcular_clasificacion_compartimento(diametro_max_b_der)
-                st.info(f"💡 Clasificación sugerida: B{clasificacion_sugerida}")
-        
-        with col2:
-            dim_ap_b_der = st.number_input(
-                "Dimensión anteroposterior (cm):",
-                min_value=0.0,
-                max_value=10.0,
-                step=0.1,
-                key="dim_ap_lsu_der"
+                clase_manual = clasificacion_b_der[1]
+                es_valido, mensaje = validar_consistencia('B', diametro_max_b_der, clase_manual)
+                if not es_valido:
+                    st.warning(mensaje)
+            
+            st.markdown("#### Evaluación de movilidad (Sliding Sign)")
+            sliding_lsu_der = st.select_slider(
+                "Sliding sign del LSU derecho:",
+                options=["Positivo (móvil)", "Limitado", "Negativo (fijo)"],
+                key="sliding_lsu_der"
             )
-        
-        with col3:
-            dim_cc_b_der = st.number_input(
-                "Dimensión craneocaudal (cm):",
+            
+            distancia_cervix_der = st.number_input(
+                "Distancia desde inserción cervical (cm):",
                 min_value=0.0,
                 max_value=10.0,
                 step=0.1,
-                key="dim_cc_lsu_der"
+                key="distancia_cervix_der"
             )
-        
-        clasificacion_b_der = st.select_slider(
-            "Clasificación:",
-            options=["B1 (<1 cm)", "B2 (1-3 cm)", "B3 (>3 cm)"],
-            key="clasificacion_b_der"
-        )
-        
-        # Validación
-        if diametro_max_b_der > 0:
-            clase_manual = clasificacion_b_der[1]
-            es_valido, mensaje = validar_consistencia('B', diametro_max_b_der, clase_manual)
-            if not es_valido:
-                st.warning(mensaje)
-        
-        st.markdown("#### Evaluación de movilidad (Sliding Sign)")
-        sliding_lsu_der = st.select_slider(
-            "Sliding sign del LSU derecho:",
-            options=["Positivo (móvil)", "Limitado", "Negativo (fijo)"],
-            key="sliding_lsu_der"
-        )
-        
-        distancia_cervix_der = st.number_input(
-            "Distancia desde inserción cervical (cm):",
-            min_value=0.0,
-            max_value=10.0,
-            step=0.1,
-            key="distancia_cervix_der"
-        )
-        
-        descripcion_lsu_der = st.text_area(
-            "Descripción adicional LSU derecho:",
-            key="descripcion_lsu_der"
-        )
-        
-        st.session_state.data['compartimento_b']['derecho'] = {
-            'estado': 'anormal',
-            'diametro_max': diametro_max_b_der,
-            'dim_ap': dim_ap_b_der,
-            'dim_cc': dim_cc_b_der,
-            'clasificacion': clasificacion_b_der,
-            'sliding_sign': sliding_lsu_der,
-            'distancia_cervix': distancia_cervix_der,
-            'descripcion': descripcion_lsu_der
-        }
+            
+            descripcion_lsu_der = st.text_area(
+                "Descripción adicional LSU derecho:",
+                key="descripcion_lsu_der"
+            )
+            
+            st.session_state.data['compartimento_b']['derecho'] = {
+                'estado': 'anormal',
+                'diametro_max': diametro_max_b_der,
+                'dim_ap': dim_ap_b_der,
+                'dim_cc': dim_cc_b_der,
+                'clasificacion': clasificacion_b_der,
+                'sliding_sign': sliding_lsu_der,
+                'distancia_cervix': distancia_cervix_der,
+                'descripcion': descripcion_lsu_der
+            }
+            
+            boton_aplicar()
     else:
         st.session_state.data['compartimento_b']['derecho'] = {'estado': 'normal'}
     
@@ -805,87 +1152,98 @@ with tabs[5]:
     )
     
     if lsu_izq_estado == "Anormal":
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            diametro_max_b_izq = st.number_input(
-                "Diámetro máximo (cm):",
-                min_value=0.0,
-                max_value=10.0,
-                step=0.1,
-                key="diametro_lsu_izq"
+        with contenedor_captura("form_lsu_izq"):
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                diametro_max_b_izq = st.number_input(
+                    "Diámetro máximo (cm):",
+                    min_value=0.0,
+                    max_value=10.0,
+                    step=0.1,
+                    key="diametro_lsu_izq"
+                )
+                
+                if diametro_max_b_izq > 0:
+                    clasificacion_sugerida = calcular_clasificacion_compartimento(diametro_max_b_izq)
+                    st.info(f"💡 Clasificación sugerida: B{clasificacion_sugerida}")
+            
+            with col2:
+                dim_ap_b_izq = st.number_input(
+                    "Dimensión anteroposterior (cm):",
+                    min_value=0.0,
+                    max_value=10.0,
+                    step=0.1,
+                    key="dim_ap_lsu_izq"
+                )
+            
+            with col3:
+                dim_cc_b_izq = st.number_input(
+                    "Dimensión craneocaudal (cm):",
+                    min_value=0.0,
+                    max_value=10.0,
+                    step=0.1,
+                    key="dim_cc_lsu_izq"
+                )
+            
+            clasificacion_b_izq = st.select_slider(
+                "Clasificación:",
+                options=["B1 (<1 cm)", "B2 (1-3 cm)", "B3 (>3 cm)"],
+                key="clasificacion_b_izq"
             )
             
+            # Validación
             if diametro_max_b_izq > 0:
-                clasificacion_sugerida = calcular_clasificacion_compartimento(diametro_max_b_izq)
-                st.info(f"💡 Clasificación sugerida: B{clasificacion_sugerida}")
-        
-        with col2:
-            dim_ap_b_izq = st.number_input(
-                "Dimensión anteroposterior (cm):",
-                min_value=0.0,
-                max_value=10.0,
-                step=0.1,
-                key="dim_ap_lsu_izq"
+                clase_manual = clasificacion_b_izq[1]
+                es_valido, mensaje = validar_consistencia('B', diametro_max_b_izq, clase_manual)
+                if not es_valido:
+                    st.warning(mensaje)
+            
+            st.markdown("#### Evaluación de movilidad (Sliding Sign)")
+            sliding_lsu_izq = st.select_slider(
+                "Sliding sign del LSU izquierdo:",
+                options=["Positivo (móvil)", "Limitado", "Negativo (fijo)"],
+                key="sliding_lsu_izq"
             )
-        
-        with col3:
-            dim_cc_b_izq = st.number_input(
-                "Dimensión craneocaudal (cm):",
+            
+            distancia_cervix_izq = st.number_input(
+                "Distancia desde inserción cervical (cm):",
                 min_value=0.0,
                 max_value=10.0,
                 step=0.1,
-                key="dim_cc_lsu_izq"
+                key="distancia_cervix_izq"
             )
-        
-        clasificacion_b_izq = st.select_slider(
-            "Clasificación:",
-            options=["B1 (<1 cm)", "B2 (1-3 cm)", "B3 (>3 cm)"],
-            key="clasificacion_b_izq"
-        )
-        
-        # Validación
-        if diametro_max_b_izq > 0:
-            clase_manual = clasificacion_b_izq[1]
-            es_valido, mensaje = validar_consistencia('B', diametro_max_b_izq, clase_manual)
-            if not es_valido:
-                st.warning(mensaje)
-        
-        st.markdown("#### Evaluación de movilidad (Sliding Sign)")
-        sliding_lsu_izq = st.select_slider(
-            "Sliding sign del LSU izquierdo:",
-            options=["Positivo (móvil)", "Limitado", "Negativo (fijo)"],
-            key="sliding_lsu_izq"
-        )
-        
-        distancia_cervix_izq = st.number_input(
-            "Distancia desde inserción cervical (cm):",
-            min_value=0.0,
-            max_value=10.0,
-            step=0.1,
-            key="distancia_cervix_izq"
-        )
-        
-        descripcion_lsu_izq = st.text_area(
-            "Descripción adicional LSU izquierdo:",
-            key="descripcion_lsu_izq"
-        )
-        
-        st.session_state.data['compartimento_b']['izquierdo'] = {
-            'estado': 'anormal',
-            'diametro_max': diametro_max_b_izq,
-            'dim_ap': dim_ap_b_izq,
-            'dim_cc': dim_cc_b_izq,
-            'clasificacion': clasificacion_b_izq,
-            'sliding_sign': sliding_lsu_izq,
-            'distancia_cervix': distancia_cervix_izq,
-            'descripcion': descripcion_lsu_izq
-        }
+            
+            descripcion_lsu_izq = st.text_area(
+                "Descripción adicional LSU izquierdo:",
+                key="descripcion_lsu_izq"
+            )
+            
+            st.session_state.data['compartimento_b']['izquierdo'] = {
+                'estado': 'anormal',
+                'diametro_max': diametro_max_b_izq,
+                'dim_ap': dim_ap_b_izq,
+                'dim_cc': dim_cc_b_izq,
+                'clasificacion': clasificacion_b_izq,
+                'sliding_sign': sliding_lsu_izq,
+                'distancia_cervix': distancia_cervix_izq,
+                'descripcion': descripcion_lsu_izq
+            }
+            
+            boton_aplicar()
     else:
         st.session_state.data['compartimento_b']['izquierdo'] = {'estado': 'normal'}
+    
+    vista_previa_codigo()
+
+with tabs[5]:
+    pestana_compartimento_b()
 
 # ============= PESTAÑA 7: COMPARTIMENTO C =============
-with tabs[6]:
+@st.fragment
+@medido('pestana_compartimento_c')
+def pestana_compartimento_c():
+    """Contenido de la pestaña Compartimento C"""
     st.markdown('<div class="section-header"><h2>🅲 Compartimento C</h2></div>', unsafe_allow_html=True)
     st.info("📌 Recto (hasta 16 cm del margen anal) - Eje ventrodorsal")
     
@@ -897,98 +1255,108 @@ with tabs[6]:
     )
     
     if comp_c_estado == "Anormal":
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            longitud_lesion_c = st.number_input(
-                "Longitud de la lesión (cm):",
+        with contenedor_captura("form_comp_c"):
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                longitud_lesion_c = st.number_input(
+                    "Longitud de la lesión (cm):",
+                    min_value=0.0,
+                    max_value=20.0,
+                    step=0.1,
+                    key="longitud_lesion_c"
+                )
+                
+                if longitud_lesion_c > 0:
+                    clasificacion_sugerida = calcular_clasificacion_compartimento(longitud_lesion_c)
+                    st.info(f"💡 Clasificación sugerida: C{clasificacion_sugerida}")
+            
+            with col2:
+                clasificacion_c = st.select_slider(
+                    "Clasificación:",
+                    options=["C1 (<1 cm)", "C2 (1-3 cm)", "C3 (>3 cm)"],
+                    key="clasificacion_c"
+                )
+            
+            # Validación
+            if longitud_lesion_c > 0:
+                clase_manual = clasificacion_c[1]
+                es_valido, mensaje = validar_consistencia('C', longitud_lesion_c, clase_manual)
+                if not es_valido:
+                    st.warning(mensaje)
+            
+            st.markdown("#### Características específicas del recto")
+            
+            distancia_anal = st.number_input(
+                "Distancia desde margen anal (cm):",
                 min_value=0.0,
-                max_value=20.0,
-                step=0.1,
-                key="longitud_lesion_c"
+                max_value=16.0,
+                step=0.5,
+                key="distancia_anal_c",
+                help="Hasta 16 cm = recto; >16 cm = clasificar como FI"
             )
             
-            if longitud_lesion_c > 0:
-                clasificacion_sugerida = calcular_clasificacion_compartimento(longitud_lesion_c)
-                st.info(f"💡 Clasificación sugerida: C{clasificacion_sugerida}")
-        
-        with col2:
-            clasificacion_c = st.select_slider(
-                "Clasificación:",
-                options=["C1 (<1 cm)", "C2 (1-3 cm)", "C3 (>3 cm)"],
-                key="clasificacion_c"
+            if distancia_anal > 16:
+                st.error("⚠️ Lesiones >16 cm del margen anal deben clasificarse como FI (sigma)")
+            
+            profundidad_infiltracion = st.selectbox(
+                "Profundidad de infiltración:",
+                ["Serosa/subserosa", "Muscular propia", "Submucosa", "Mucosa"],
+                key="profundidad_infiltracion_c"
             )
-        
-        # Validación
-        if longitud_lesion_c > 0:
-            clase_manual = clasificacion_c[1]
-            es_valido, mensaje = validar_consistencia('C', longitud_lesion_c, clase_manual)
-            if not es_valido:
-                st.warning(mensaje)
-        
-        st.markdown("#### Características específicas del recto")
-        
-        distancia_anal = st.number_input(
-            "Distancia desde margen anal (cm):",
-            min_value=0.0,
-            max_value=16.0,
-            step=0.5,
-            key="distancia_anal_c",
-            help="Hasta 16 cm = recto; >16 cm = clasificar como FI"
-        )
-        
-        if distancia_anal > 16:
-            st.error("⚠️ Lesiones >16 cm del margen anal deben clasificarse como FI (sigma)")
-        
-        profundidad_infiltracion = st.selectbox(
-            "Profundidad de infiltración:",
-            ["Serosa/subserosa", "Muscular propia", "Submucosa", "Mucosa"],
-            key="profundidad_infiltracion_c"
-        )
-        
-        porcentaje_circunferencia = st.slider(
-            "Porcentaje de circunferencia afectada:",
-            min_value=0,
-            max_value=100,
-            step=5,
-            value=0,
-            key="porcentaje_circunferencia_c"
-        )
-        
-        st.write(f"Circunferencia afectada: {porcentaje_circunferencia}%")
-        
-        estenosis = st.checkbox(
-            "Signos de estenosis",
-            key="estenosis_c"
-        )
-        
-        sliding_sign_rectal = st.select_slider(
-            "Sliding sign rectal:",
-            options=["Positivo (móvil)", "Limitado", "Negativo (fijo)"],
-            key="sliding_sign_rectal"
-        )
-        
-        descripcion_c = st.text_area(
-            "Descripción adicional:",
-            key="descripcion_comp_c"
-        )
-        
-        st.session_state.data['compartimento_c'] = {
-            'estado': 'anormal',
-            'longitud': longitud_lesion_c,
-            'clasificacion': clasificacion_c,
-            'distancia_anal': distancia_anal,
-            'profundidad': profundidad_infiltracion,
-            'circunferencia': porcentaje_circunferencia,
-            'estenosis': estenosis,
-            'sliding_sign': sliding_sign_rectal,
-            'descripcion': descripcion_c
-        }
+            
+            porcentaje_circunferencia = st.slider(
+                "Porcentaje de circunferencia afectada:",
+                min_value=0,
+                max_value=100,
+                step=5,
+                key="porcentaje_circunferencia_c"
+            )
+            
+            st.write(f"Circunferencia afectada: {porcentaje_circunferencia}%")
+            
+            estenosis = st.checkbox(
+                "Signos de estenosis",
+                key="estenosis_c"
+            )
+            
+            sliding_sign_rectal = st.select_slider(
+                "Sliding sign rectal:",
+                options=["Positivo (móvil)", "Limitado", "Negativo (fijo)"],
+                key="sliding_sign_rectal"
+            )
+            
+            descripcion_c = st.text_area(
+                "Descripción adicional:",
+                key="descripcion_comp_c"
+            )
+            
+            st.session_state.data['compartimento_c'] = {
+                'estado': 'anormal',
+                'longitud': longitud_lesion_c,
+                'clasificacion': clasificacion_c,
+                'distancia_anal': distancia_anal,
+                'profundidad': profundidad_infiltracion,
+                'circunferencia': porcentaje_circunferencia,
+                'estenosis': estenosis,
+                'sliding_sign': sliding_sign_rectal,
+                'descripcion': descripcion_c
+            }
+            
+            boton_aplicar()
     else:
         st.session_state.data['compartimento_c'] = {'estado': 'normal'}
+    
+    vista_previa_codigo()
+
+with tabs[6]:
+    pestana_compartimento_c()
 
 # ============= PESTAÑA 8: LOCALIZACIONES F =============
-with tabs[7]:
+@st.fragment
+@medido('pestana_localizaciones_f')
+def pestana_localizaciones_f():
+    """Contenido de la pestaña Localizaciones F"""
     st.markdown('<div class="section-header"><h2>📍 Localizaciones F (Far locations)</h2></div>', unsafe_allow_html=True)
     st.info("📌 Localizaciones extragenitales y otras ubicaciones distantes")
     
@@ -1002,30 +1370,33 @@ with tabs[7]:
     )
     
     if adenomiosis == "Sí":
-        criterios_musa = st.multiselect(
-            "Criterios MUSA presentes:",
-            [
-                "Asimetría de paredes miometriales",
-                "Quistes miometriales",
-                "Hiperplasia endometrial focal",
-                "Líneas de sombra",
-                "Áreas heterogéneas en miometrio",
-                "Zona juncional irregular",
-                "Vascularización translesional"
-            ],
-            key="criterios_musa"
-        )
-        
-        descripcion_fa = st.text_area(
-            "Descripción de adenomiosis:",
-            key="descripcion_adenomiosis"
-        )
-        
-        st.session_state.data['localizaciones_f']['adenomiosis'] = {
-            'presente': True,
-            'criterios_musa': criterios_musa,
-            'descripcion': descripcion_fa
-        }
+        with contenedor_captura("form_adenomiosis"):
+            criterios_musa = st.multiselect(
+                "Criterios MUSA presentes:",
+                [
+                    "Asimetría de paredes miometriales",
+                    "Quistes miometriales",
+                    "Hiperplasia endometrial focal",
+                    "Líneas de sombra",
+                    "Áreas heterogéneas en miometrio",
+                    "Zona juncional irregular",
+                    "Vascularización translesional"
+                ],
+                key="criterios_musa"
+            )
+            
+            descripcion_fa = st.text_area(
+                "Descripción de adenomiosis:",
+                key="descripcion_adenomiosis"
+            )
+            
+            st.session_state.data['localizaciones_f']['adenomiosis'] = {
+                'presente': True,
+                'criterios_musa': criterios_musa,
+                'descripcion': descripcion_fa
+            }
+            
+            boton_aplicar()
     else:
         st.session_state.data['localizaciones_f']['adenomiosis'] = {'presente': False}
     
@@ -1041,38 +1412,41 @@ with tabs[7]:
     )
     
     if vejiga == "Sí":
-        localizacion_vejiga = st.selectbox(
-            "Localización en vejiga:",
-            ["Pared posterior", "Cúpula", "Trígono", "Otras"],
-            key="localizacion_vejiga"
-        )
-        
-        profundidad_vejiga = st.selectbox(
-            "Profundidad:",
-            ["Serosa", "Muscular", "Submucosa", "Mucosa"],
-            key="profundidad_vejiga"
-        )
-        
-        dimension_vejiga = st.number_input(
-            "Dimensión máxima (cm):",
-            min_value=0.0,
-            max_value=10.0,
-            step=0.1,
-            key="dimension_vejiga"
-        )
-        
-        descripcion_fb = st.text_area(
-            "Descripción de compromiso vesical:",
-            key="descripcion_vejiga"
-        )
-        
-        st.session_state.data['localizaciones_f']['vejiga'] = {
-            'presente': True,
-            'localizacion': localizacion_vejiga,
-            'profundidad': profundidad_vejiga,
-            'dimension': dimension_vejiga,
-            'descripcion': descripcion_fb
-        }
+        with contenedor_captura("form_vejiga"):
+            localizacion_vejiga = st.selectbox(
+                "Localización en vejiga:",
+                ["Pared posterior", "Cúpula", "Trígono", "Otras"],
+                key="localizacion_vejiga"
+            )
+            
+            profundidad_vejiga = st.selectbox(
+                "Profundidad:",
+                ["Serosa", "Muscular", "Submucosa", "Mucosa"],
+                key="profundidad_vejiga"
+            )
+            
+            dimension_vejiga = st.number_input(
+                "Dimensión máxima (cm):",
+                min_value=0.0,
+                max_value=10.0,
+                step=0.1,
+                key="dimension_vejiga"
+            )
+            
+            descripcion_fb = st.text_area(
+                "Descripción de compromiso vesical:",
+                key="descripcion_vejiga"
+            )
+            
+            st.session_state.data['localizaciones_f']['vejiga'] = {
+                'presente': True,
+                'localizacion': localizacion_vejiga,
+                'profundidad': profundidad_vejiga,
+                'dimension': dimension_vejiga,
+                'descripcion': descripcion_fb
+            }
+            
+            boton_aplicar()
     else:
         st.session_state.data['localizaciones_f']['vejiga'] = {'presente': False}
     
@@ -1088,52 +1462,63 @@ with tabs[7]:
     )
     
     if ureter == "Sí":
+        # Los lados elegidos definen qué campos se muestran: quedan fuera del formulario
         lado_ureter = st.multiselect(
             "Lado(s) afectado(s):",
             ["Derecho", "Izquierdo"],
             key="lado_ureter"
         )
         
-        for lado in lado_ureter:
-            st.markdown(f"#### Uréter {lado}")
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                diametro_ureter = st.number_input(
-                    f"Diámetro uréter {lado.lower()} (mm):",
-                    min_value=0.0,
-                    max_value=20.0,
-                    step=0.5,
-                    key=f"diametro_ureter_{lado.lower()}"
-                )
+        with contenedor_captura("form_ureter"):
+            ureter_por_lado = {}
+            for lado in lado_ureter:
+                st.markdown(f"#### Uréter {lado}")
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    diametro_ureter = st.number_input(
+                        f"Diámetro uréter {lado.lower()} (mm):",
+                        min_value=0.0,
+                        max_value=20.0,
+                        step=0.5,
+                        key=f"diametro_ureter_{lado.lower()}"
+                    )
+                    
+                    if diametro_ureter >= 6:
+                        st.warning(f"⚠️ Dilatación ureteral (≥6mm) en lado {lado.lower()}")
+                
+                with col2:
+                    hidronefrosis = st.selectbox(
+                        f"Hidronefrosis {lado.lower()}:",
+                        ["Ausente", "Leve", "Moderada", "Severa"],
+                        key=f"hidronefrosis_{lado.lower()}"
+                    )
                 
-                if diametro_ureter >= 6:
-                    st.warning(f"⚠️ Dilatación ureteral (≥6mm) en lado {lado.lower()}")
+                ureter_por_lado[lado.lower()] = {
+                    'diametro': diametro_ureter,
+                    'hidronefrosis': hidronefrosis
+                }
             
-            with col2:
-                hidronefrosis = st.selectbox(
-                    f"Hidronefrosis {lado.lower()}:",
-                    ["Ausente", "Leve", "Moderada", "Severa"],
-                    key=f"hidronefrosis_{lado.lower()}"
-                )
-        
-        tipo_compromiso = st.selectbox(
-            "Tipo de compromiso:",
-            ["Extrínseco", "Intrínseco", "Mixto"],
-            key="tipo_compromiso_ureter"
-        )
-        
-        descripcion_fu = st.text_area(
-            "Descripción de compromiso ureteral:",
-            key="descripcion_ureter"
-        )
-        
-        st.session_state.data['localizaciones_f']['ureter'] = {
-            'presente': True,
-            'lados': lado_ureter,
-            'tipo_compromiso': tipo_compromiso,
-            'descripcion': descripcion_fu
-        }
+            tipo_compromiso = st.selectbox(
+                "Tipo de compromiso:",
+                ["Extrínseco", "Intrínseco", "Mixto"],
+                key="tipo_compromiso_ureter"
+            )
+            
+            descripcion_fu = st.text_area(
+                "Descripción de compromiso ureteral:",
+                key="descripcion_ureter"
+            )
+            
+            st.session_state.data['localizaciones_f']['ureter'] = {
+                'presente': True,
+                'lados': lado_ureter,
+                'por_lado': ureter_por_lado,
+                'tipo_compromiso': tipo_compromiso,
+                'descripcion': descripcion_fu
+            }
+            
+            boton_aplicar()
     else:
         st.session_state.data['localizaciones_f']['ureter'] = {'presente': False}
     
@@ -1149,31 +1534,34 @@ with tabs[7]:
     )
     
     if intestino == "Sí":
-        localizacion_intestino = st.multiselect(
-            "Localización(es):",
-            ["Sigma (>16cm)", "Colon transverso", "Ciego", "Apéndice", "Intestino delgado"],
-            key="localizacion_intestino"
-        )
-        
-        dimension_intestino = st.number_input(
-            "Dimensión máxima de la lesión (cm):",
-            min_value=0.0,
-            max_value=15.0,
-            step=0.1,
-            key="dimension_intestino"
-        )
-        
-        descripcion_fi = st.text_area(
-            "Descripción de compromiso intestinal:",
-            key="descripcion_intestino"
-        )
-        
-        st.session_state.data['localizaciones_f']['intestino'] = {
-            'presente': True,
-            'localizaciones': localizacion_intestino,
-            'dimension': dimension_intestino,
-            'descripcion': descripcion_fi
-        }
+        with contenedor_captura("form_intestino"):
+            localizacion_intestino = st.multiselect(
+                "Localización(es):",
+                ["Sigma (>16cm)", "Colon transverso", "Ciego", "Apéndice", "Intestino delgado"],
+                key="localizacion_intestino"
+            )
+            
+            dimension_intestino = st.number_input(
+                "Dimensión máxima de la lesión (cm):",
+                min_value=0.0,
+                max_value=15.0,
+                step=0.1,
+                key="dimension_intestino"
+            )
+            
+            descripcion_fi = st.text_area(
+                "Descripción de compromiso intestinal:",
+                key="descripcion_intestino"
+            )
+            
+            st.session_state.data['localizaciones_f']['intestino'] = {
+                'presente': True,
+                'localizaciones': localizacion_intestino,
+                'dimension': dimension_intestino,
+                'descripcion': descripcion_fi
+            }
+            
+            boton_aplicar()
     else:
         st.session_state.data['localizaciones_f']['intestino'] = {'presente': False}
     
@@ -1189,488 +1577,44 @@ with tabs[7]:
     )
     
     if otras_localizaciones == "Sí":
+        # Los tipos elegidos definen qué descripciones se piden: quedan fuera del formulario
         tipos_otras = st.multiselect(
             "Seleccione localización(es):",
             ["Pared abdominal", "Diafragma", "Pulmón", "Nervio", "Cicatriz quirúrgica", "Ombligo", "Otras"],
             key="tipos_otras_localizaciones"
         )
         
-        for tipo in tipos_otras:
-            descripcion_otra = st.text_area(
-                f"Descripción de {tipo}:",
-                key=f"descripcion_otra_{tipo.replace(' ', '_')}"
-            )
-        
-        st.session_state.data['localizaciones_f']['otras'] = {
-            'presente': True,
-            'tipos': tipos_otras
-        }
+        with contenedor_captura("form_otras_localizaciones"):
+            descripciones_otras = {}
+            for tipo in tipos_otras:
+                descripciones_otras[tipo] = st.text_area(
+                    f"Descripción de {tipo}:",
+                    key=f"descripcion_otra_{tipo.replace(' ', '_')}"
+                )
+            
+            st.session_state.data['localizaciones_f']['otras'] = {
+                'presente': True,
+                'tipos': tipos_otras,
+                'descripciones': descripciones_otras
+            }
+            
+            boton_aplicar()
     else:
         st.session_state.data['localizaciones_f']['otras'] = {'presente': False}
+    
+    vista_previa_codigo()
+
+with tabs[7]:
+    pestana_localizaciones_f()
 
 # ============= PESTAÑA 9: GENERAR REPORTE =============
-with tabs[8]:
+@st.fragment
+@medido('pestana_generar_reporte')
+@perfilado_al_generar
+def pestana_generar_reporte():
+    """Contenido de la pestaña Generar reporte"""
     st.markdown('<div class="section-header"><h2>📋 Generar Reporte Final</h2></div>', unsafe_allow_html=True)
     
-    # Función para generar código #Enzian
-    def generar_codigo_enzian():
-        codigo = "#Enzian(u) "
-        componentes = []
-        
-        # Peritoneo (P)
-        if st.session_state.data['peritoneo'].get('estado') == 'anormal':
-            clasificacion = st.session_state.data['peritoneo'].get('clasificacion', 'P1')
-            componentes.append(clasificacion.split()[0])
-        
-        # Ovarios (O)
-        ovario_izq = st.session_state.data['ovarios']['izquierdo']
-        ovario_der = st.session_state.data['ovarios']['derecho']
-        
-        if ovario_izq.get('estado') == 'anormal' or ovario_der.get('estado') == 'anormal':
-            clase_izq = "0"
-            clase_der = "0"
-            
-            if ovario_izq.get('estado') == 'anormal':
-                clase_izq = ovario_izq.get('clasificacion', 'O1')[1]
-            elif ovario_izq.get('estado') == 'no_visualizado':
-                clase_izq = "x"
-                
-            if ovario_der.get('estado') == 'anormal':
-                clase_der = ovario_der.get('clasificacion', 'O1')[1]
-            elif ovario_der.get('estado') == 'no_visualizado':
-                clase_der = "x"
-                
-            componentes.append(f"O{clase_izq}/{clase_der}")
-        
-        # Tubos (T)
-        tubo_izq = st.session_state.data['tubos']['izquierdo']
-        tubo_der = st.session_state.data['tubos']['derecho']
-        
-        if tubo_izq.get('estado') == 'anormal' or tubo_der.get('estado') == 'anormal':
-            clase_izq = "0"
-            clase_der = "0"
-            
-            if tubo_izq.get('estado') == 'anormal':
-                clase_texto = tubo_izq.get('clasificacion', 'T1')
-                clase_izq = clase_texto[1]
-                
-            if tubo_der.get('estado') == 'anormal':
-                clase_texto = tubo_der.get('clasificacion', 'T1')
-                clase_der = clase_texto[1]
-                
-            componentes.append(f"T{clase_izq}/{clase_der}")
-        
-        # Compartimento A
-        if st.session_state.data['compartimento_a'].get('estado') == 'anormal':
-            clase_a = st.session_state.data['compartimento_a'].get('clasificacion', 'A1')
-            componentes.append(clase_a.split()[0])
-        
-        # Compartimento B
-        lsu_izq = st.session_state.data['compartimento_b']['izquierdo']
-        lsu_der = st.session_state.data['compartimento_b']['derecho']
-        
-        if lsu_izq.get('estado') == 'anormal' or lsu_der.get('estado') == 'anormal':
-            clase_izq = "0"
-            clase_der = "0"
-            
-            if lsu_izq.get('estado') == 'anormal':
-                clase_izq = lsu_izq.get('clasificacion', 'B1')[1]
-                
-            if lsu_der.get('estado') == 'anormal':
-                clase_der = lsu_der.get('clasificacion', 'B1')[1]
-                
-            componentes.append(f"B{clase_izq}/{clase_der}")
-        
-        # Compartimento C
-        if st.session_state.data['compartimento_c'].get('estado') == 'anormal':
-            clase_c = st.session_state.data['compartimento_c'].get('clasificacion', 'C1')
-            componentes.append(clase_c.split()[0])
-        
-        # Localizaciones F
-        loc_f = st.session_state.data['localizaciones_f']
-        
-        if loc_f.get('adenomiosis', {}).get('presente'):
-            componentes.append("FA")
-            
-        if loc_f.get('vejiga', {}).get('presente'):
-            componentes.append("FB")
-            
-        if loc_f.get('ureter', {}).get('presente'):
-            lados = loc_f['ureter'].get('lados', [])
-            for lado in lados:
-                inicial = 'r' if lado == 'Derecho' else 'l'
-                componentes.append(f"FU({inicial})")
-                
-        if loc_f.get('intestino', {}).get('presente'):
-            locs = loc_f['intestino'].get('localizaciones', [])
-            for loc in locs:
-                if 'Sigma' in loc:
-                    componentes.append("FI(Sigma)")
-                elif 'Apéndice' in loc:
-                    componentes.append("FI(Apéndice)")
-                else:
-                    componentes.append(f"FI({loc})")
-                    
-        if loc_f.get('otras', {}).get('presente'):
-            tipos = loc_f['otras'].get('tipos', [])
-            for tipo in tipos:
-                componentes.append(f"F({tipo})")
-        
-        codigo += ", ".join(componentes) if componentes else "Sin hallazgos de endometriosis"
-        
-        return codigo
-    
-    # Función para generar reporte en Word
-    def generar_reporte_word():
-        doc = Document()
-        
-        # Configurar estilos
-        style = doc.styles['Normal']
-        style.font.name = 'Arial'
-        style.font.size = Pt(11)
-        
-        # Encabezado
-        header = doc.add_heading('REPORTE ULTRASONOGRÁFICO ASOCIACIÓN COSTARRICENSE GINECOLOGIA', 0)
-        header.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        
-        subheader = doc.add_heading('Evaluación de Endometriosis - Clasificación #Enzian', level=2)
-        subheader.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        
-        doc.add_paragraph()
-        
-        # Datos del paciente
-        doc.add_heading('DATOS DEL PACIENTE', level=1)
-        paciente = st.session_state.data['paciente']
-        
-        tabla_paciente = doc.add_table(rows=5, cols=2)
-        tabla_paciente.style = 'Light Grid Accent 1'
-        
-        datos = [
-            ('Nombre:', paciente.get('nombre', 'N/A')),
-            ('Identificación:', paciente.get('cedula', 'N/A')),
-            ('Edad:', f"{paciente.get('edad', 'N/A')} años"),
-            ('Fecha del estudio:', str(paciente.get('fecha', 'N/A'))),
-            ('Médico solicitante:', paciente.get('medico', 'N/A'))
-        ]
-        
-        for i, (campo, valor) in enumerate(datos):
-            tabla_paciente.rows[i].cells[0].text = campo
-            tabla_paciente.rows[i].cells[1].text = str(valor)
-        
-        if paciente.get('indicacion'):
-            doc.add_paragraph()
-            p = doc.add_paragraph()
-            p.add_run('Indicación: ').bold = True
-            p.add_run(paciente['indicacion'])
-        
-        doc.add_page_break()
-        
-        # Código #Enzian
-        doc.add_heading('CLASIFICACIÓN #ENZIAN', level=1)
-        codigo = generar_codigo_enzian()
-        p = doc.add_paragraph()
-        p.add_run('Código: ').bold = True
-        run = p.add_run(codigo)
-        run.font.size = Pt(14)
-        run.font.color.rgb = RGBColor(128, 0, 128)
-        
-        doc.add_paragraph()
-        
-        # HALLAZGOS DETALLADOS
-        doc.add_heading('HALLAZGOS DETALLADOS', level=1)
-        
-        # Peritoneo
-        peritoneo = st.session_state.data['peritoneo']
-        doc.add_heading('Peritoneo (P)', level=2)
-        
-        if peritoneo.get('estado') == 'anormal':
-            p = doc.add_paragraph()
-            p.add_run('Se identifican lesiones peritoneales superficiales. ')
-            p.add_run(f"Clasificación: {peritoneo.get('clasificacion', 'N/A')}. ")
-            
-            if peritoneo.get('localizaciones'):
-                p.add_run(f"Localizaciones: {', '.join(peritoneo['localizaciones'])}. ")
-            
-            if peritoneo.get('descripcion'):
-                p.add_run(peritoneo['descripcion'])
-        else:
-            doc.add_paragraph('Sin evidencia de lesiones peritoneales superficiales.')
-        
-        # Ovarios
-        doc.add_heading('Ovarios (O)', level=2)
-        
-        # Ovario derecho
-        ovario_der = st.session_state.data['ovarios']['derecho']
-        p = doc.add_paragraph()
-        p.add_run('Ovario derecho: ').bold = True
-        
-        if ovario_der.get('estado') == 'anormal':
-            p.add_run(f"Endometrioma de {ovario_der.get('diametro', 0)}cm. ")
-            p.add_run(f"Clasificación: {ovario_der.get('clasificacion', 'N/A')}. ")
-            p.add_run(f"Estructura: {ovario_der.get('estructura', 'N/A')}. ")
-            p.add_run(f"Contenido: {ovario_der.get('contenido', 'N/A')}. ")
-            p.add_run(f"Vascularización: {ovario_der.get('vascularizacion', 'N/A')}. ")
-            
-            if ovario_der.get('adherencias'):
-                p.add_run('Signos de adherencias a estructuras adyacentes. ')
-                
-            if ovario_der.get('descripcion'):
-                p.add_run(ovario_der['descripcion'])
-        elif ovario_der.get('estado') == 'no_visualizado':
-            p.add_run('No visualizado.')
-        else:
-            p.add_run('Sin alteraciones evidentes.')
-        
-        # Ovario izquierdo
-        ovario_izq = st.session_state.data['ovarios']['izquierdo']
-        p = doc.add_paragraph()
-        p.add_run('Ovario izquierdo: ').bold = True
-        
-        if ovario_izq.get('estado') == 'anormal':
-            p.add_run(f"Endometrioma de {ovario_izq.get('diametro', 0)}cm. ")
-            p.add_run(f"Clasificación: {ovario_izq.get('clasificacion', 'N/A')}. ")
-            p.add_run(f"Estructura: {ovario_izq.get('estructura', 'N/A')}. ")
-            p.add_run(f"Contenido: {ovario_izq.get('contenido', 'N/A')}. ")
-            p.add_run(f"Vascularización: {ovario_izq.get('vascularizacion', 'N/A')}. ")
-            
-            if ovario_izq.get('adherencias'):
-                p.add_run('Signos de adherencias a estructuras adyacentes. ')
-                
-            if ovario_izq.get('descripcion'):
-                p.add_run(ovario_izq['descripcion'])
-        elif ovario_izq.get('estado') == 'no_visualizado':
-            p.add_run('No visualizado.')
-        else:
-            p.add_run('Sin alteraciones evidentes.')
-        
-        # Condición tubo-ovárica
-        doc.add_heading('Condición Tubo-Ovárica (T)', level=2)
-        
-        tubo_der = st.session_state.data['tubos']['derecho']
-        p = doc.add_paragraph()
-        p.add_run('Lado derecho: ').bold = True
-        
-        if tubo_der.get('estado') == 'anormal':
-            p.add_run(f"{tubo_der.get('clasificacion', 'N/A')}. ")
-            p.add_run(f"Sliding sign: {tubo_der.get('sliding_sign', 'N/A')}. ")
-            
-            if tubo_der.get('permeabilidad') != 'No evaluada':
-                p.add_run(f"Permeabilidad: {tubo_der.get('permeabilidad', 'N/A')}. ")
-                
-            if tubo_der.get('descripcion'):
-                p.add_run(tubo_der['descripcion'])
-        else:
-            p.add_run('Movilidad preservada, sin adherencias evidentes.')
-        
-        tubo_izq = st.session_state.data['tubos']['izquierdo']
-        p = doc.add_paragraph()
-        p.add_run('Lado izquierdo: ').bold = True
-        
-        if tubo_izq.get('estado') == 'anormal':
-            p.add_run(f"{tubo_izq.get('clasificacion', 'N/A')}. ")
-            p.add_run(f"Sliding sign: {tubo_izq.get('sliding_sign', 'N/A')}. ")
-            
-            if tubo_izq.get('permeabilidad') != 'No evaluada':
-                p.add_run(f"Permeabilidad: {tubo_izq.get('permeabilidad', 'N/A')}. ")
-                
-            if tubo_izq.get('descripcion'):
-                p.add_run(tubo_izq['descripcion'])
-        else:
-            p.add_run('Movilidad preservada, sin adherencias evidentes.')
-        
-        # Compartimento A
-        doc.add_heading('Compartimento A (Vagina/Espacio Rectovaginal)', level=2)
-        comp_a = st.session_state.data['compartimento_a']
-        
-        if comp_a.get('estado') == 'anormal':
-            p = doc.add_paragraph()
-            p.add_run(f"Lesión de endometriosis profunda de {comp_a.get('diametro', 0)}cm. ")
-            p.add_run(f"Clasificación: {comp_a.get('clasificacion', 'N/A')}. ")
-            
-            if comp_a.get('localizacion'):
-                p.add_run(f"Localización: {', '.join(comp_a['localizacion'])}. ")
-                
-            p.add_run(f"Ecogenicidad: {comp_a.get('ecogenicidad', 'N/A')}. ")
-            p.add_run(f"Contornos: {comp_a.get('contornos', 'N/A')}. ")
-            
-            if comp_a.get('descripcion'):
-                p.add_run(comp_a['descripcion'])
-        else:
-            doc.add_paragraph('Sin lesiones de endometriosis profunda en vagina ni espacio rectovaginal.')
-        
-        # Compartimento B
-        doc.add_heading('Compartimento B (Ligamentos Uterosacros)', level=2)
-        
-        lsu_der = st.session_state.data['compartimento_b']['derecho']
-        p = doc.add_paragraph()
-        p.add_run('Ligamento uterosacro derecho: ').bold = True
-        
-        if lsu_der.get('estado') == 'anormal':
-            p.add_run(f"Lesión de {lsu_der.get('diametro_max', 0)}cm ")
-            p.add_run(f"(AP: {lsu_der.get('dim_ap', 0)}cm, CC: {lsu_der.get('dim_cc', 0)}cm). ")
-            p.add_run(f"Clasificación: {lsu_der.get('clasificacion', 'N/A')}. ")
-            p.add_run(f"Sliding sign: {lsu_der.get('sliding_sign', 'N/A')}. ")
-            
-            if lsu_der.get('descripcion'):
-                p.add_run(lsu_der['descripcion'])
-        else:
-            p.add_run('Sin alteraciones.')
-        
-        lsu_izq = st.session_state.data['compartimento_b']['izquierdo']
-        p = doc.add_paragraph()
-        p.add_run('Ligamento uterosacro izquierdo: ').bold = True
-        
-        if lsu_izq.get('estado') == 'anormal':
-            p.add_run(f"Lesión de {lsu_izq.get('diametro_max', 0)}cm ")
-            p.add_run(f"(AP: {lsu_izq.get('dim_ap', 0)}cm, CC: {lsu_izq.get('dim_cc', 0)}cm). ")
-            p.add_run(f"Clasificación: {lsu_izq.get('clasificacion', 'N/A')}. ")
-            p.add_run(f"Sliding sign: {lsu_izq.get('sliding_sign', 'N/A')}. ")
-            
-            if lsu_izq.get('descripcion'):
-                p.add_run(lsu_izq['descripcion'])
-        else:
-            p.add_run('Sin alteraciones.')
-        
-        # Compartimento C
-        doc.add_heading('Compartimento C (Recto)', level=2)
-        comp_c = st.session_state.data['compartimento_c']
-        
-        if comp_c.get('estado') == 'anormal':
-            p = doc.add_paragraph()
-            p.add_run(f"Lesión de endometriosis rectal de {comp_c.get('longitud', 0)}cm de longitud. ")
-            p.add_run(f"Clasificación: {comp_c.get('clasificacion', 'N/A')}. ")
-            p.add_run(f"Distancia desde margen anal: {comp_c.get('distancia_anal', 0)}cm. ")
-            p.add_run(f"Profundidad de infiltración: {comp_c.get('profundidad', 'N/A')}. ")
-            p.add_run(f"Circunferencia afectada: {comp_c.get('circunferencia', 0)}%. ")
-            
-            if comp_c.get('estenosis'):
-                p.add_run('Signos de estenosis presentes. ')
-                
-            p.add_run(f"Sliding sign: {comp_c.get('sliding_sign', 'N/A')}. ")
-            
-            if comp_c.get('descripcion'):
-                p.add_run(comp_c['descripcion'])
-        else:
-            doc.add_paragraph('Sin evidencia de endometriosis rectal.')
-        
-        # Localizaciones F
-        doc.add_heading('Localizaciones Extragenitales (F)', level=2)
-        loc_f = st.session_state.data['localizaciones_f']
-        
-        # Adenomiosis
-        if loc_f.get('adenomiosis', {}).get('presente'):
-            p = doc.add_paragraph()
-            p.add_run('Adenomiosis (FA): ').bold = True
-            
-            criterios = loc_f['adenomiosis'].get('criterios_musa', [])
-            if criterios:
-                p.add_run(f"Criterios MUSA: {', '.join(criterios)}. ")
-                
-            if loc_f['adenomiosis'].get('descripcion'):
-                p.add_run(loc_f['adenomiosis']['descripcion'])
-        
-        # Vejiga
-        if loc_f.get('vejiga', {}).get('presente'):
-            p = doc.add_paragraph()
-            p.add_run('Vejiga (FB): ').bold = True
-            
-            vejiga_data = loc_f['vejiga']
-            p.add_run(f"Lesión en {vejiga_data.get('localizacion', 'N/A')}. ")
-            p.add_run(f"Profundidad: {vejiga_data.get('profundidad', 'N/A')}. ")
-            p.add_run(f"Dimensión: {vejiga_data.get('dimension', 0)}cm. ")
-            
-            if vejiga_data.get('descripcion'):
-                p.add_run(vejiga_data['descripcion'])
-        
-        # Uréter
-        if loc_f.get('ureter', {}).get('presente'):
-            p = doc.add_paragraph()
-            p.add_run('Uréter (FU): ').bold = True
-            
-            ureter_data = loc_f['ureter']
-            lados = ureter_data.get('lados', [])
-            p.add_run(f"Compromiso ureteral {'bilateral' if len(lados) == 2 else lados[0].lower()}. ")
-            p.add_run(f"Tipo: {ureter_data.get('tipo_compromiso', 'N/A')}. ")
-            
-            if ureter_data.get('descripcion'):
-                p.add_run(ureter_data['descripcion'])
-        
-        # Intestino
-        if loc_f.get('intestino', {}).get('presente'):
-            p = doc.add_paragraph()
-            p.add_run('Intestino (FI): ').bold = True
-            
-            intestino_data = loc_f['intestino']
-            locs = intestino_data.get('localizaciones', [])
-            p.add_run(f"Compromiso intestinal en: {', '.join(locs)}. ")
-            p.add_run(f"Dimensión: {intestino_data.get('dimension', 0)}cm. ")
-            
-            if intestino_data.get('descripcion'):
-                p.add_run(intestino_data['descripcion'])
-        
-        # Otras localizaciones
-        if loc_f.get('otras', {}).get('presente'):
-            p = doc.add_paragraph()
-            p.add_run('Otras localizaciones: ').bold = True
-            
-            tipos = loc_f['otras'].get('tipos', [])
-            p.add_run(f"{', '.join(tipos)}.")
-        
-        # Si no hay localizaciones F
-        tiene_loc_f = any([
-            loc_f.get('adenomiosis', {}).get('presente'),
-            loc_f.get('vejiga', {}).get('presente'),
-            loc_f.get('ureter', {}).get('presente'),
-            loc_f.get('intestino', {}).get('presente'),
-            loc_f.get('otras', {}).get('presente')
-        ])
-        
-        if not tiene_loc_f:
-            doc.add_paragraph('Sin compromiso de localizaciones extragenitales.')
-        
-        doc.add_page_break()
-        
-        # CONCLUSIONES
-        doc.add_heading('CONCLUSIONES', level=1)
-        
-        p = doc.add_paragraph()
-        p.add_run('Hallazgos ultrasonográficos compatibles con endometriosis según clasificación #Enzian:')
-        
-        doc.add_paragraph()
-        p = doc.add_paragraph()
-        run = p.add_run(codigo)
-        run.bold = True
-        run.font.size = Pt(12)
-        run.font.color.rgb = RGBColor(128, 0, 128)
-        
-        doc.add_paragraph()
-        
-        # Recomendaciones
-        doc.add_heading('RECOMENDACIONES', level=2)
-        doc.add_paragraph('1. Correlación clínica con sintomatología de la paciente.')
-        doc.add_paragraph('2. Valoración por especialista en endometriosis.')
-        doc.add_paragraph('3. Considerar estudios complementarios según criterio clínico.')
-        doc.add_paragraph('4. Planificación quirúrgica multidisciplinaria si está indicada.')
-        
-        doc.add_paragraph()
-        doc.add_paragraph()
-        
-        # Firma
-        p = doc.add_paragraph()
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        p.add_run('_' * 50)
-        
-        p = doc.add_paragraph()
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        p.add_run('Médico Ginecólogo')
-        
-        # Guardar en memoria
-        buffer = io.BytesIO()
-        doc.save(buffer)
-        buffer.seek(0)
-        
-        return buffer
-    
     # Sección de guardar/cargar borradores
     st.markdown("### 💾 Gestión de Borradores")
     
@@ -1680,6 +1624,7 @@ with tabs[8]:
         st.markdown("#### Guardar Borrador")
         if st.button("💾 Guardar Borrador Actual (JSON)", use_container_width=True, type="secondary"):
             data_json, nombre = guardar_borrador()
+            obtener_almacen().guardar(st.session_state.data, 'borrador')
             st.download_button(
                 label="⬇️ Descargar Borrador JSON",
                 data=data_json,
@@ -1688,7 +1633,7 @@ with tabs[8]:
                 use_container_width=True,
                 key="download_borrador"
             )
-            st.success("✅ Borrador preparado para descarga")
+            st.success("✅ Borrador guardado en el almacén local y preparado para descarga")
     
     with col2:
         st.markdown("#### Cargar Borrador")
@@ -1703,17 +1648,74 @@ with tabs[8]:
             exito, mensaje = cargar_borrador(uploaded_file)
             if exito:
                 st.success(mensaje)
-                if st.button("🔄 Actualizar Vista", key="actualizar_borrador"):
-                    st.rerun()
             else:
                 st.error(mensaje)
+        else:
+            # Al quitar el archivo, volver a subirlo descarta las ediciones y lo carga de nuevo
+            st.session_state.pop('borrador_cargado', None)
+    
+    # Estudios previos guardados en el almacén local
+    with st.expander("🔎 Estudios Previos de la Paciente"):
+        cedula = st.text_input(
+            "Cédula",
+            value=st.session_state.data['paciente'].get('cedula', '')
+        )
+        estudios = obtener_almacen().buscar_por_cedula(cedula.strip()) if cedula.strip() else []
+    
+        if not cedula.strip():
+            st.info("Ingrese una cédula para buscar estudios previos")
+        elif not estudios:
+            st.info("No hay estudios guardados para esta cédula")
+        else:
+            st.dataframe(
+                [
+                    {
+                        'Fecha estudio': e['fecha_estudio'],
+                        'Tipo': e['tipo'],
+                        'Código #Enzian': e['codigo'],
+                        'Médico': e['medico'],
+                        'Guardado': e['creado'],
+                    }
+                    for e in estudios
+                ],
+                use_container_width=True,
+                hide_index=True
+            )
+    
+            opciones = {f"{e['fecha_estudio'] or 'sin fecha'} · {e['tipo']} · {e['codigo']} (#{e['id']})": e for e in estudios}
+            elegido = opciones[st.selectbox("Estudio", list(opciones), key="estudio_previo")]
+            acciones_registro(elegido['id'], "estudio")
+    
+    # Búsqueda por texto libre en descripciones e indicaciones
+    with st.expander("🔍 Búsqueda en Descripciones de Reportes"):
+        texto_busqueda = st.text_input(
+            "Buscar",
+            key="texto_busqueda",
+            placeholder='nódulo torus · "nódulo en torus" · umbil*',
+            help="Sin distinguir tildes ni mayúsculas. Use comillas para frases exactas y * al final para prefijos"
+        )
+        resultados = obtener_almacen().buscar_texto(texto_busqueda) if texto_busqueda.strip() else []
+        
+        if texto_busqueda.strip() and not resultados:
+            st.info("Sin resultados")
+        elif resultados:
+            for r in resultados:
+                st.markdown(
+                    f"**{r['fecha_estudio'] or 'sin fecha'}** · {r['nombre'] or 'sin nombre'} · "
+                    f"{r['tipo']} · `{r['codigo']}`  \n{r['fragmento']}"
+                )
+            
+            opciones = {f"{r['fecha_estudio'] or 'sin fecha'} · {r['nombre'] or 'sin nombre'} · {r['codigo']} (#{r['id']})": r for r in resultados}
+            elegido = opciones[st.selectbox("Resultado", list(opciones), key="resultado_busqueda")]
+            acciones_registro(elegido['id'], "busqueda")
     
     st.markdown("---")
     
     # Vista previa del reporte
     st.markdown("### 📊 Vista Previa del Código #Enzian")
     
-    codigo_enzian = generar_codigo_enzian()
+    valores = derivados()
+    codigo_enzian = valores['codigo']
     
     st.markdown(f"""
     <div style="background-color: #f0f2f6; padding: 20px; border-radius: 10px; border-left: 5px solid #667eea;">
@@ -1725,55 +1727,23 @@ with tabs[8]:
     st.markdown("---")
     
     # Validación de campos obligatorios
-    st.markdown("### ✅ Validación de Datos")
-    
-    campos_obligatorios = []
-    
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        if not st.session_state.data['paciente'].get('nombre'):
-            st.error("❌ Nombre del paciente")
-            campos_obligatorios.append("Nombre del paciente")
-        else:
-            st.success("✅ Nombre del paciente")
-    
-    with col2:
-        if not st.session_state.data['paciente'].get('cedula'):
-            st.error("❌ Número de identificación")
-            campos_obligatorios.append("Número de identificación")
-        else:
-            st.success("✅ Número de identificación")
-    
-    with col3:
-        if not st.session_state.data['paciente'].get('fecha'):
-            st.error("❌ Fecha del estudio")
-            campos_obligatorios.append("Fecha del estudio")
+    with medir('validacion'):
+        st.markdown("### ✅ Validación de Datos")
+        
+        campos_obligatorios = valores['campos_obligatorios']
+        
+        for columna, (_, etiqueta) in zip(st.columns(3), CAMPOS_OBLIGATORIOS):
+            with columna:
+                if etiqueta in campos_obligatorios:
+                    st.error(f"❌ {etiqueta}")
+                else:
+                    st.success(f"✅ {etiqueta}")
+        
+        # Verificar que al menos un compartimento tenga datos
+        if not valores['tiene_hallazgos']:
+            st.warning("⚠️ No se han registrado hallazgos anormales en ningún compartimento")
         else:
-            st.success("✅ Fecha del estudio")
-    
-    # Verificar que al menos un compartimento tenga datos
-    tiene_hallazgos = False
-    
-    if st.session_state.data['peritoneo'].get('estado') == 'anormal':
-        tiene_hallazgos = True
-    if any(ov.get('estado') == 'anormal' for ov in st.session_state.data['ovarios'].values()):
-        tiene_hallazgos = True
-    if any(tb.get('estado') == 'anormal' for tb in st.session_state.data['tubos'].values()):
-        tiene_hallazgos = True
-    if st.session_state.data['compartimento_a'].get('estado') == 'anormal':
-        tiene_hallazgos = True
-    if any(lsu.get('estado') == 'anormal' for lsu in st.session_state.data['compartimento_b'].values()):
-        tiene_hallazgos = True
-    if st.session_state.data['compartimento_c'].get('estado') == 'anormal':
-        tiene_hallazgos = True
-    if any(loc.get('presente') for loc in st.session_state.data['localizaciones_f'].values() if isinstance(loc, dict)):
-        tiene_hallazgos = True
-    
-    if not tiene_hallazgos:
-        st.warning("⚠️ No se han registrado hallazgos anormales en ningún compartimento")
-    else:
-        st.success("✅ Hallazgos registrados")
+            st.success("✅ Hallazgos registrados")
     
     st.markdown("---")
     
@@ -1787,23 +1757,44 @@ with tabs[8]:
                 st.write(f"• {campo}")
         else:
             if st.button("📄 GENERAR REPORTE EN WORD", type="primary", use_container_width=True, key="btn_generar_reporte"):
-                with st.spinner('⏳ Generando reporte profesional...'):
-                    buffer = generar_reporte_word()
-                    
-                    nombre_archivo = f"Reporte_Endometriosis_{st.session_state.data['paciente']['nombre'].replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M')}.docx"
-                    
-                    st.success("✅ ¡Reporte generado exitosamente!")
-                    
-                    st.download_button(
-                        label="⬇️ DESCARGAR REPORTE WORD",
-                        data=buffer,
-                        file_name=nombre_archivo,
-                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                        use_container_width=True,
-                        key="download_reporte"
-                    )
-                    
-                    st.session_state['reporte_generado'] = True
+                # El DOCX se genera en segundo plano sobre una copia de los datos actuales
+                datos = copy.deepcopy(st.session_state.data)
+                clave = clave_docx(datos, motor_docx(), docx_determinista())
+                trabajo = {
+                    'id': None,
+                    'clave': clave,
+                    'nombre_archivo': nombre_docx(datos, docx_determinista()),
+                    'mostrado': False
+                }
+                generado = st.session_state.get('docx_generado')
+                if generado is not None and generado['clave'] == clave:
+                    # Sin cambios desde el último reporte: se entrega el mismo documento
+                    obtener_metricas().contar('enzian_reportes_total', resultado='cache')
+                    st.session_state['trabajo_reporte'] = trabajo
+                else:
+                    almacen = obtener_almacen()
+                    perfilador = obtener_perfilador()
+                    turno = perfilador.tomar()
+                    try:
+                        trabajo['id'] = obtener_cola().enviar(
+                            generar_docx_medido,
+                            obtener_metricas(),
+                            datos,
+                            perfilador if turno else None,
+                            motor_docx(),
+                            docx_determinista(),
+                            al_terminar=lambda docx: almacen.guardar(datos, 'final', docx=docx)
+                        )
+                        st.session_state['trabajo_reporte'] = trabajo
+                        st.session_state['turno_perfilado'] = turno
+                    except ColaLlena as e:
+                        if turno:
+                            perfilador.devolver()
+                        st.warning(f"⏳ {e}")
+            
+            # Consulta el estado cada segundo mientras el reporte está en cola
+            trabajo = st.session_state.get('trabajo_reporte')
+            st.fragment(run_every=1.0 if trabajo and not trabajo['mostrado'] else None)(estado_trabajo_reporte)()
     
     # Sección de nuevo reporte después de generar
     if st.session_state.get('reporte_generado', False):
@@ -1838,127 +1829,48 @@ with tabs[8]:
     st.markdown("---")
     
     # Resumen de hallazgos
-    st.markdown("### 📋 Resumen de Hallazgos")
-    
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.markdown("#### Endometriosis Superficial")
-        if st.session_state.data['peritoneo'].get('estado') == 'anormal':
-            st.info(f"✓ Peritoneo: {st.session_state.data['peritoneo'].get('clasificacion', 'N/A')}")
-        else:
-            st.write("Sin hallazgos")
-    
-    with col2:
-        st.markdown("#### Endometriosis Ovárica")
-        ovario_izq = st.session_state.data['ovarios']['izquierdo']
-        ovario_der = st.session_state.data['ovarios']['derecho']
-        
-        if ovario_izq.get('estado') == 'anormal':
-            st.info(f"✓ Izquierdo: {ovario_izq.get('clasificacion', 'N/A')}")
-        if ovario_der.get('estado') == 'anormal':
-            st.info(f"✓ Derecho: {ovario_der.get('clasificacion', 'N/A')}")
-        if ovario_izq.get('estado') != 'anormal' and ovario_der.get('estado') != 'anormal':
-            st.write("Sin hallazgos")
-    
-    with col3:
-        st.markdown("#### Adherencias")
-        tubo_izq = st.session_state.data['tubos']['izquierdo']
-        tubo_der = st.session_state.data['tubos']['derecho']
-        
-        if tubo_izq.get('estado') == 'anormal':
-            clase = tubo_izq.get('clasificacion', 'N/A').split()[0]
-            st.info(f"✓ Izquierdo: {clase}")
-        if tubo_der.get('estado') == 'anormal':
-            clase = tubo_der.get('clasificacion', 'N/A').split()[0]
-            st.info(f"✓ Derecho: {clase}")
-        if tubo_izq.get('estado') != 'anormal' and tubo_der.get('estado') != 'anormal':
-            st.write("Sin hallazgos")
-    
-    st.markdown("---")
-    
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.markdown("#### Endometriosis Profunda")
-        hallazgos_de = []
+    with medir('resumen_hallazgos'):
+        st.markdown("### 📋 Resumen de Hallazgos")
         
-        if st.session_state.data['compartimento_a'].get('estado') == 'anormal':
-            hallazgos_de.append(f"✓ Compartimento A: {st.session_state.data['compartimento_a'].get('clasificacion', 'N/A')}")
-        
-        lsu_izq = st.session_state.data['compartimento_b']['izquierdo']
-        lsu_der = st.session_state.data['compartimento_b']['derecho']
-        
-        if lsu_izq.get('estado') == 'anormal' or lsu_der.get('estado') == 'anormal':
-            clase_izq = lsu_izq.get('clasificacion', 'B0')[1] if lsu_izq.get('estado') == 'anormal' else '0'
-            clase_der = lsu_der.get('clasificacion', 'B0')[1] if lsu_der.get('estado') == 'anormal' else '0'
-            hallazgos_de.append(f"✓ Compartimento B: B{clase_izq}/{clase_der}")
-        
-        if st.session_state.data['compartimento_c'].get('estado') == 'anormal':
-            hallazgos_de.append(f"✓ Compartimento C: {st.session_state.data['compartimento_c'].get('clasificacion', 'N/A')}")
-        
-        if hallazgos_de:
-            for hallazgo in hallazgos_de:
-                st.info(hallazgo)
-        else:
-            st.write("Sin hallazgos")
-    
-    with col2:
-        st.markdown("#### Localizaciones Asociadas")
-        loc_f = st.session_state.data['localizaciones_f']
-        hallazgos_f = []
-        
-        if loc_f.get('adenomiosis', {}).get('presente'):
-            hallazgos_f.append("✓ Adenomiosis (FA)")
-        if loc_f.get('vejiga', {}).get('presente'):
-            hallazgos_f.append("✓ Vejiga (FB)")
-        if loc_f.get('ureter', {}).get('presente'):
-            lados = loc_f['ureter'].get('lados', [])
-            hallazgos_f.append(f"✓ Uréter: {', '.join(lados)}")
-        if loc_f.get('intestino', {}).get('presente'):
-            hallazgos_f.append("✓ Intestino (FI)")
-        if loc_f.get('otras', {}).get('presente'):
-            hallazgos_f.append("✓ Otras localizaciones")
-        
-        if hallazgos_f:
-            for hallazgo in hallazgos_f:
-                st.info(hallazgo)
-        else:
-            st.write("Sin hallazgos")
-    
-    with col3:
-        st.markdown("#### Alertas Clínicas")
-        alertas = []
-        
-        # Alerta por hidronefrosis
-        if loc_f.get('ureter', {}).get('presente'):
-            alertas.append("⚠️ Compromiso ureteral - Valorar función renal")
-        
-        # Alerta por estenosis rectal
-        if st.session_state.data['compartimento_c'].get('estenosis'):
-            alertas.append("⚠️ Estenosis rectal presente")
-        
-        # Alerta por endometriomas grandes
-        if ovario_izq.get('estado') == 'anormal' and ovario_izq.get('diametro', 0) > 7:
-            alertas.append("⚠️ Endometrioma izquierdo >7cm")
-        if ovario_der.get('estado') == 'anormal' and ovario_der.get('diametro', 0) > 7:
-            alertas.append("⚠️ Endometrioma derecho >7cm")
-        
-        # Alerta por enfermedad extensa
-        if st.session_state.data['compartimento_a'].get('clasificacion') in ['A3 (>3 cm)', 'A3']:
-            alertas.append("⚠️ Endometriosis profunda extensa (A3)")
-        
-        # Alerta por compromiso intestinal múltiple
-        if loc_f.get('intestino', {}).get('presente'):
-            locs = loc_f['intestino'].get('localizaciones', [])
-            if len(locs) > 1:
-                alertas.append("⚠️ Compromiso intestinal múltiple")
+        resumen = valores['resumen']
+        filas = [
+            (("Endometriosis Superficial", 'superficial'), ("Endometriosis Ovárica", 'ovarica'), ("Adherencias", 'adherencias')),
+            (("Endometriosis Profunda", 'profunda'), ("Localizaciones Asociadas", 'asociadas')),
+        ]
         
-        if alertas:
-            for alerta in alertas:
-                st.warning(alerta)
-        else:
-            st.success("✅ Sin alertas críticas")
+        for i, fila in enumerate(filas):
+            if i:
+                st.markdown("---")
+            columnas = st.columns(3)
+            for columna, (titulo, clave) in zip(columnas, fila):
+                with columna:
+                    st.markdown(f"#### {titulo}")
+                    for hallazgo in resumen[clave]:
+                        st.info(hallazgo)
+                    if not resumen[clave]:
+                        st.write("Sin hallazgos")
+        
+        with columnas[2]:
+            st.markdown("#### Alertas Clínicas")
+            alertas = valores['alertas']
+            
+            if alertas:
+                for alerta in alertas:
+                    st.warning(alerta)
+            else:
+                st.success("✅ Sin alertas críticas")
+
+with tabs[8]:
+    pestana_generar_reporte()
+
+# Tiempo total de la ejecución completa, sin el panel de desarrollo ni el pie
+obtener_metricas().registrar(
+    'ejecucion_completa', time.perf_counter() - inicio_ejecucion, st.session_state.setdefault('tiempos_secciones', {})
+)
+publicar_metricas()
+
+if modo_desarrollo():
+    panel_desarrollo()
 
 # Footer
 st.markdown("---")
@@ -0,0 +1,49 @@
+"""Utilidades compartidas por las pruebas"""
+import json
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+APLICACION = str(__import__('pathlib').Path(__file__).resolve().parent.parent / 'reporte_enzian.py')
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """AppTest de la aplicación con un almacén local vacío"""
+    monkeypatch.setenv('ENZIAN_DB', str(tmp_path / 'reportes.db'))
+    st.cache_resource.clear()
+    prueba = AppTest.from_file(APLICACION, default_timeout=60)
+    prueba.run()
+    yield prueba
+    st.cache_resource.clear()
+
+
+@pytest.fixture
+def escribir_borradores():
+    """Escribe cada caso como borrador JSON en un directorio y devuelve las rutas"""
+    def escribir(directorio, casos):
+        rutas = []
+        for i, caso in enumerate(casos):
+            ruta = directorio / f"caso_{i}.json"
+            ruta.write_text(json.dumps(caso, default=str), encoding='utf-8')
+            rutas.append(ruta)
+        return rutas
+    return escribir
+
+
+@pytest.fixture
+def escribir_invalidos():
+    """Escribe en un directorio archivos JSON que no son borradores válidos y devuelve las rutas"""
+    def escribir(directorio):
+        contenidos = {
+            'truncado.json': '{"paciente": {"nombre": ',
+            'lista.json': '[1, 2, 3]',
+            'indice.json': '{"version": 1, "ids": [], "bitmaps": {}}',
+            'seccion.json': '{"paciente": "Ana"}',
+            'clasificacion.json': '{"peritoneo": {"estado": "anormal", "clasificacion": ""}}',
+        }
+        for nombre, contenido in contenidos.items():
+            (directorio / nombre).write_text(contenido, encoding='utf-8')
+        return [directorio / nombre for nombre in contenidos]
+    return escribir
@@ -0,0 +1,121 @@
+"""Agregados incrementales desde borradores y desde el almacén"""
+import os
+from pathlib import Path
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.sinteticos import generar_casos
+from enzian import ReporteEnzian
+from enzian.agregados import Agregados
+from enzian.almacen import Almacen
+
+PAGINA = str(Path(__file__).resolve().parent.parent / 'pages' / '2_📊_Analitica.py')
+
+
+def test_borradores_invalidos_no_se_cuentan(tmp_path, escribir_borradores, escribir_invalidos):
+    casos = generar_casos(6, 'mixto', 8)
+    validas = escribir_borradores(tmp_path, casos)
+    invalidas = escribir_invalidos(tmp_path)
+    agregados = Agregados()
+    assert agregados.actualizar_desde_borradores(invalidas[:3] + validas + invalidas[3:]) == len(validas)
+    assert agregados.total == len(validas)
+    assert set(agregados.omitidos) == {str(ruta) for ruta in invalidas}
+
+    # Los contadores coinciden con los de agregar solo los válidos
+    referencia = Agregados()
+    referencia.actualizar_desde_borradores(validas)
+    assert agregados.valores == referencia.valores
+    assert agregados.b_por_c == referencia.b_por_c
+
+
+def test_borrador_corregido_se_agrega_despues(tmp_path, escribir_borradores, escribir_invalidos):
+    truncado = escribir_invalidos(tmp_path)[0]
+    agregados = Agregados()
+    assert agregados.actualizar_desde_borradores([truncado]) == 0
+    assert agregados.actualizar_desde_borradores([truncado]) == 0
+
+    corregido = escribir_borradores(tmp_path, generar_casos(1, 'maximo', 2))[0]
+    corregido.replace(truncado)
+    assert agregados.actualizar_desde_borradores([truncado]) == 1
+    assert agregados.actualizar_desde_borradores([truncado]) == 0
+    assert agregados.total == 1
+    assert not agregados.omitidos
+
+
+def test_pagina_solo_lee_directorios_de_la_raiz(tmp_path, monkeypatch, escribir_borradores):
+    raiz = tmp_path / 'borradores'
+    raiz.mkdir()
+    escribir_borradores(raiz, generar_casos(2, 'maximo', 1))
+    escribir_borradores(tmp_path, generar_casos(3, 'maximo', 1))
+    monkeypatch.setenv('ENZIAN_BORRADORES', str(raiz))
+    monkeypatch.setenv('ENZIAN_DB', str(tmp_path / 'reportes.db'))
+    st.cache_resource.clear()
+    app = AppTest.from_file(PAGINA, default_timeout=60)
+    app.run()
+    app.radio(key='origen_analitica').set_value('Directorio de borradores').run()
+
+    for texto in (str(tmp_path), '..', '../borradores/..'):
+        app.text_input(key='directorio_analitica').input(texto).run()
+        assert not app.metric
+    app.text_input(key='directorio_analitica').input(str(raiz)).run()
+    assert app.metric[0].value == '2'
+    st.cache_resource.clear()
+
+
+def _iguales(a, b):
+    for atributo in ('total', 'componentes', 'valores', 'alertas', 'con_alertas', 'diametros',
+                     'clases_ovario', 'b_por_c'):
+        assert getattr(a, atributo) == getattr(b, atributo), atributo
+
+
+def _version(caso, otro):
+    """Otro estudio con la cédula y la fecha de caso"""
+    return {**otro, 'paciente': {**otro['paciente'], 'cedula': caso['paciente']['cedula'],
+                                 'fecha': caso['paciente']['fecha']}}
+
+
+def test_almacen_cuenta_cada_caso_una_vez(tmp_path):
+    almacen = Almacen(tmp_path / 'reportes.db')
+    casos = generar_casos(12, 'mixto', 31)
+    otros = generar_casos(12, 'maximo', 32)
+    finales = []
+    for caso, otro in zip(casos[:6], otros):
+        almacen.guardar(caso, 'borrador')
+        finales.append(_version(caso, otro))
+        almacen.guardar(finales[-1], 'final')
+    for caso in casos[6:]:
+        almacen.guardar(caso, 'borrador')
+
+    todos = Agregados()
+    todos.actualizar_desde_almacen(almacen)
+    referencia = Agregados()
+    referencia.agregar_lote(enumerate(map(ReporteEnzian.desde_dict, finales + casos[6:]), 1))
+    _iguales(todos, referencia)
+    assert todos.total == 12
+
+    # Una versión nueva de un caso ya sumado reemplaza a la anterior
+    almacen.guardar(casos[0], 'final')
+    todos.actualizar_desde_almacen(almacen)
+    referencia = Agregados()
+    referencia.agregar_lote(enumerate(map(ReporteEnzian.desde_dict, [casos[0]] + finales[1:] + casos[6:]), 1))
+    _iguales(todos, referencia)
+
+
+def test_sin_cedula_cuenta_cada_reporte():
+    casos = [{**caso, 'paciente': {**caso['paciente'], 'cedula': ' '}} for caso in generar_casos(3, 'minimo', 5)]
+    agregados = Agregados()
+    agregados.agregar_lote(enumerate(map(ReporteEnzian.desde_dict, casos + casos), 1))
+    assert agregados.total == 6
+
+
+def test_borradores_se_queda_el_mas_reciente(tmp_path, escribir_borradores):
+    caso, otro = generar_casos(2, 'maximo', 33)
+    nuevo, viejo = escribir_borradores(tmp_path, [_version(caso, otro), caso])
+    os.utime(viejo, (1_000_000, 1_000_000))
+
+    agregados = Agregados()
+    assert agregados.actualizar_desde_borradores([nuevo, viejo]) == 2
+    referencia = Agregados()
+    referencia.agregar(ReporteEnzian.desde_dict(_version(caso, otro)))
+    _iguales(agregados, referencia)
@@ -0,0 +1,188 @@
+"""Almacén SQLite: guardado, filtros por índice, pool de conexiones y búsqueda de texto"""
+import threading
+
+import pytest
+
+from enzian.almacen import Almacen, columnas_componentes, consulta_fts
+from enzian.modelo import ReporteEnzian
+
+
+def _caso(nombre, cedula, fecha, medico, descripcion=''):
+    return {
+        'paciente': {'nombre': nombre, 'cedula': cedula, 'fecha': fecha, 'medico': medico},
+        'peritoneo': {'estado': 'anormal', 'clasificacion': 'P2', 'descripcion': descripcion},
+    }
+
+
+@pytest.fixture
+def almacen(tmp_path):
+    almacen = Almacen(tmp_path / 'reportes.db', tamano_pool=2, timeout=0.5)
+    yield almacen
+    almacen.cerrar()
+
+
+def test_guardar_y_obtener(almacen):
+    caso = _caso('Ana Mora', '1-1111-1111', '2024-03-05', 'Dra. Núñez')
+    id_borrador = almacen.guardar(caso)
+    id_final = almacen.guardar(caso, 'final', docx=b'PK\x03\x04docx')
+    registro = almacen.obtener(id_final)
+    assert registro['tipo'] == 'final'
+    assert registro['fecha_estudio'] == '2024-03-05'
+    assert registro['codigo'] == '#Enzian(u) P2'
+    assert registro['datos']['paciente']['nombre'] == 'Ana Mora'
+    assert {k: registro[k] for k in columnas_componentes(ReporteEnzian.desde_dict(caso))} \
+        == columnas_componentes(ReporteEnzian.desde_dict(caso))
+    assert almacen.docx(id_final) == b'PK\x03\x04docx'
+    assert almacen.docx(id_borrador) is None
+    assert almacen.obtener(999) is None
+    assert almacen.contar() == 2
+
+
+def test_guardar_tipo_desconocido(almacen):
+    with pytest.raises(ValueError, match='Tipo de registro desconocido'):
+        almacen.guardar(_caso('Ana', '1', '2024-01-01', 'Dr. X'), 'definitivo')
+    assert almacen.contar() == 0
+
+
+def test_buscar_por_filtros(almacen):
+    ids = {}
+    for nombre, cedula, fecha, medico, tipo in (
+        ('Ana', '1', '2024-01-10', 'Dr. X', 'borrador'),
+        ('Ana', '1', '2024-06-10', 'Dr. X', 'final'),
+        ('Bea', '2', '2024-03-15', 'Dra. Y', 'final'),
+        ('Carla', '3', '2023-12-31', 'Dra. Y', 'borrador'),
+    ):
+        ids[nombre, fecha] = almacen.guardar(_caso(nombre, cedula, fecha, medico), tipo)
+
+    def fechas(filas):
+        return [fila['fecha_estudio'] for fila in filas]
+
+    assert fechas(almacen.buscar()) == ['2024-06-10', '2024-03-15', '2024-01-10', '2023-12-31']
+    assert fechas(almacen.buscar_por_cedula('1')) == ['2024-06-10', '2024-01-10']
+    assert fechas(almacen.buscar(medico='Dra. Y')) == ['2024-03-15', '2023-12-31']
+    assert fechas(almacen.buscar(desde='2024-01-01', hasta='2024-03-15')) == ['2024-03-15', '2024-01-10']
+    assert fechas(almacen.buscar(tipo='final')) == ['2024-06-10', '2024-03-15']
+    assert fechas(almacen.buscar(cedula='1', tipo='borrador')) == ['2024-01-10']
+    assert fechas(almacen.buscar(limite=1)) == ['2024-06-10']
+    assert almacen.buscar(cedula='no existe') == []
+    fila = almacen.buscar(cedula='2')[0]
+    assert fila['id'] == ids['Bea', '2024-03-15']
+    assert 'datos' not in fila and fila['tiene_docx'] == 0
+
+
+def test_buscar_usa_indices(almacen):
+    with almacen.conexion() as con:
+        for consulta, parametros in (
+            ("SELECT id FROM reportes WHERE cedula = ?", ('1',)),
+            ("SELECT id FROM reportes WHERE medico = ?", ('Dr. X',)),
+            ("SELECT id FROM reportes WHERE fecha_estudio >= ?", ('2024-01-01',)),
+            ("SELECT id FROM reportes WHERE b_izq >= ?", (2,)),
+        ):
+            plan = ' '.join(fila['detail'] for fila in con.execute(f"EXPLAIN QUERY PLAN {consulta}", parametros))
+            assert 'USING INDEX' in plan or 'USING COVERING INDEX' in plan, consulta
+
+
+def test_pool_entre_hilos(almacen):
+    errores = []
+
+    def guardar(i):
+        try:
+            for j in range(10):
+                almacen.guardar(_caso(f"Paciente {i}", str(i), f"2024-01-{j + 1:02d}", 'Dr. X'))
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=guardar, args=(i,)) for i in range(6)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert errores == []
+    assert almacen.contar() == 60
+    assert len(almacen._todas) <= 2
+
+
+def test_pool_agotado(almacen):
+    with almacen.conexion(), almacen.conexion():
+        with pytest.raises(TimeoutError):
+            with almacen.conexion():
+                pass
+    with almacen.conexion() as con:
+        assert con.execute("SELECT 1").fetchone()[0] == 1
+
+
+def test_conexion_revierte_si_hay_error(almacen):
+    almacen.guardar(_caso('Ana', '1', '2024-01-01', 'Dr. X'))
+    with pytest.raises(RuntimeError):
+        with almacen.conexion() as con:
+            con.execute("DELETE FROM reportes")
+            raise RuntimeError("falla a mitad de la transacción")
+    assert almacen.contar() == 1
+
+
+def test_memoria_usa_una_conexion():
+    almacen = Almacen(':memory:', tamano_pool=4)
+    almacen.guardar(_caso('Ana', '1', '2024-01-01', 'Dr. X'))
+    assert almacen.tamano_pool == 1
+    assert almacen.contar() == 1
+    almacen.cerrar()
+
+
+@pytest.fixture
+def almacen_texto(almacen):
+    for i, descripcion in enumerate((
+        "Nódulo hipoecogénico en torus uterino",
+        "NODULO en el fondo de saco",
+        "Adherencias en torus, nódulo no visible",
+        "Ovario derecho con endometrioma",
+        "Ovarios sin hallazgos",
+    )):
+        almacen.guardar(_caso(f"Paciente {i}", str(i), f"2024-01-{i + 1:02d}", 'Dr. X', descripcion))
+    return almacen
+
+
+def _cedulas(filas):
+    return sorted(fila['cedula'] for fila in filas)
+
+
+def test_texto_sin_tildes_ni_mayusculas(almacen_texto):
+    for texto in ('nodulo', 'nódulo', 'NODULO', 'Nódulo'):
+        assert _cedulas(almacen_texto.buscar_texto(texto)) == ['0', '1', '2'], texto
+
+
+def test_texto_frases_y_prefijos(almacen_texto):
+    assert _cedulas(almacen_texto.buscar_texto('"en torus"')) == ['0', '2']
+    assert _cedulas(almacen_texto.buscar_texto('"torus en"')) == []
+    assert _cedulas(almacen_texto.buscar_texto('torus nodulo')) == ['0', '2']
+    assert _cedulas(almacen_texto.buscar_texto('ovario')) == ['3']
+    assert _cedulas(almacen_texto.buscar_texto('ovar*')) == ['3', '4']
+    assert _cedulas(almacen_texto.buscar_texto('"en torus" hipoeco*')) == ['0']
+
+
+def test_texto_fragmento_y_relevancia(almacen_texto):
+    filas = almacen_texto.buscar_texto('torus')
+    assert [fila['relevancia'] for fila in filas] == sorted(fila['relevancia'] for fila in filas)
+    assert all('**torus**' in fila['fragmento'] for fila in filas)
+
+
+@pytest.mark.parametrize('texto', ['(', ')', 'AND', 'OR', 'NOT', 'NEAR(', '*', '""', '"', '"abc', 'a OR', '-x', '^', 'peritoneo:x', '   '])
+def test_texto_sintaxis_fts_hostil(almacen_texto, texto):
+    assert almacen_texto.buscar_texto(texto) == []
+
+
+def test_consulta_fts():
+    assert consulta_fts('nódulo "en torus" ovar*') == '"nódulo" "en torus" "ovar"*'
+    assert consulta_fts('AND ( *') == '"AND" "("'
+    assert consulta_fts('"" * "abc') == '"abc"'
+    assert consulta_fts('') == ''
+
+
+def test_indexa_registros_previos_al_indice(tmp_path):
+    almacen = Almacen(tmp_path / 'reportes.db')
+    almacen.guardar(_caso('Ana', '1', '2024-01-01', 'Dr. X', "nódulo en torus"))
+    with almacen.conexion() as con:
+        con.execute("DROP TABLE reportes_texto")
+    almacen.cerrar()
+    almacen = Almacen(tmp_path / 'reportes.db')
+    assert _cedulas(almacen.buscar_texto('nodulo')) == ['1']
+    almacen.cerrar()
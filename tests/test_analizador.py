@@ -0,0 +1,67 @@
+"""Análisis de códigos #Enzian: inversa de generar_codigo_enzian() y errores de sintaxis"""
+import pytest
+
+from benchmarks.sinteticos import CLASES, generar_casos
+from enzian import CodigoEnzianInvalido, ReporteEnzian, analizar_codigo, desglose_enzian, generar_codigo_enzian
+from enzian.codigo import SIN_HALLAZGOS, ComponentesEnzian
+
+
+@pytest.mark.parametrize('clase', CLASES)
+def test_ida_y_vuelta(clase):
+    for caso in generar_casos(200, clase, 11):
+        reporte = ReporteEnzian.desde_dict(caso)
+        codigo = generar_codigo_enzian(reporte)
+        componentes = analizar_codigo(codigo)
+        assert componentes == desglose_enzian(reporte)
+        assert componentes.codigo() == codigo
+
+
+def test_sin_hallazgos_y_espacios_externos():
+    assert analizar_codigo(f"  #Enzian(s) {SIN_HALLAZGOS}\n") == ComponentesEnzian(modalidad='s')
+
+
+def test_todos_los_componentes():
+    codigo = "#Enzian(m) P2, Ox/3, T0/1, A3, B2/0, C1, FA, FB, FU(r), FU(l), FI(Sigma), FI(Ciego), F(Ombligo)"
+    componentes = analizar_codigo(codigo)
+    assert componentes == ComponentesEnzian(
+        modalidad='m', p='P2', o=('x', '3'), t=('0', '1'), a='A3', b=('2', '0'), c='C1',
+        fa=True, fb=True, fu=('r', 'l'), fi=('Sigma', 'Ciego'), f=('Ombligo',)
+    )
+    assert componentes.codigo() == codigo
+
+
+# (texto, posición del error)
+MALFORMADOS = [
+    ('', 0),
+    ('Enzian(u) P1', 0),
+    ('#Enzian(x) P1', 8),
+    ('#Enzian(u)P1', 9),
+    ('#Enzian(u) ', 9),
+    ('#Enzian(u) P0', 12),
+    ('#Enzian(u) P4', 12),
+    ('#Enzian(u) O1', 13),
+    ('#Enzian(u) O0/0', 12),
+    ('#Enzian(u) T4/1', 12),
+    ('#Enzian(u) X1', 11),
+    ('#Enzian(u) P1,A1', 13),
+    ('#Enzian(u) P1 extra', 13),
+    ('#Enzian(u) A1, P1', 15),
+    ('#Enzian(u) P1, P2', 15),
+    ('#Enzian(u) FB, FA', 15),
+    ('#Enzian(u) FU(x)', 14),
+    ('#Enzian(u) FU(r), FU(r)', 18),
+    ('#Enzian(u) FI(Sigma', 14),
+    ('#Enzian(u) FI()', 14),
+    ('#Enzian(u) FI( Sigma)', 14),
+    ('#Enzian(u) F(a,b)', 14),
+    (f'#Enzian(u) {SIN_HALLAZGOS}, P1', 41),
+]
+
+
+@pytest.mark.parametrize('texto, posicion', MALFORMADOS)
+def test_codigo_malformado(texto, posicion):
+    with pytest.raises(CodigoEnzianInvalido) as error:
+        analizar_codigo(texto)
+    assert error.value.posicion == posicion
+    assert error.value.texto == texto.strip()
+    assert isinstance(error.value, ValueError)
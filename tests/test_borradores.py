@@ -0,0 +1,42 @@
+"""Carga de borradores JSON desde el uploader de la pestaña Generar reporte"""
+import json
+
+CASO = {
+    'paciente': {'nombre': 'Lucía Vargas Rojas', 'edad': 34, 'cedula': '1-0234-0567', 'fecha': '2024-05-10'},
+    'compartimento_c': {
+        'estado': 'anormal', 'longitud': 2.4, 'clasificacion': 'C2 (1-3 cm)', 'distancia_anal': 8.0,
+        'profundidad': 'Muscular propia', 'circunferencia': 20, 'estenosis': False,
+    },
+}
+
+
+def _subir(app, contenido):
+    app.file_uploader(key='cargar_borrador').upload('borrador.json', contenido, 'application/json').run()
+    assert not app.exception
+
+
+def test_borrador_llega_a_los_widgets(app):
+    _subir(app, json.dumps(CASO).encode())
+    assert app.text_input(key='nombre_paciente').value == CASO['paciente']['nombre']
+    assert app.radio(key='comp_c_estado').value == "Anormal"
+    app.run()
+    assert app.session_state['data']['compartimento_c']['clasificacion'] == CASO['compartimento_c']['clasificacion']
+
+
+def test_resubir_tras_quitar_descarta_ediciones(app):
+    contenido = json.dumps(CASO).encode()
+    _subir(app, contenido)
+    app.text_input(key='nombre_paciente').input('Editado').run()
+
+    # Mientras el archivo siga en el uploader, las ediciones se conservan
+    app.run()
+    assert app.text_input(key='nombre_paciente').value == 'Editado'
+
+    app.file_uploader(key='cargar_borrador').clear().run()
+    _subir(app, contenido)
+    assert app.text_input(key='nombre_paciente').value == CASO['paciente']['nombre']
+
+
+def test_borrador_invalido(app):
+    _subir(app, b'[1, 2')
+    assert any('Error al cargar borrador' in e.value for e in app.error)
@@ -0,0 +1,32 @@
+"""Captura por lotes: solo los campos de detalle esperan al botón Aplicar cambios"""
+
+
+def _por_lotes(app):
+    app.toggle(key='captura_por_lotes').set_value(True).run()
+    assert not app.exception
+
+
+def test_estado_anormal_muestra_detalle_sin_enviar(app):
+    _por_lotes(app)
+    app.radio(key='peritoneo_estado').set_value('Anormal').run()
+    assert any(w.key == 'clasificacion_p' for w in app.select_slider)
+    assert app.session_state['data']['peritoneo']['estado'] == 'anormal'
+
+
+def test_detalle_se_aplica_al_enviar(app):
+    _por_lotes(app)
+    app.radio(key='peritoneo_estado').set_value('Anormal').run()
+    app.select_slider(key='clasificacion_p').set_value('P3 (>7 cm)')
+    app.run()
+    assert app.session_state['data']['peritoneo']['clasificacion'] != 'P3 (>7 cm)'
+
+    app.select_slider(key='clasificacion_p').set_value('P3 (>7 cm)')
+    [b for b in app.button if b.form_id == 'form_peritoneo'][0].click().run()
+    assert app.session_state['data']['peritoneo']['clasificacion'] == 'P3 (>7 cm)'
+
+
+def test_lados_de_ureter_fuera_del_formulario(app):
+    _por_lotes(app)
+    app.radio(key='ureter_presente').set_value('Sí').run()
+    app.multiselect(key='lado_ureter').set_value(['Derecho']).run()
+    assert any(w.key == 'hidronefrosis_derecho' for w in app.selectbox)
@@ -0,0 +1,85 @@
+"""Cohortes construidas desde borradores y desde el almacén"""
+import math
+from pathlib import Path
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.sinteticos import generar_casos
+from enzian.almacen import Almacen
+from enzian.clasificacion import calcular_clasificacion_compartimento, calcular_clasificacion_ovario
+from enzian.cohortes import CAMPOS, MEDIDAS_CLASES, Cohorte, compilar
+
+PAGINA = str(Path(__file__).resolve().parent.parent / 'pages' / '1_🔬_Cohortes.py')
+
+
+def test_borradores_invalidos_se_omiten(tmp_path, escribir_borradores, escribir_invalidos):
+    validas = escribir_borradores(tmp_path, generar_casos(5, 'mixto', 3))
+    invalidas = escribir_invalidos(tmp_path)
+    cohorte = Cohorte.desde_borradores(invalidas[:2] + validas + invalidas[2:])
+    assert len(cohorte) == 5
+    assert cohorte.indice.ids == [str(ruta) for ruta in validas]
+    assert set(cohorte.omitidos) == {str(ruta) for ruta in invalidas}
+    assert cohorte.contar('edad > 0') == sum(1 for _, r in cohorte.registros(cohorte.indice.todos())
+                                             if float(r.paciente.get('edad') or 0) > 0)
+
+
+def test_almacen_incremental_igual_a_reconstruir(tmp_path):
+    almacen = Almacen(tmp_path / 'reportes.db')
+    casos = generar_casos(8, 'mixto', 6)
+    for i, caso in enumerate(casos[:4]):
+        almacen.guardar(caso, 'final' if i % 2 else 'borrador')
+    todos, finales = Cohorte.desde_almacen(almacen), Cohorte.desde_almacen(almacen, 'final')
+    assert todos.contar('C >= 0') == 4
+
+    for i, caso in enumerate(casos[4:]):
+        almacen.guardar(caso, 'final' if i % 2 else 'borrador')
+    assert todos.actualizar_desde_almacen(almacen) == 4
+    assert finales.actualizar_desde_almacen(almacen, 'final') == 2
+    assert todos.actualizar_desde_almacen(almacen) == 0
+
+    for cohorte, tipo in ((todos, None), (finales, 'final')):
+        nueva = Cohorte.desde_almacen(almacen, tipo)
+        assert cohorte.indice.ids == nueva.indice.ids
+        for consulta in ('C >= 2 or B >= 1', 'edad > 30', 'not FU and ovario.der.diametro > 3'):
+            assert cohorte.filtrar(consulta) == nueva.filtrar(consulta)
+
+
+def test_pagina_solo_lee_directorios_de_la_raiz(tmp_path, monkeypatch, escribir_borradores):
+    raiz = tmp_path / 'borradores'
+    raiz.mkdir()
+    escribir_borradores(raiz, generar_casos(2, 'minimo', 1))
+    escribir_borradores(tmp_path, generar_casos(3, 'minimo', 1))
+    monkeypatch.setenv('ENZIAN_BORRADORES', str(raiz))
+    monkeypatch.setenv('ENZIAN_DB', str(tmp_path / 'reportes.db'))
+    st.cache_resource.clear()
+    app = AppTest.from_file(PAGINA, default_timeout=60)
+    app.run()
+    app.radio(key='origen_cohorte').set_value('Directorio de borradores').run()
+
+    app.text_input(key='directorio_cohorte').input(str(tmp_path)).run()
+    assert not app.metric
+    app.text_input(key='directorio_cohorte').input('..').run()
+    assert not app.metric
+    app.text_input(key='directorio_cohorte').input('.').run()
+    assert app.metric[0].value == '2'
+    app.text_input(key='consulta_cohorte').input('edad >= 0').run()
+    assert any(e.label == '📏 Clases según las medidas' for e in app.expander)
+    assert not app.exception
+    st.cache_resource.clear()
+
+
+def test_clases_por_medida_igual_a_escalar():
+    cohorte = Cohorte(enumerate(generar_casos(120, 'mixto', 10)))
+    bitmap = compilar('edad >= 30').ejecutar(cohorte)
+    clases = cohorte.clases_por_medida(bitmap)
+    assert set(clases) == set(MEDIDAS_CLASES)
+    for nombre, (campo, prefijo) in MEDIDAS_CLASES.items():
+        extractor = CAMPOS[campo][1]
+        medidas = [m for m in (extractor(r) for _, r in cohorte.registros(bitmap)) if not math.isnan(m)]
+        if prefijo == 'O':
+            sugeridas = [calcular_clasificacion_ovario(m) for m in medidas]
+        else:
+            sugeridas = [prefijo + calcular_clasificacion_compartimento(m) for m in medidas]
+        assert clases[nombre] == {f'{prefijo}{g}': sugeridas.count(f'{prefijo}{g}') for g in (1, 2, 3)}
+        assert sum(clases[nombre].values()) > 0
@@ -0,0 +1,65 @@
+"""Cola de generación en segundo plano y claves de caché del DOCX"""
+import time
+
+from benchmarks.sinteticos import generar_casos
+from enzian.cola import ColaReportes, clave_docx, nombre_docx
+
+
+def test_clave_depende_solo_del_contenido():
+    caso, otro = generar_casos(2, 'mixto', 41)
+    assert clave_docx(caso) == clave_docx(dict(caso))
+    assert clave_docx(caso) != clave_docx({**otro, 'paciente': caso['paciente']})
+
+
+def test_clave_depende_del_motor_y_del_modo_determinista():
+    caso = generar_casos(1, 'mixto', 41)[0]
+    claves = {clave_docx(caso, motor, determinista) for motor in ('docx', 'xml') for determinista in (False, True)}
+    assert len(claves) == 4
+    assert clave_docx(caso, 'xml', True) == clave_docx(dict(caso), 'xml', True)
+    assert clave_docx(caso) == clave_docx(caso, 'docx', False)
+
+
+def test_nombre_determinista_depende_solo_del_contenido():
+    caso, otro = generar_casos(2, 'mixto', 42)
+    assert nombre_docx(caso, True) == nombre_docx(dict(caso), True)
+    assert nombre_docx(caso, True) != nombre_docx({**otro, 'paciente': caso['paciente']}, True)
+
+
+def _esperar(cola, id_trabajo, limite=5):
+    inicio = time.time()
+    while not cola.trabajo(id_trabajo).terminado:
+        assert time.time() - inicio < limite
+        time.sleep(0.01)
+    return cola.trabajo(id_trabajo)
+
+
+def test_error_en_al_terminar_queda_en_el_trabajo():
+    cola = ColaReportes(trabajadores=1, maximo_pendientes=1)
+
+    def falla(resultado):
+        raise OSError(f"disco lleno al guardar {resultado}")
+
+    trabajo = _esperar(cola, cola.enviar(lambda: 'docx', al_terminar=falla))
+    assert trabajo.estado == 'listo'
+    assert trabajo.resultado == 'docx'
+    assert trabajo.error_al_terminar == "OSError: disco lleno al guardar docx"
+
+    # El cupo se liberó a pesar del error
+    assert _esperar(cola, cola.enviar(lambda: 'otro')).error_al_terminar is None
+
+
+def test_terminado_espera_a_al_terminar():
+    cola = ColaReportes(trabajadores=1, maximo_pendientes=2)
+    guardados = []
+
+    def guardar(resultado):
+        time.sleep(0.2)
+        guardados.append(resultado)
+
+    # El trabajo tarda un poco para que al_terminar corra en el hilo del trabajador
+    id_trabajo = cola.enviar(lambda: time.sleep(0.05) or 'docx', al_terminar=guardar)
+    while not cola.trabajo(id_trabajo).futuro.done():
+        time.sleep(0.01)
+    assert not cola.trabajo(id_trabajo).terminado
+    _esperar(cola, id_trabajo)
+    assert guardados == ['docx']
@@ -0,0 +1,109 @@
+"""Valores derivados con seguimiento de dependencias"""
+import copy
+
+from benchmarks.sinteticos import generar_casos
+from enzian.derivados import DERIVADOS, GrafoDerivados, leer_ruta, proyectar
+from enzian.modelo import ReporteEnzian
+
+FALTA = leer_ruta({}, 'falta')
+
+
+def _completo(nombre, datos):
+    """Valor de un derivado calculado sobre el reporte entero, sin proyectar"""
+    definicion = DERIVADOS[nombre]
+    previos = [_completo(dependencia, datos) for dependencia in definicion.depende]
+    return definicion.funcion(ReporteEnzian.desde_dict(copy.deepcopy(datos)), *previos)
+
+
+def _hojas(datos, prefijo=''):
+    """Rutas con puntos de los valores que no son dict"""
+    for clave, valor in datos.items():
+        ruta = f"{prefijo}{clave}"
+        if isinstance(valor, dict) and valor:
+            yield from _hojas(valor, ruta + '.')
+        else:
+            yield ruta
+
+
+def _escribir(datos, ruta, valor):
+    """Pone un valor en una ruta; FALTA quita la clave"""
+    *padres, ultima = ruta.split('.')
+    for clave in padres:
+        datos = datos.setdefault(clave, {})
+    if valor is FALTA:
+        datos.pop(ultima, None)
+    else:
+        datos[ultima] = copy.deepcopy(valor)
+
+
+def _rutas(nombre):
+    """Rutas declaradas por un derivado y por los derivados de los que depende"""
+    definicion = DERIVADOS[nombre]
+    return set(definicion.rutas).union(*(_rutas(dependencia) for dependencia in definicion.depende))
+
+
+def _declarada(ruta, rutas):
+    return any(ruta == r or ruta.startswith(r + '.') or r.startswith(ruta + '.') for r in rutas)
+
+
+def test_editar_campo_ajeno_no_recalcula():
+    datos = generar_casos(1, 'maximo', 4)[0]
+    grafo = GrafoDerivados()
+    for i in range(5):
+        datos['paciente']['indicacion'] = f"indicación {i}"
+        datos['ovarios']['derecho']['descripcion'] = f"descripción {i}"
+        vista = grafo.vista(datos)
+        for nombre in DERIVADOS:
+            vista[nombre]
+    assert grafo.recalculos == {nombre: 1 for nombre in DERIVADOS}
+
+
+def test_editar_entrada_recalcula_solo_lo_que_depende():
+    datos = generar_casos(1, 'maximo', 4)[0]
+    grafo = GrafoDerivados()
+    vista = grafo.vista(datos)
+    for nombre in DERIVADOS:
+        vista[nombre]
+    datos['paciente']['nombre'] = ''
+    vista = grafo.vista(datos)
+    assert vista['campos_obligatorios'] == ["Nombre del paciente"]
+    for nombre in DERIVADOS:
+        vista[nombre]
+    assert grafo.recalculos['campos_obligatorios'] == 2
+    assert all(grafo.recalculos[nombre] == 1 for nombre in DERIVADOS if nombre != 'campos_obligatorios')
+
+
+def test_valores_proyectados_iguales_a_calculo_completo():
+    grafo = GrafoDerivados()
+    for clase in ('minimo', 'mixto', 'maximo'):
+        for datos in generar_casos(200, clase, 7):
+            vista = grafo.vista(datos)
+            for nombre in DERIVADOS:
+                assert vista[nombre] == _completo(nombre, datos), (clase, nombre)
+
+
+def test_proyectar_solo_copia_las_rutas_dadas():
+    datos = generar_casos(1, 'maximo', 2)[0]
+    rutas = ('paciente.nombre', 'ovarios.izquierdo', 'ovarios.izquierdo.estado', 'no.existe')
+    proyeccion = proyectar(datos, rutas)
+    assert proyeccion == {
+        'paciente': {'nombre': datos['paciente']['nombre']},
+        'ovarios': {'izquierdo': datos['ovarios']['izquierdo']},
+    }
+    assert leer_ruta(proyeccion, 'no.existe') is leer_ruta(datos, 'no.existe')
+
+
+def test_rutas_declaradas_cubren_lo_que_lee_cada_derivado():
+    # Cambiar una ruta no declarada no puede cambiar el valor: si lo hace,
+    # falta esa ruta en @derivado(...) y la vista devolvería un valor viejo
+    casos = [caso for clase in ('minimo', 'mixto', 'maximo') for caso in generar_casos(15, clase, 11)]
+    for i, datos in enumerate(casos):
+        donante = casos[(i + 1) % len(casos)]
+        for nombre in DERIVADOS:
+            esperado, rutas = _completo(nombre, datos), _rutas(nombre)
+            for ruta in set(_hojas(datos)) | set(_hojas(donante)):
+                if _declarada(ruta, rutas):
+                    continue
+                modificado = copy.deepcopy(datos)
+                _escribir(modificado, ruta, leer_ruta(donante, ruta))
+                assert _completo(nombre, modificado) == esperado, (nombre, ruta)
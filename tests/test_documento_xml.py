@@ -0,0 +1,35 @@
+"""Escritor directo de DOCX frente al camino de python-docx"""
+import time
+
+import pytest
+
+from benchmarks.sinteticos import CLASES, generar_casos
+from enzian import ReporteEnzian
+from enzian.documento import MOTORES, generar_reporte_word
+from enzian.documento_xml import reempacar, verificar
+
+
+@pytest.mark.parametrize('clase', CLASES)
+def test_verificar_sin_diferencias(clase):
+    for caso in generar_casos(8, clase, 21):
+        assert verificar(ReporteEnzian.desde_dict(caso)) == []
+
+
+@pytest.mark.parametrize('clase', CLASES)
+def test_determinista_mismos_bytes_con_ambos_motores(clase, monkeypatch):
+    reportes = [ReporteEnzian.desde_dict(caso) for caso in generar_casos(4, clase, 22)]
+    primeros = [generar_reporte_word(reporte, 'docx', True).getvalue() for reporte in reportes]
+
+    # Una hora después: sin modo determinista cambian las fechas de las entradas del zip
+    ahora = time.time()
+    monkeypatch.setattr(time, 'time', lambda: ahora + 3600)
+    for reporte, esperado in zip(reportes, primeros):
+        for motor in MOTORES:
+            assert generar_reporte_word(reporte, motor, True).getvalue() == esperado
+        assert generar_reporte_word(reporte, 'xml').getvalue() != esperado
+
+
+def test_reempacar_reproduce_el_modo_determinista():
+    reporte = ReporteEnzian.desde_dict(generar_casos(1, 'maximo', 23)[0])
+    esperado = generar_reporte_word(reporte, 'xml', True).getvalue()
+    assert reempacar(generar_reporte_word(reporte, 'docx').getvalue()) == esperado
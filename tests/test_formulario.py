@@ -0,0 +1,69 @@
+"""Carga de estudios en los widgets del formulario"""
+import json
+import os
+from datetime import date
+
+import pytest
+
+from benchmarks.sinteticos import CLASES, generar_casos
+from enzian.almacen import Almacen
+from enzian.formulario import es_clave_formulario, valores_formulario
+
+
+def _json(datos):
+    return json.loads(json.dumps(datos, default=str))
+
+
+@pytest.mark.parametrize('clase', CLASES)
+def test_claves_conocidas(clase):
+    for caso in generar_casos(20, clase, 1):
+        assert all(es_clave_formulario(clave) for clave in valores_formulario(caso))
+
+
+def test_estados_y_detalles():
+    caso = generar_casos(1, 'maximo', 3)[0]
+    valores = valores_formulario(caso)
+    assert valores['peritoneo_estado'] == "Anormal"
+    assert valores['clasificacion_p'] == caso['peritoneo']['clasificacion']
+    assert valores['tubo_der_estado'] == "Anormal - Adherencias presentes"
+    assert valores['ureter_presente'] == "Sí"
+    assert valores['fecha_estudio'] == date.fromisoformat(caso['paciente']['fecha'])
+    for lado in caso['localizaciones_f']['ureter']['lados']:
+        assert f"hidronefrosis_{lado.lower()}" in valores
+
+
+def test_secciones_normales_sin_detalles():
+    valores = valores_formulario({'peritoneo': {'estado': 'normal', 'clasificacion': "P2 (3-7 cm)"}})
+    assert valores['peritoneo_estado'] == "Normal"
+    assert 'clasificacion_p' not in valores
+
+
+def test_valores_no_admitidos_se_omiten():
+    valores = valores_formulario({
+        'paciente': {'edad': 300, 'fecha': 'no es fecha', 'nombre': 5},
+        'peritoneo': {'estado': 'anormal', 'clasificacion': 'P9', 'diametro': 3, 'localizaciones': ['Otras', 'x']},
+        'ovarios': {'derecho': {'estado': 'desconocido'}},
+    })
+    assert not {'edad_paciente', 'fecha_estudio', 'nombre_paciente', 'clasificacion_p'} & set(valores)
+    assert valores['diametro_peritoneo'] == 3.0 and isinstance(valores['diametro_peritoneo'], float)
+    assert valores['localizaciones_peritoneo'] == ['Otras']
+    assert 'ovario_der_estado' not in valores
+
+
+@pytest.mark.parametrize('clase', CLASES)
+def test_cargar_registro_en_la_aplicacion(app, clase):
+    caso = generar_casos(1, clase, 7)[0]
+    Almacen(os.environ['ENZIAN_DB']).guardar(caso, 'final')
+    next(t for t in app.text_input if t.label == 'Cédula').input(caso['paciente']['cedula']).run()
+    next(b for b in app.button if b.label == "📂 Cargar en el formulario").click().run()
+    assert not app.exception
+
+    # Otra ejecución completa reconstruye data desde los widgets sin perder el estudio
+    app.run()
+    cargado = _json(app.session_state['data'])
+    for seccion, valor in _json(caso).items():
+        if seccion == 'localizaciones_f' and valor.get('otras', {}).get('presente'):
+            valor['otras'].setdefault('descripciones', {tipo: '' for tipo in valor['otras']['tipos']})
+        assert cargado[seccion] == valor, seccion
+    estado = caso.get('peritoneo', {}).get('estado', 'normal')
+    assert app.radio(key='peritoneo_estado').value == estado.capitalize()
@@ -0,0 +1,16 @@
+"""Índice de bitmaps construido desde borradores"""
+from benchmarks.sinteticos import generar_casos
+from enzian.indice_bitmap import IndiceBitmap, main
+
+
+def test_borradores_invalidos_se_omiten(tmp_path, capsys, escribir_borradores, escribir_invalidos):
+    validas = escribir_borradores(tmp_path, generar_casos(4, 'maximo', 5))
+    invalidas = escribir_invalidos(tmp_path)
+    indice = IndiceBitmap.desde_borradores(validas + invalidas)
+    assert indice.ids == [str(ruta) for ruta in validas]
+    assert set(indice.omitidos) == {str(ruta) for ruta in invalidas}
+
+    assert main([str(tmp_path)]) == 0
+    salida = capsys.readouterr()
+    assert "Registros indexados: 4" in salida.out
+    assert salida.err.count("Omitido") == len(invalidas)
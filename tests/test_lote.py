@@ -0,0 +1,48 @@
+"""Generación de reportes por lotes"""
+import json
+
+from enzian.lote import main, procesar_lote
+
+
+def _caso(nombre, cedula):
+    return {
+        'paciente': {'nombre': nombre, 'cedula': cedula, 'fecha': '2024-02-01'},
+        'peritoneo': {'estado': 'anormal', 'clasificacion': 'P1'},
+    }
+
+
+def _escribir(ruta, caso):
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    ruta.write_text(json.dumps(caso, default=str), encoding='utf-8')
+    return ruta
+
+
+def test_nombres_de_salida_repetidos_son_errores(tmp_path):
+    casos = [_caso(f"Paciente {i}", str(i)) for i in range(4)]
+    rutas = [
+        _escribir(tmp_path / 'a' / 'caso.json', casos[0]),
+        _escribir(tmp_path / 'a' / 'otro.json', casos[1]),
+        _escribir(tmp_path / 'b' / 'caso.json', casos[2]),
+        _escribir(tmp_path / 'c' / 'CASO.json', casos[3]),
+    ]
+    salida = tmp_path / 'salida'
+    resultados = {ruta: (docx, error) for ruta, docx, _, error in procesar_lote(rutas, salida, procesos=1)}
+
+    assert resultados[str(rutas[0])] == (str(salida / 'caso.docx'), None)
+    assert resultados[str(rutas[1])] == (str(salida / 'otro.docx'), None)
+    for repetida in rutas[2:]:
+        docx, error = resultados[str(repetida)]
+        assert docx is None
+        assert str(rutas[0]) in error
+    assert sorted(p.name for p in salida.iterdir()) == ['caso.docx', 'otro.docx']
+
+
+def test_linea_de_comandos_informa_repetidos(tmp_path, capsys):
+    casos = [_caso(f"Paciente {i}", str(i)) for i in range(2)]
+    _escribir(tmp_path / 'a' / 'caso.json', casos[0])
+    _escribir(tmp_path / 'b' / 'caso.json', casos[1])
+    codigo = main([str(tmp_path / 'a'), str(tmp_path / 'b'), '-o', str(tmp_path / 'salida'), '-j', '1', '-q'])
+    salida = capsys.readouterr()
+    assert codigo == 1
+    assert "Reportes generados: 1/2" in salida.out
+    assert "ya corresponde a" in salida.err
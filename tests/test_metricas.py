@@ -0,0 +1,141 @@
+"""Métricas de tiempos y su exportación en formato Prometheus"""
+import os
+import re
+import urllib.error
+import urllib.request
+
+import pytest
+
+from enzian.metricas import CUBOS, HISTOGRAMA_SECCIONES, Metricas
+
+_MUESTRA = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$')
+_ETIQUETA = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"(?:,|$)')
+
+
+def _desescapar(valor):
+    return re.sub(r'\\(.)', lambda m: '\n' if m.group(1) == 'n' else m.group(1), valor)
+
+
+def _leer(texto):
+    """Familias {nombre: (ayuda, tipo)} y muestras [(nombre, etiquetas, valor)] del formato de texto"""
+    assert texto.endswith('\n')
+    familias, muestras = {}, []
+    for linea in texto.splitlines():
+        if linea.startswith('# HELP '):
+            nombre, ayuda = linea[7:].split(' ', 1)
+            assert nombre not in familias
+            familias[nombre] = [ayuda, None]
+        elif linea.startswith('# TYPE '):
+            nombre, tipo = linea[7:].split(' ')
+            assert familias[nombre][1] is None and tipo in ('counter', 'histogram')
+            familias[nombre][1] = tipo
+        else:
+            nombre, etiquetas, valor = _MUESTRA.match(linea).groups()
+            pares = _ETIQUETA.findall(etiquetas or '')
+            assert ','.join(f'{k}="{v}"' for k, v in pares) == (etiquetas or '')
+            familia = re.sub(r'_(bucket|sum|count)$', '', nombre) if nombre not in familias else nombre
+            assert familia in familias, f"muestra {nombre} antes de su # TYPE"
+            muestras.append((nombre, {k: _desescapar(v) for k, v in pares}, float(valor)))
+    return {nombre: tuple(d) for nombre, d in familias.items()}, muestras
+
+
+def test_exportar_contadores_e_histogramas():
+    metricas = Metricas()
+    valores = [0.0005, 0.001, 0.004, 0.005, 0.3, 7.0, 30.0]
+    for valor in valores:
+        metricas.registrar('pestana_ovarios', valor)
+    metricas.registrar('barra_lateral', 0.02)
+    metricas.contar('enzian_ejecuciones_total')
+    metricas.contar('enzian_ejecuciones_total')
+    metricas.contar('enzian_reportes_total', resultado='listo')
+    metricas.contar('enzian_reportes_total', resultado='error')
+
+    familias, muestras = _leer(metricas.exportar_prometheus())
+    assert familias == {
+        'enzian_ejecuciones_total': ("Ejecuciones completas del script", 'counter'),
+        'enzian_reportes_total': ("Reportes Word solicitados, por resultado (listo, error o cache)", 'counter'),
+        HISTOGRAMA_SECCIONES: ("Duración de cada sección del script por ejecución", 'histogram'),
+    }
+    assert ('enzian_ejecuciones_total', {}, 2.0) in muestras
+    assert ('enzian_reportes_total', {'resultado': 'listo'}, 1.0) in muestras
+    assert ('enzian_reportes_total', {'resultado': 'error'}, 1.0) in muestras
+
+    def de_seccion(sufijo, seccion):
+        return [(e, v) for n, e, v in muestras if n == HISTOGRAMA_SECCIONES + sufijo and e['seccion'] == seccion]
+
+    cubos = de_seccion('_bucket', 'pestana_ovarios')
+    assert [e['le'] for e, _ in cubos] == [repr(limite) for limite in CUBOS] + ['+Inf']
+    # Cada cubo cuenta las observaciones <= su límite
+    assert [v for _, v in cubos] == [sum(1 for x in valores if x <= limite) for limite in CUBOS] + [len(valores)]
+    assert de_seccion('_count', 'pestana_ovarios') == [({'seccion': 'pestana_ovarios'}, len(valores))]
+    assert de_seccion('_sum', 'pestana_ovarios')[0][1] == pytest.approx(sum(valores))
+    assert de_seccion('_count', 'barra_lateral') == [({'seccion': 'barra_lateral'}, 1)]
+    assert metricas.secciones()['pestana_ovarios'] == (len(valores), pytest.approx(sum(valores) / len(valores)))
+
+
+def test_exportar_escapa_etiquetas():
+    metricas = Metricas()
+    seccion = 'pestaña "F"\\uréter\nderecho'
+    metricas.registrar(seccion, 0.01)
+    _, muestras = _leer(metricas.exportar_prometheus())
+    assert {e['seccion'] for _, e, _ in muestras} == {seccion}
+
+
+def test_medir_guarda_la_ultima_duracion():
+    metricas = Metricas()
+    tiempos = {}
+    for _ in range(3):
+        with metricas.medir('generar', destino=tiempos):
+            pass
+    with pytest.raises(ZeroDivisionError):
+        with metricas.medir('generar', destino=tiempos):
+            1 / 0
+    assert set(tiempos) == {'generar'} and tiempos['generar'] >= 0
+    assert metricas.secciones()['generar'][0] == 4
+
+
+def test_escribir_archivo(tmp_path):
+    metricas = Metricas()
+    metricas.contar('enzian_ejecuciones_total')
+    ruta = tmp_path / 'enzian.prom'
+    metricas.escribir_archivo(ruta)
+    assert ruta.read_text(encoding='utf-8') == metricas.exportar_prometheus()
+    metricas.contar('enzian_ejecuciones_total')
+    metricas.escribir_archivo(str(ruta))
+    assert ('enzian_ejecuciones_total', {}, 2.0) in _leer(ruta.read_text(encoding='utf-8'))[1]
+    assert os.listdir(tmp_path) == ['enzian.prom']
+
+
+def test_escribir_archivo_no_deja_archivos_a_medias(tmp_path, monkeypatch):
+    metricas = Metricas()
+    metricas.contar('enzian_ejecuciones_total')
+    ruta = tmp_path / 'enzian.prom'
+    metricas.escribir_archivo(ruta)
+    anterior = ruta.read_text(encoding='utf-8')
+
+    def fallar(origen, destino):
+        raise OSError("disco lleno")
+
+    metricas.contar('enzian_ejecuciones_total')
+    monkeypatch.setattr(os, 'replace', fallar)
+    with pytest.raises(OSError, match='disco lleno'):
+        metricas.escribir_archivo(ruta)
+    assert ruta.read_text(encoding='utf-8') == anterior
+    assert os.listdir(tmp_path) == ['enzian.prom']
+
+
+def test_servir_http():
+    metricas = Metricas()
+    metricas.contar('enzian_ejecuciones_total')
+    servidor = metricas.servir_http(0)
+    try:
+        url = f"http://127.0.0.1:{servidor.server_address[1]}"
+        with urllib.request.urlopen(f"{url}/metrics", timeout=5) as respuesta:
+            assert respuesta.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            assert respuesta.read().decode('utf-8') == metricas.exportar_prometheus()
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{url}/otra", timeout=5)
+        assert error.value.code == 404
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
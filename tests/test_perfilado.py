@@ -0,0 +1,63 @@
+"""Turnos de perfilado al generar reportes desde la aplicación"""
+import json
+import time
+
+import pytest
+
+from benchmarks.sinteticos import generar_casos
+from enzian.cola import ColaLlena
+from recursos import obtener_cola, obtener_perfilador
+
+
+@pytest.fixture
+def perfiles(tmp_path, monkeypatch):
+    directorio = tmp_path / 'perfiles'
+    monkeypatch.setenv('ENZIAN_PERFILES', str(directorio))
+    return directorio
+
+
+def _etiquetas(directorio):
+    return sorted(json.loads(ruta.read_text())['etiqueta'] for ruta in directorio.glob('*.json'))
+
+
+def _generar(app):
+    app.button(key='btn_generar_reporte').click().run()
+    trabajo = app.session_state['trabajo_reporte']
+    if trabajo['id']:
+        while not obtener_cola().trabajo(trabajo['id']).terminado:
+            time.sleep(0.05)
+    app.run()
+    assert not app.exception
+
+
+def test_solo_se_perfilan_generaciones_enviadas_a_la_cola(perfiles, app, monkeypatch):
+    caso = generar_casos(1, 'maximo', 51)[0]
+    app.file_uploader(key='cargar_borrador').upload('borrador.json', json.dumps(caso).encode(), 'application/json')
+    app.run()
+    perfilador = obtener_perfilador()
+
+    perfilador.armar(1)
+    _generar(app)
+    assert _etiquetas(perfiles) == ['ejecucion', 'generacion']
+    assert perfilador.restantes == 0
+
+    # Sin cambios el DOCX sale de la caché de la sesión: ni perfiles ni turno consumido
+    perfilador.armar(1)
+    _generar(app)
+    assert _etiquetas(perfiles) == ['ejecucion', 'generacion']
+    assert perfilador.restantes == 1
+
+    # Sin DOCX en caché y con la cola llena no se guarda el perfil de la ejecución y el turno se devuelve
+    del app.session_state['docx_generado']
+    rechazados = []
+
+    def cola_llena(*args, **kwargs):
+        rechazados.append(args)
+        raise ColaLlena("Hay 8 reportes en cola")
+
+    monkeypatch.setattr(obtener_cola(), 'enviar', cola_llena)
+    app.button(key='btn_generar_reporte').click().run()
+    assert not app.exception
+    assert len(rechazados) == 1
+    assert _etiquetas(perfiles) == ['ejecucion', 'generacion']
+    assert perfilador.restantes == 1
@@ -0,0 +1,58 @@
+"""Configuración de la aplicación leída del entorno"""
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from recursos import directorio_borradores
+
+from .conftest import APLICACION
+
+
+@pytest.fixture
+def raiz(tmp_path, monkeypatch):
+    raiz = tmp_path / 'borradores'
+    (raiz / 'clinica' / '2024').mkdir(parents=True)
+    (tmp_path / 'privado').mkdir()
+    monkeypatch.setenv('ENZIAN_BORRADORES', str(raiz))
+    return raiz
+
+
+def test_directorio_dentro_de_la_raiz(raiz):
+    assert directorio_borradores('clinica/2024') == raiz / 'clinica' / '2024'
+    assert directorio_borradores(str(raiz / 'clinica')) == raiz / 'clinica'
+    assert directorio_borradores('.') == raiz
+
+
+@pytest.mark.parametrize('texto', ['..', '../privado', 'clinica/../../privado', '/', '/etc', '', 'no_existe'])
+def test_directorio_fuera_de_la_raiz(raiz, texto):
+    assert directorio_borradores(texto) is None
+
+
+def test_enlace_que_sale_de_la_raiz(raiz):
+    (raiz / 'enlace').symlink_to(raiz.parent / 'privado')
+    assert directorio_borradores('enlace') is None
+
+
+def test_sin_raiz_configurada(tmp_path, monkeypatch):
+    monkeypatch.delenv('ENZIAN_BORRADORES', raising=False)
+    assert directorio_borradores(str(tmp_path)) is None
+
+
+def _panel_visible(app):
+    return any('Panel de desarrollo' in expander.label for expander in app.expander)
+
+
+def test_panel_de_desarrollo_no_se_activa_desde_la_url(tmp_path, monkeypatch):
+    monkeypatch.delenv('ENZIAN_DESARROLLO', raising=False)
+    monkeypatch.setenv('ENZIAN_DB', str(tmp_path / 'reportes.db'))
+    st.cache_resource.clear()
+    app = AppTest.from_file(APLICACION, default_timeout=60)
+    app.query_params['dev'] = '1'
+    app.run()
+    assert not app.exception
+    assert not _panel_visible(app)
+
+    monkeypatch.setenv('ENZIAN_DESARROLLO', '1')
+    app.run()
+    assert _panel_visible(app)
+    st.cache_resource.clear()
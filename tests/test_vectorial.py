@@ -0,0 +1,34 @@
+"""La clasificación vectorizada coincide con las funciones escalares"""
+import numpy as np
+
+from enzian.clasificacion import calcular_clasificacion_compartimento, calcular_clasificacion_ovario
+from enzian.vectorial import clasificar_cohorte, clasificar_compartimentos, clasificar_ovarios, etiquetas
+
+MEDIDAS = [0, 0.5, 0.99, 1, 1.01, 2, 2.99, 3, 3.01, 5, 6.99, 7, 7.01, 12]
+
+
+def test_ovarios_igual_a_escalar():
+    esperado = [calcular_clasificacion_ovario(m) for m in MEDIDAS]
+    assert etiquetas(clasificar_ovarios(MEDIDAS), 'O').tolist() == esperado
+
+
+def test_compartimentos_igual_a_escalar():
+    esperado = [calcular_clasificacion_compartimento(m) for m in MEDIDAS]
+    grados = clasificar_compartimentos(MEDIDAS)
+    assert [str(g) for g in grados] == esperado
+    assert etiquetas(grados, 'B').tolist() == ['B' + e for e in esperado]
+
+
+def test_cohorte_elige_limites_por_columna():
+    medidas = np.array(MEDIDAS)
+    grados = clasificar_cohorte({'ovario_izq': medidas, 'a': medidas, 'b_der': medidas})
+    assert np.array_equal(grados['ovario_izq'], clasificar_ovarios(medidas))
+    assert np.array_equal(grados['a'], clasificar_compartimentos(medidas))
+    assert np.array_equal(grados['b_der'], clasificar_compartimentos(medidas))
+
+
+def test_nan_cae_en_grado_3_como_escalar():
+    assert calcular_clasificacion_ovario(float('nan')) == 'O3'
+    assert clasificar_ovarios([np.nan]).tolist() == [3]
+    assert calcular_clasificacion_compartimento(float('nan')) == '3'
+    assert clasificar_compartimentos([np.nan]).tolist() == [3]